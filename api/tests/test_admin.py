@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from api.admin import EstimatedCountPaginator
+from api.models import Cabin, Booking
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+User = get_user_model()
+
+class AdminChangelistTests(TestCase):
+
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(username='root', email='root@example.com', password='password123')
+        self.client.force_login(self.superuser)
+        self.cabins = [Cabin.objects.create(name=f'Admin Cabin {i}') for i in range(3)]
+        self.therapists = [
+            User.objects.create_user(username=f'admintherapist{i}', email=f'at{i}@example.com', password='password123', is_therapist=True)
+            for i in range(5)
+        ]
+
+    def add_bookings(self, count):
+        start = timezone.now()
+        Booking.objects.bulk_create([
+            Booking(
+                cabin=self.cabins[i % 3], therapist=self.therapists[i % 5] if i % 2 else None,
+                status='booked' if i % 2 else 'available', price=Decimal('40.00'),
+                start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i + 1),
+            )
+            for i in range(count)
+        ])
+
+    def changelist_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_booking_changelist_query_count_is_constant(self):
+        url = reverse('admin:api_booking_changelist')
+        self.add_bookings(5)
+        few = self.changelist_queries(url)
+        self.add_bookings(80)
+        self.assertEqual(self.changelist_queries(url), few)
+        self.assertEqual(self.changelist_queries(url, {'status': 'booked'}), few)
+
+    def test_user_and_cabin_changelists_render(self):
+        for name in ('admin:api_user_changelist', 'admin:api_cabin_changelist'):
+            self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+
+    def test_booking_change_form_does_not_list_every_user(self):
+        self.add_bookings(1)
+        booking = Booking.objects.get()
+        response = self.client.get(reverse('admin:api_booking_change', args=[booking.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'admintherapist4</option>')
+
+    def test_paginator_stops_counting_at_the_cap(self):
+        self.add_bookings(12)
+        with patch.object(EstimatedCountPaginator, 'COUNT_CAP', 10):
+            self.assertEqual(EstimatedCountPaginator(Booking.objects.order_by('id'), 5).count, 10)
+            self.assertEqual(EstimatedCountPaginator(Booking.objects.filter(status='booked').order_by('id'), 5).count, 6)
@@ -0,0 +1,88 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking
+from datetime import datetime
+import pytz
+from decimal import Decimal
+
+User = get_user_model()
+
+class AdminBookingAnalyticsTests(APITestCase):
+
+    def setUp(self):
+        self.utc = pytz.UTC
+        self.admin_user = User.objects.create_user(
+            username='analyticsadmin', email='analytics@example.com', password='password123', is_admin=True
+        )
+        self.therapist_user = User.objects.create_user(
+            username='analyticstherapist', email='analyticst@example.com', password='password123', is_therapist=True
+        )
+        self.cabin1 = Cabin.objects.create(name='Analytics Cabin A')
+        self.cabin2 = Cabin.objects.create(name='Analytics Cabin B')
+
+        # Monday 2025-06-02: one booked 10:30-12:00 and one open 2h slot in cabin1,
+        # one cancelled slot in cabin2.
+        Booking.objects.create(
+            cabin=self.cabin1, therapist=self.therapist_user, status='booked', price=Decimal('90.00'),
+            start_time=self.utc.localize(datetime(2025, 6, 2, 10, 30)),
+            end_time=self.utc.localize(datetime(2025, 6, 2, 12, 0)),
+        )
+        Booking.objects.create(
+            cabin=self.cabin1, status='available', price=Decimal('60.00'),
+            start_time=self.utc.localize(datetime(2025, 6, 2, 13, 0)),
+            end_time=self.utc.localize(datetime(2025, 6, 2, 15, 0)),
+        )
+        Booking.objects.create(
+            cabin=self.cabin2, therapist=self.therapist_user, status='cancelled', price=Decimal('50.00'),
+            start_time=self.utc.localize(datetime(2025, 6, 3, 9, 0)),
+            end_time=self.utc.localize(datetime(2025, 6, 3, 10, 0)),
+        )
+        # Outside the requested range.
+        Booking.objects.create(
+            cabin=self.cabin2, therapist=self.therapist_user, status='booked', price=Decimal('500.00'),
+            start_time=self.utc.localize(datetime(2025, 7, 1, 9, 0)),
+            end_time=self.utc.localize(datetime(2025, 7, 1, 10, 0)),
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+        self.url = reverse('api:admin_booking_analytics') + '?start_date=2025-06-01&end_date=2025-06-30'
+
+    def test_totals_and_utilization(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        totals = response.data['totals']
+        self.assertEqual(totals['offered_hours'], 3.5)
+        self.assertEqual(totals['booked_hours'], 1.5)
+        self.assertEqual(totals['utilization'], round(1.5 / 3.5, 4))
+        self.assertEqual(totals['revenue'], 90.0)
+        self.assertEqual(totals['bookings'], 1)
+        self.assertEqual(totals['cancellations'], 1)
+
+    def test_breakdowns(self):
+        response = self.client.get(self.url)
+        by_cabin = {row['cabin_name']: row for row in response.data['by_cabin']}
+        self.assertEqual(by_cabin['Analytics Cabin A']['revenue'], 90.0)
+        self.assertEqual(by_cabin['Analytics Cabin B']['offered_hours'], 0.0)
+        self.assertEqual(response.data['by_therapist'][0]['therapist_username'], 'analyticstherapist')
+        self.assertEqual(response.data['by_weekday'][0]['booked_hours'], 1.5) # Monday
+        self.assertEqual(response.data['by_hour'][10]['revenue'], 90.0)
+
+    def test_heatmap_splits_bookings_across_hours(self):
+        response = self.client.get(self.url)
+        monday = response.data['heatmap'][0]
+        self.assertEqual(monday[10], 0.5)
+        self.assertEqual(monday[11], 1.0)
+        self.assertEqual(sum(sum(row) for row in response.data['heatmap']), 1.5)
+
+    def test_invalid_range(self):
+        url = reverse('api:admin_booking_analytics') + '?start_date=2025-07-01&end_date=2025-06-01'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(user=self.therapist_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
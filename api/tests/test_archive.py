@@ -0,0 +1,100 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking, BookingArchive, SlotChangeEvent, TherapistMonthlyStats
+from api.archive import archive_bookings
+from api.stats import find_inconsistencies, rebuild_stats
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+User = get_user_model()
+
+class BookingArchiveTests(APITestCase):
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            username='archiveadmin', email='archiveadmin@example.com', password='password123', is_admin=True
+        )
+        self.therapist_user = User.objects.create_user(
+            username='archivetherapist', email='archivetherapist@example.com', password='password123', is_therapist=True
+        )
+        self.cabin = Cabin.objects.create(name='Archive Cabin')
+        now = timezone.now()
+        self.old_booked = self.make_booking(now - timedelta(days=400), 'booked', self.therapist_user, '80.00')
+        self.old_cancelled = self.make_booking(now - timedelta(days=300), 'cancelled', self.therapist_user, '50.00')
+        self.old_unbooked = self.make_booking(now - timedelta(days=200), 'available', None, '40.00')
+        self.recent = self.make_booking(now - timedelta(days=10), 'booked', self.therapist_user, '70.00')
+        self.upcoming = self.make_booking(now + timedelta(days=10), 'available', None, '60.00')
+        self.old_ids = sorted([self.old_booked.id, self.old_cancelled.id, self.old_unbooked.id])
+        rebuild_stats()
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+
+    def make_booking(self, start, slot_status, therapist, price):
+        return Booking.objects.create(
+            cabin=self.cabin, therapist=therapist, status=slot_status, price=Decimal(price),
+            start_time=start, end_time=start + timedelta(hours=1),
+        )
+
+    def test_archive_moves_old_rows_in_batches(self):
+        cutoff = timezone.now() - timedelta(days=180)
+        self.assertEqual(archive_bookings(cutoff=cutoff, batch_size=2), 3)
+        self.assertEqual(sorted(BookingArchive.objects.values_list('id', flat=True)), self.old_ids)
+        self.assertEqual(sorted(Booking.objects.values_list('id', flat=True)), [self.recent.id, self.upcoming.id])
+
+        archived = BookingArchive.objects.get(pk=self.old_booked.id)
+        self.assertEqual(archived.therapist_username, 'archivetherapist')
+        self.assertEqual(archived.cabin_name, 'Archive Cabin')
+        self.assertEqual(archived.price, Decimal('80.00'))
+        self.assertEqual(archive_bookings(cutoff=cutoff), 0)
+        # Delta sync and event streams are told the rows are gone.
+        self.assertEqual(sorted(SlotChangeEvent.objects.filter(kind='deleted').values_list('booking_id', flat=True)), self.old_ids)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('archive_bookings', '--dry-run', stdout=out)
+        self.assertIn('3 bookings', out.getvalue())
+        self.assertFalse(BookingArchive.objects.exists())
+        call_command('archive_bookings', '--retention-days', '5', '--batch-size', '1', stdout=out)
+        self.assertEqual(BookingArchive.objects.count(), 4)
+
+    def test_history_reads_across_both_tables(self):
+        archive_bookings(cutoff=timezone.now() - timedelta(days=180))
+        url = reverse('api:admin_bookings_all')
+
+        response = self.client.get(url)
+        self.assertEqual([row['id'] for row in response.data], [self.recent.id, self.upcoming.id])
+
+        response = self.client.get(url, {'include_archived': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['id'], row['archived']) for row in response.data],
+            [(pk, True) for pk in sorted(self.old_ids)] + [(self.recent.id, False), (self.upcoming.id, False)]
+        )
+        first = response.data[0]
+        self.assertEqual(first['therapist_username'], 'archivetherapist')
+        self.assertEqual(first['cabin'], self.cabin.id)
+
+        response = self.client.get(url, {'include_archived': 'true', 'status': 'booked', 'therapist_id': self.therapist_user.id})
+        self.assertEqual([row['id'] for row in response.data], [self.old_booked.id, self.recent.id])
+
+    def test_stats_survive_archival(self):
+        before = list(TherapistMonthlyStats.objects.order_by('month').values_list('month', 'booked_count', 'cancelled_count'))
+        archive_bookings(cutoff=timezone.now() - timedelta(days=180))
+        self.assertEqual(find_inconsistencies(), [])
+        rebuild_stats()
+        after = list(TherapistMonthlyStats.objects.order_by('month').values_list('month', 'booked_count', 'cancelled_count'))
+        self.assertEqual(after, before)
+
+    def test_analytics_include_archived_rows(self):
+        archive_bookings(cutoff=timezone.now() - timedelta(days=180))
+        start = (self.old_booked.start_time - timedelta(days=1)).date()
+        response = self.client.get(reverse('api:admin_booking_analytics'), {'start_date': start.isoformat(), 'end_date': timezone.now().date().isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['totals']['revenue'], 150.0)
+        self.assertEqual(response.data['totals']['cancellations'], 1)
@@ -0,0 +1,101 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking
+from api.availability import AvailabilityIndex, availability_index
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+User = get_user_model()
+
+@patch('api.views.send_app_email')
+class CabinAvailabilityTests(APITestCase):
+
+    def setUp(self):
+        availability_index.invalidate()
+        self.therapist_user = User.objects.create_user(
+            username='calendar', email='calendar@example.com', password='password123', is_therapist=True
+        )
+        self.admin_user = User.objects.create_user(
+            username='calendaradmin', email='calendaradmin@example.com', password='password123', is_admin=True
+        )
+        self.cabin = Cabin.objects.create(name='Calendar Cabin')
+        self.day = timezone.localdate() + timedelta(days=5)
+        # 09:00-10:00, 10:00-11:00 and 11:00-12:00 are offered; 10:00-11:00 is already booked.
+        self.slots = [
+            self.create_slot(hour, status='booked' if hour == 10 else 'available') for hour in (9, 10, 11)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.therapist_user)
+        self.url = reverse('api:cabin_availability', kwargs={'pk': self.cabin.id})
+
+    def at(self, hour, minute=0, day=None):
+        return timezone.make_aware(datetime.combine(day or self.day, time(hour, minute)), timezone.get_default_timezone())
+
+    def create_slot(self, hour, status='available', minutes=60, **kwargs):
+        start = self.at(hour)
+        return Booking.objects.create(
+            cabin=self.cabin, start_time=start, end_time=start + timedelta(minutes=minutes),
+            price=Decimal('50.00'), status=status, **kwargs
+        )
+
+    def test_calendar_reports_free_and_booked_runs(self, mock_send_email):
+        response = self.client.get(self.url, {'start_date': self.day.isoformat(), 'days': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first, second = response.data['days']
+        self.assertEqual(first['free'], [('09:00', '10:00'), ('11:00', '12:00')])
+        self.assertEqual(first['booked'], [('10:00', '11:00')])
+        self.assertEqual((second['free'], second['booked']), ([], []))
+        self.assertEqual(response.data['granularity_minutes'], 15)
+
+    def test_window_free(self, mock_send_email):
+        response = self.client.get(self.url, {'start_date': self.day.isoformat(), 'days': 1, 'time_from': '11:00', 'time_to': '12:00'})
+        self.assertTrue(response.data['days'][0]['window_free'])
+        response = self.client.get(self.url, {'start_date': self.day.isoformat(), 'days': 1, 'time_from': '09:00', 'time_to': '11:00'})
+        self.assertFalse(response.data['days'][0]['window_free'])
+
+    def test_index_follows_write_paths(self, mock_send_email):
+        self.assertEqual(availability_index.calendar(self.cabin.id, self.day, 1)[0]['booked'], [('10:00', '11:00')])
+
+        response = self.client.patch(reverse('api:therapist_slot_book', kwargs={'pk': self.slots[2].id}), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(availability_index.calendar(self.cabin.id, self.day, 1)[0]['booked'], [('10:00', '12:00')])
+
+        admin = APIClient()
+        admin.force_authenticate(user=self.admin_user)
+        admin.patch(reverse('api:admin_booking_cancel', kwargs={'pk': self.slots[1].id}), {}, format='json')
+        admin.delete(reverse('api:admin_slot_delete', kwargs={'pk': self.slots[0].id}))
+        day = availability_index.calendar(self.cabin.id, self.day, 1)[0]
+        self.assertEqual((day['free'], day['booked']), ([], [('11:00', '12:00')]))
+
+        # A slot on an earlier day than anything seen so far moves the bitmap's first day back.
+        response = admin.post(reverse('api:admin_slot_create'), {
+            'cabin': self.cabin.id, 'start_time': self.at(8, day=self.day - timedelta(days=3)).isoformat(),
+            'end_time': self.at(9, 30, day=self.day - timedelta(days=3)).isoformat(), 'price': '50.00',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(availability_index.calendar(self.cabin.id, self.day - timedelta(days=3), 1)[0]['free'], [('08:00', '09:30')])
+        self.assertEqual(availability_index.calendar(self.cabin.id, self.day, 1)[0]['booked'], [('11:00', '12:00')])
+
+    def test_partial_cells_round_conservatively(self, mock_send_email):
+        start = self.at(14, 5)
+        Booking.objects.create(cabin=self.cabin, start_time=start, end_time=start + timedelta(minutes=50),
+                               price=Decimal('50.00'), status='available')
+        Booking.objects.create(cabin=self.cabin, start_time=self.at(16, 10), end_time=self.at(16, 20),
+                               price=Decimal('50.00'), status='booked')
+        index = AvailabilityIndex()
+        day = index.calendar(self.cabin.id, self.day, 1)[0]
+        self.assertIn(('14:15', '14:45'), day['free'])
+        self.assertIn(('16:00', '16:30'), day['booked'])
+        self.assertEqual(index.free_on(self.cabin.id, self.day, 1, time(14), time(15)), [False])
+        self.assertEqual(index.free_on(self.cabin.id, self.day, 1, time(14, 15), time(14, 45)), [True])
+
+    def test_validation_and_permissions(self, mock_send_email):
+        self.assertEqual(self.client.get(self.url, {'days': 400}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'time_from': '10:00'}).status_code, status.HTTP_400_BAD_REQUEST)
+        missing = reverse('api:cabin_availability', kwargs={'pk': 99999})
+        self.assertEqual(self.client.get(missing).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(APIClient().get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
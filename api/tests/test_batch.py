@@ -0,0 +1,140 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+from api.batch import run_one
+from api.query_budget import QueryCounter
+from api.models import Cabin, Booking
+from datetime import timedelta
+from decimal import Decimal
+import time
+from unittest.mock import patch
+
+User = get_user_model()
+
+class BatchTestMixin:
+
+    def create_fixtures(self):
+        self.therapist_user = User.objects.create_user(
+            username='batchtherapist', email='batchtherapist@example.com', password='password123', is_therapist=True
+        )
+        self.cabin = Cabin.objects.create(name='Batch Cabin')
+        start = timezone.now() + timedelta(days=1)
+        self.slot = Booking.objects.create(
+            cabin=self.cabin, start_time=start, end_time=start + timedelta(hours=1), price=Decimal('50.00')
+        )
+        self.client = APIClient()
+        self.url = reverse('api:batch')
+
+    def batch(self, *paths, **body):
+        requests = [path if isinstance(path, dict) else {'path': path} for path in paths]
+        return self.client.post(self.url, {'requests': requests, **body}, format='json')
+
+class BatchTests(BatchTestMixin, APITestCase):
+
+    def setUp(self):
+        self.create_fixtures()
+
+    def test_dashboard_requests_run_under_one_authentication(self):
+        token = RefreshToken.for_user(self.therapist_user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with patch.object(JWTAuthentication, 'get_user', autospec=True, side_effect=JWTAuthentication.get_user) as get_user:
+            response = self.batch(
+                reverse('api:therapist_profile'),
+                {'path': reverse('api:therapist_slots_available'), 'params': {'fields': 'id,cabin_name'}},
+                reverse('api:therapist_bookings_mine') + '?period=upcoming',
+            )
+        self.assertEqual(get_user.call_count, 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile, slots, mine = response.data['responses']
+        self.assertEqual((profile['status'], profile['body']['username']), (200, 'batchtherapist'))
+        self.assertEqual(slots['body'], [{'id': self.slot.pk, 'cabin_name': 'Batch Cabin'}])
+        self.assertEqual((mine['status'], mine['body']), (200, []))
+
+    def test_sub_request_errors_are_reported_per_request(self):
+        self.client.force_authenticate(user=self.therapist_user)
+        response = self.batch(
+            reverse('api:admin_bookings_all'), # Therapists may not list every booking
+            '/api/no/such/path/',
+            reverse('api:token_obtain_pair'), # POST-only
+            reverse('api:batch'),
+            reverse('api:therapist_profile'),
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['status'] for item in response.data['responses']], [403, 404, 400, 400, 200])
+
+    def test_viewset_list_can_be_batched(self):
+        admin_user = User.objects.create_user(username='batchadmin', password='password123', is_admin=True)
+        self.client.force_authenticate(user=admin_user)
+        response = self.batch(reverse('api:admin_cabin-list'))
+        self.assertEqual(response.data['responses'][0]['body'][0]['name'], 'Batch Cabin')
+
+    @override_settings(BATCH={'MAX_REQUESTS': 2})
+    def test_sub_request_limit(self):
+        self.client.force_authenticate(user=self.therapist_user)
+        response = self.batch(*[reverse('api:therapist_profile')] * 3)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(BATCH={'TIME_LIMIT_SECONDS': 0})
+    def test_time_limit(self):
+        self.client.force_authenticate(user=self.therapist_user)
+        response = self.batch(reverse('api:therapist_profile'), reverse('api:therapist_stats'))
+        self.assertEqual([item['status'] for item in response.data['responses']], [504, 504])
+
+    def test_requires_authentication(self):
+        response = self.batch(reverse('api:therapist_profile'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class ParallelBatchTests(BatchTestMixin, TransactionTestCase):
+    """Parallel sub-requests use their own connections, so the data must be committed."""
+
+    def setUp(self):
+        self.create_fixtures()
+
+    def test_parallel_batch_keeps_request_order(self):
+        self.client.force_authenticate(user=self.therapist_user)
+        paths = [reverse('api:therapist_slots_available'), reverse('api:therapist_profile'), reverse('api:therapist_stats')]
+        sequential = self.batch(*paths).data['responses']
+        parallel = self.batch(*paths, parallel=True).data['responses']
+        self.assertEqual(parallel, sequential)
+        self.assertEqual([item['status'] for item in parallel], [200, 200, 200])
+
+    def test_parallel_queries_are_counted_for_the_request(self):
+        counters = []
+
+        class RecordingCounter(QueryCounter):
+            def __init__(self):
+                super().__init__()
+                counters.append(self)
+
+        self.client.force_authenticate(user=self.therapist_user)
+        paths = [reverse('api:therapist_slots_available'), reverse('api:therapist_profile'), reverse('api:therapist_stats')]
+        with patch('api.middleware.QueryCounter', RecordingCounter):
+            self.batch(*paths)
+            self.batch(*paths, parallel=True)
+        self.assertGreater(counters[0].count, 0)
+        self.assertEqual(counters[1].count, counters[0].count)
+
+    @override_settings(BATCH={'TIME_LIMIT_SECONDS': 0.05, 'MAX_PARALLEL': 1})
+    def test_nothing_runs_after_the_time_limit_response(self):
+        finished = []
+
+        def slow(request, sub_request):
+            time.sleep(0.2)
+            finished.append(sub_request['path'])
+            return run_one(request, sub_request)
+
+        self.client.force_authenticate(user=self.therapist_user)
+        paths = [reverse('api:therapist_profile'), reverse('api:therapist_stats')]
+        with patch('api.batch.run_one', side_effect=slow):
+            response = self.batch(*paths, parallel=True)
+            answered = list(finished)
+        # The running sub-request finished before the response; the queued one never started.
+        self.assertEqual([item['status'] for item in response.data['responses']], [200, 504])
+        self.assertEqual(answered, paths[:1])
+        time.sleep(0.3)
+        self.assertEqual(finished, answered)
@@ -0,0 +1,69 @@
+from django.db import connection
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking
+from api.catalog import CabinCatalog, cabin_catalog
+from datetime import timedelta
+from decimal import Decimal
+
+User = get_user_model()
+
+class CabinCatalogTests(APITestCase):
+
+    def setUp(self):
+        cabin_catalog.invalidate()
+        self.admin_user = User.objects.create_user(
+            username='catalogadmin', email='catalogadmin@example.com', password='password123', is_admin=True
+        )
+        self.cabins = [Cabin.objects.create(name=f'Catalog Cabin {i}', capacity=i + 1) for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+        self.url = reverse('api:admin_cabin-list')
+
+    def test_refresh_is_one_query_cold_or_warm(self):
+        catalog = CabinCatalog()
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                catalog.refresh()
+            self.assertEqual(len(queries), 1)
+        self.assertEqual(catalog.get(self.cabins[1].pk).capacity, 2)
+        self.assertIsNone(catalog.get(10 ** 6))
+
+    def test_cabin_list_is_served_from_the_catalog(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['name'] for row in response.data], [f'Catalog Cabin {i}' for i in range(3)])
+        self.assertEqual(len(queries), 1) # The version check
+        self.assertNotIn('"name"', queries[0]['sql'].split('UNION ALL')[0])
+
+    def test_changes_outside_the_api_are_picked_up(self):
+        self.client.get(self.url)
+        Cabin.objects.filter(pk=self.cabins[0].pk).update(name='Renamed') # Bulk updates stamp updated_at
+        Cabin.objects.filter(pk=self.cabins[2].pk).delete()
+        response = self.client.get(self.url)
+        self.assertEqual([row['name'] for row in response.data], ['Renamed', 'Catalog Cabin 1'])
+
+    def test_viewset_writes_invalidate_the_catalog(self):
+        self.client.get(self.url)
+        response = self.client.patch(reverse('api:admin_cabin-detail', kwargs={'pk': self.cabins[1].pk}), {'name': 'Patched'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('default', cabin_catalog.shards)
+        self.assertEqual(self.client.get(self.url).data[1]['name'], 'Patched')
+
+    def test_booking_lists_name_cabins_from_the_catalog(self):
+        start = timezone.now() + timedelta(days=1)
+        for cabin in self.cabins:
+            Booking.objects.create(cabin=cabin, start_time=start, end_time=start + timedelta(hours=1), price=Decimal('50.00'))
+        Cabin.objects.filter(pk=self.cabins[0].pk).update(name='Fresh Name')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api:admin_bookings_all'))
+        self.assertEqual(
+            sorted(row['cabin_name'] for row in response.data), ['Catalog Cabin 1', 'Catalog Cabin 2', 'Fresh Name']
+        )
+        self.assertFalse(any('JOIN "api_cabin"' in query['sql'] for query in queries))
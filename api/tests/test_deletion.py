@@ -0,0 +1,149 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking, BookingArchive, DeletionJob, Reservation, SlotChangeEvent
+from api.archive import move_to_archive
+from api.deletion import run_deletion_job, run_pending_jobs
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+User = get_user_model()
+
+@override_settings(DELETION_JOBS={'BATCH_SIZE': 2})
+@patch('api.views.send_app_email')
+class DeletionJobTests(APITestCase):
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            username='deladmin', email='deladmin@example.com', password='password123', is_admin=True
+        )
+        self.therapist_user = User.objects.create_user(
+            username='deltherapist', email='deltherapist@example.com', password='password123', is_therapist=True
+        )
+        self.other_therapist = User.objects.create_user(
+            username='delother', email='delother@example.com', password='password123', is_therapist=True
+        )
+        self.cabin = Cabin.objects.create(name='Doomed Cabin', capacity=3)
+        self.other_cabin = Cabin.objects.create(name='Staying Cabin', capacity=3)
+        self.now = timezone.now()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+
+    def make_slot(self, hours, cabin=None, **fields):
+        start = self.now + timedelta(hours=hours)
+        return Booking.objects.create(
+            cabin=cabin or self.cabin, start_time=start, end_time=start + timedelta(hours=1), price=Decimal('40.00'), **fields
+        )
+
+    def test_cabin_is_hidden_at_once_and_its_bookings_archived_in_the_background(self, mock_send_email):
+        past = self.make_slot(-48, therapist=self.therapist_user, status='booked')
+        upcoming = [self.make_slot(24 + hour) for hour in range(3)]
+        shared = self.make_slot(30, seats_total=3, seats_taken=1)
+        Reservation.objects.create(slot=shared, therapist=self.other_therapist)
+        kept = self.make_slot(24, cabin=self.other_cabin)
+
+        response = self.client.delete(reverse('api:admin_cabin-detail', kwargs={'pk': self.cabin.pk}))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_url = reverse('api:admin_deletion_job', kwargs={'pk': response.data['id']})
+
+        # Nothing deleted yet, but the cabin and its slots are gone from listings and booking.
+        self.assertEqual(Booking.objects.filter(cabin=self.cabin).count(), 5)
+        self.assertEqual([row['name'] for row in self.client.get(reverse('api:admin_cabin-list')).data], ['Staying Cabin'])
+        self.assertEqual([row['id'] for row in self.client.get(reverse('api:admin_slot_list_available')).data], [kept.pk])
+        self.client.force_authenticate(user=self.therapist_user)
+        slots = self.client.get(reverse('api:therapist_slots_available')).data
+        self.assertEqual([slot['id'] for slot in slots], [kept.pk])
+        response = self.client.patch(reverse('api:therapist_slot_book', kwargs={'pk': upcoming[0].pk}))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.client.force_authenticate(user=self.admin_user)
+
+        (job,) = run_pending_jobs()
+        self.assertEqual((job.status, job.rows_done, job.rows_total), ('done', 5, 5))
+        self.assertFalse(Cabin.objects.filter(pk=self.cabin.pk).exists())
+        self.assertFalse(Reservation.objects.exists())
+        self.assertEqual(
+            sorted(BookingArchive.objects.values_list('id', flat=True)),
+            sorted([past.pk, shared.pk] + [slot.pk for slot in upcoming]),
+        )
+        self.assertEqual(set(BookingArchive.objects.values_list('cabin_name', flat=True)), {'Doomed Cabin'})
+        self.assertEqual(
+            list(SlotChangeEvent.objects.filter(kind='deleted').values_list('actor_id', flat=True)), [self.admin_user.pk] * 5
+        )
+        self.assertTrue(Booking.objects.filter(pk=kept.pk).exists())
+
+        response = self.client.get(job_url)
+        self.assertEqual((response.data['status'], response.data['progress']), ('done', 1.0))
+
+    def test_user_is_deactivated_and_their_bookings_reopened_or_archived(self, mock_send_email):
+        past = self.make_slot(-48, therapist=self.therapist_user, status='booked')
+        cancelled = self.make_slot(48, therapist=self.therapist_user, status='cancelled')
+        upcoming = [self.make_slot(24 + hour, therapist=self.therapist_user, status='booked') for hour in range(3)]
+        shared = self.make_slot(30, seats_total=2, seats_taken=2, status='booked')
+        Reservation.objects.create(slot=shared, therapist=self.therapist_user)
+        Reservation.objects.create(slot=shared, therapist=self.other_therapist)
+        held = self.make_slot(60, held_by=self.therapist_user, hold_expires_at=self.now + timedelta(minutes=5))
+
+        response = self.client.delete(reverse('api:admin_user_delete', kwargs={'pk': self.therapist_user.pk}))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.therapist_user.refresh_from_db()
+        self.assertFalse(self.therapist_user.is_active)
+
+        (job,) = run_pending_jobs()
+        self.assertEqual((job.status, job.rows_done, job.rows_total), ('done', 6, 6))
+        self.assertFalse(User.objects.filter(pk=self.therapist_user.pk).exists())
+        self.assertEqual(sorted(BookingArchive.objects.values_list('id', flat=True)), sorted([past.pk, cancelled.pk]))
+        self.assertEqual(BookingArchive.objects.get(pk=past.pk).therapist_username, 'deltherapist')
+        for slot in upcoming:
+            slot.refresh_from_db()
+            self.assertEqual((slot.status, slot.therapist_id), ('available', None))
+        shared.refresh_from_db()
+        self.assertEqual((shared.status, shared.seats_taken), ('available', 1))
+        self.assertEqual(list(Reservation.objects.values_list('therapist_id', flat=True)), [self.other_therapist.pk])
+        held.refresh_from_db()
+        self.assertIsNone(held.held_by_id)
+
+    def test_admin_cannot_delete_themselves(self, mock_send_email):
+        response = self.client.delete(reverse('api:admin_user_delete', kwargs={'pk': self.admin_user.pk}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(DeletionJob.objects.exists())
+
+    def test_failed_job_is_recorded_and_can_be_resumed(self, mock_send_email):
+        for hour in range(3):
+            self.make_slot(24 + hour)
+        self.client.delete(reverse('api:admin_cabin-detail', kwargs={'pk': self.cabin.pk}))
+        batches = []
+
+        def fail_second_batch(bookings):
+            if batches:
+                raise RuntimeError("disk full")
+            batches.append(move_to_archive(bookings))
+            return batches[0]
+
+        with patch('api.deletion.move_to_archive', side_effect=fail_second_batch):
+            (job,) = run_pending_jobs()
+        self.assertEqual((job.status, job.error, job.rows_done), ('failed', 'disk full', 2))
+        self.assertIsNone(run_deletion_job(job.pk)) # Only pending jobs run without resume
+
+        out = StringIO()
+        call_command('run_deletion_jobs', job=job.pk, stdout=out)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_done, job.rows_total), ('done', 3, 3))
+        self.assertIn('done, 3/3 rows', out.getvalue())
+        self.assertFalse(Cabin.objects.filter(pk=self.cabin.pk).exists())
+        with self.assertRaises(CommandError):
+            call_command('run_deletion_jobs', job=job.pk, stdout=out)
+
+    def test_job_list_and_permissions(self, mock_send_email):
+        self.client.delete(reverse('api:admin_cabin-detail', kwargs={'pk': self.cabin.pk}))
+        self.client.delete(reverse('api:admin_cabin-detail', kwargs={'pk': self.other_cabin.pk}))
+        response = self.client.get(reverse('api:admin_deletion_jobs'), {'status': 'pending'})
+        self.assertEqual([row['target_name'] for row in response.data], ['Staying Cabin', 'Doomed Cabin'])
+        self.client.force_authenticate(user=self.therapist_user)
+        self.assertEqual(self.client.get(reverse('api:admin_deletion_jobs')).status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,122 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking
+from api.query_budget import QueryBudgetTestMixin
+from api.deletion import run_pending_jobs
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+User = get_user_model()
+
+@override_settings(DELTA_SYNC={'PAGE_SIZE': 2, 'SETTLE_SECONDS': 0})
+@patch('api.views.send_app_email')
+class DeltaSyncTests(QueryBudgetTestMixin, APITestCase):
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            username='syncadmin', email='syncadmin@example.com', password='password123', is_admin=True
+        )
+        self.therapist_user = User.objects.create_user(
+            username='synctherapist', email='synctherapist@example.com', password='password123', is_therapist=True
+        )
+        self.cabin = Cabin.objects.create(name='Sync Cabin')
+        self.start = timezone.now() + timedelta(days=5)
+        self.slots = [self.make_slot(hour) for hour in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.therapist_user)
+
+    def make_slot(self, hour, cabin=None):
+        start = self.start + timedelta(hours=hour)
+        return Booking.objects.create(
+            cabin=cabin or self.cabin, start_time=start, end_time=start + timedelta(hours=1),
+            price=Decimal('40.00'), status='available'
+        )
+
+    def sync(self, url_name, cursor=''):
+        response = self.client.get(reverse(url_name), {'since': cursor})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def sync_all(self, url_name, cursor=''):
+        """Follow has_more to the end; returns (result ids, removed ids, cursor)."""
+        ids, removed = [], []
+        while True:
+            data = self.sync(url_name, cursor)
+            ids += [row['id'] for row in data['results']]
+            removed += data['removed']
+            cursor = data['cursor']
+            if not data['has_more']:
+                return ids, removed, cursor
+
+    def test_initial_sync_pages_through_everything(self, mock_send_email):
+        data = self.sync('api:therapist_slots_available')
+        self.assertEqual(len(data['results']), 2)
+        self.assertTrue(data['has_more'])
+        ids, removed, cursor = self.sync_all('api:therapist_slots_available')
+        self.assertEqual(ids, [slot.id for slot in self.slots])
+        self.assertEqual(removed, [])
+        self.assertEqual(self.sync_all('api:therapist_slots_available', cursor)[:2], ([], []))
+
+    def test_booking_is_an_update_and_a_removal_from_open_slots(self, mock_send_email):
+        _, _, open_cursor = self.sync_all('api:therapist_slots_available')
+        _, _, mine_cursor = self.sync_all('api:therapist_bookings_mine')
+
+        response = self.client.patch(reverse('api:therapist_slot_book', kwargs={'pk': self.slots[1].id}), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.sync_all('api:therapist_slots_available', open_cursor)[:2], ([], [self.slots[1].id]))
+        self.assertEqual(self.sync_all('api:therapist_bookings_mine', mine_cursor)[:2], ([self.slots[1].id], []))
+
+    def test_bulk_updates_move_the_cursor(self, mock_send_email):
+        self.client.force_authenticate(user=self.admin_user)
+        _, _, cursor = self.sync_all('api:admin_bookings_all')
+
+        Booking.objects.filter(pk=self.slots[0].pk).update(price=Decimal('45.00'))
+        slot = self.slots[2]
+        slot.price = Decimal('55.00')
+        Booking.objects.bulk_update([slot], ['price'])
+
+        ids, _, cursor = self.sync_all('api:admin_bookings_all', cursor)
+        self.assertEqual(sorted(ids), [self.slots[0].id, self.slots[2].id])
+
+    def test_deletions_are_tombstones(self, mock_send_email):
+        other_cabin = Cabin.objects.create(name='Doomed Cabin')
+        doomed = self.make_slot(5, cabin=other_cabin)
+        self.client.force_authenticate(user=self.admin_user)
+        _, _, cursor = self.sync_all('api:admin_slot_list_available')
+
+        response = self.client.delete(reverse('api:admin_slot_delete', kwargs={'pk': self.slots[0].id}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.delete(reverse('api:admin_cabin-detail', kwargs={'pk': other_cabin.id}))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        run_pending_jobs() # Archives the cabin's bookings, leaving tombstones
+
+        ids, removed, _ = self.sync_all('api:admin_slot_list_available', cursor)
+        self.assertEqual(ids, [])
+        self.assertEqual(sorted(removed), [self.slots[0].id, doomed.id])
+
+    def test_therapists_only_see_their_own_tombstones(self, mock_send_email):
+        _, _, cursor = self.sync_all('api:therapist_bookings_mine')
+        self.client.force_authenticate(user=self.admin_user)
+        self.client.delete(reverse('api:admin_slot_delete', kwargs={'pk': self.slots[0].id}))
+        self.client.force_authenticate(user=self.therapist_user)
+        self.assertEqual(self.sync_all('api:therapist_bookings_mine', cursor)[:2], ([], []))
+
+    def test_without_since_the_full_list_is_returned(self, mock_send_email):
+        response = self.client.get(reverse('api:therapist_slots_available'))
+        self.assertEqual([row['id'] for row in response.data], [slot.id for slot in self.slots])
+
+    def test_invalid_cursor(self, mock_send_email):
+        response = self.client.get(reverse('api:therapist_slots_available'), {'since': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sync_query_count_is_constant(self, mock_send_email):
+        self.assertWithinQueryBudget(
+            reverse('api:therapist_slots_available') + '?since=',
+            lambda n: [self.make_slot(10 + i) for i in range(n)], sizes=(1, 50),
+        )
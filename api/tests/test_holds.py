@@ -0,0 +1,117 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking, SlotChangeEvent
+from api.holds import release_expired_holds
+from api.stats import find_inconsistencies
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+User = get_user_model()
+
+@patch('api.views.send_app_email')
+class SlotHoldTests(APITestCase):
+
+    def setUp(self):
+        self.therapist_user = User.objects.create_user(
+            username='holder', email='holder@example.com', password='password123', is_therapist=True
+        )
+        self.other_therapist = User.objects.create_user(
+            username='otherholder', email='otherholder@example.com', password='password123', is_therapist=True
+        )
+        self.cabin = Cabin.objects.create(name='Hold Cabin')
+        start = timezone.now() + timedelta(days=3)
+        self.slot = Booking.objects.create(
+            cabin=self.cabin, start_time=start, end_time=start + timedelta(hours=1),
+            price=Decimal('60.00'), status='available'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.therapist_user)
+        self.other_client = APIClient()
+        self.other_client.force_authenticate(user=self.other_therapist)
+
+    def hold(self, client=None, slot=None):
+        return (client or self.client).post(reverse('api:therapist_slot_hold', kwargs={'pk': (slot or self.slot).id}))
+
+    def confirm(self, client=None):
+        return (client or self.client).post(reverse('api:therapist_slot_hold_confirm', kwargs={'pk': self.slot.id}))
+
+    def listed_ids(self, client):
+        response = client.get(reverse('api:therapist_slots_available'))
+        return [row['id'] for row in response.data]
+
+    def expire_hold(self):
+        Booking.objects.filter(pk=self.slot.pk).update(hold_expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_hold_then_confirm_books_the_slot(self, mock_send_email):
+        response = self.hold()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('held_until', response.data)
+
+        response = self.confirm()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.status, 'booked')
+        self.assertEqual(self.slot.therapist, self.therapist_user)
+        self.assertIsNone(self.slot.held_by)
+        self.assertTrue(SlotChangeEvent.objects.filter(booking_id=self.slot.id, kind='booked').exists())
+        self.assertEqual(find_inconsistencies(), [])
+        self.assertEqual(mock_send_email.call_count, 2)
+
+    def test_held_slot_is_hidden_from_and_blocked_for_others(self, mock_send_email):
+        self.hold()
+        self.assertIn(self.slot.id, self.listed_ids(self.client))
+        self.assertNotIn(self.slot.id, self.listed_ids(self.other_client))
+
+        self.assertEqual(self.hold(self.other_client).status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.confirm(self.other_client).status_code, status.HTTP_409_CONFLICT)
+        response = self.other_client.patch(reverse('api:therapist_slot_book', kwargs={'pk': self.slot.id}), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_expired_hold_is_released_lazily(self, mock_send_email):
+        self.hold()
+        self.expire_hold()
+        self.assertIn(self.slot.id, self.listed_ids(self.other_client))
+        self.assertEqual(self.confirm().status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.hold(self.other_client).status_code, status.HTTP_200_OK)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.held_by, self.other_therapist)
+
+    def test_release(self, mock_send_email):
+        self.hold()
+        response = self.client.delete(reverse('api:therapist_slot_hold', kwargs={'pk': self.slot.id}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertIn(self.slot.id, self.listed_ids(self.other_client))
+
+    def test_booked_or_missing_slots_cannot_be_held(self, mock_send_email):
+        Booking.objects.filter(pk=self.slot.pk).update(status='booked', therapist=self.other_therapist)
+        self.assertEqual(self.hold().status_code, status.HTTP_409_CONFLICT)
+        response = self.client.post(reverse('api:therapist_slot_hold', kwargs={'pk': 99999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(SLOT_HOLDS={'TTL_SECONDS': 300})
+    def test_sweeper_clears_expired_holds_in_batches(self, mock_send_email):
+        start = self.slot.start_time
+        extra = [
+            Booking.objects.create(
+                cabin=self.cabin, start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i + 1),
+                price=Decimal('60.00'), status='available'
+            )
+            for i in range(1, 4)
+        ]
+        for slot in [self.slot] + extra:
+            self.hold(slot=slot)
+        Booking.objects.exclude(pk=extra[-1].pk).update(hold_expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(release_expired_holds(batch_size=2), 3)
+        self.assertEqual(list(Booking.objects.filter(held_by__isnull=False).values_list('pk', flat=True)), [extra[-1].pk])
+
+        out = StringIO()
+        call_command('release_expired_holds', stdout=out)
+        self.assertIn('Released 0 expired holds', out.getvalue())
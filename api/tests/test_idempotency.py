@@ -0,0 +1,95 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking
+from api.query_budget import cache_tables
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+User = get_user_model()
+cache = caches['shared']
+
+@patch('api.views.send_app_email')
+class IdempotencyKeyTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.therapist_user = User.objects.create_user(
+            username='retrying', email='retrying@example.com', password='password123', is_therapist=True
+        )
+        self.cabin = Cabin.objects.create(name='Retry Cabin')
+        start = timezone.now() + timedelta(days=2)
+        self.slot = Booking.objects.create(
+            cabin=self.cabin, start_time=start, end_time=start + timedelta(hours=1),
+            price=Decimal('45.00'), status='available'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.therapist_user)
+
+    def book(self, key, client=None, data=None):
+        url = reverse('api:therapist_slot_book', kwargs={'pk': self.slot.id})
+        return (client or self.client).patch(url, data or {}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_first_response(self, mock_send_email):
+        first = self.book('book-1')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as context:
+            retry = self.book('book-1')
+        # Nothing but cache round trips (and the savepoints the database cache takes inside the test's transaction).
+        queries = [q['sql'] for q in context if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual([sql for sql in queries if not any(table in sql for table in cache_tables())], [])
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(mock_send_email.call_count, 2) # Only the first attempt sent emails
+
+        # Without the key (or with a new one) the request runs again and the slot is taken.
+        self.assertEqual(self.book('book-2').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_key_is_scoped_to_user_and_request(self, mock_send_email):
+        self.book('shared')
+        other = User.objects.create_user(username='other', email='other@example.com', password='password123', is_therapist=True)
+        other_client = APIClient()
+        other_client.force_authenticate(user=other)
+        self.assertEqual(self.book('shared', client=other_client).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.assertEqual(self.book('shared', data={'note': 'different'}).status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    @override_settings(IDEMPOTENCY={'WAIT_SECONDS': 0})
+    def test_concurrent_duplicate_does_not_run(self, mock_send_email):
+        # The first request holds the lock but has not stored its response yet.
+        scope = f"idempotency:{self.therapist_user.pk}:PATCH:{reverse('api:therapist_slot_book', kwargs={'pk': self.slot.id})}:in-flight"
+        cache.add(f"{scope}:lock", 'x', timeout=30)
+
+        response = self.book('in-flight')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.status, 'available')
+
+    def test_cancel_retry_is_replayed(self, mock_send_email):
+        self.book('book')
+        url = reverse('api:therapist_booking_cancel', kwargs={'pk': self.slot.id})
+        first = self.client.patch(url, {}, format='json', HTTP_IDEMPOTENCY_KEY='cancel')
+        retry = self.client.patch(url, {}, format='json', HTTP_IDEMPOTENCY_KEY='cancel')
+        self.assertEqual((first.status_code, retry.status_code), (status.HTTP_200_OK, status.HTTP_200_OK))
+        self.assertEqual(retry.data['status'], 'cancelled')
+
+    def test_replay_restores_headers(self, mock_send_email):
+        self.admin_user = User.objects.create_user(
+            username='retryadmin', email='retryadmin@example.com', password='password123', is_admin=True
+        )
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('api:admin_slot_detail', kwargs={'pk': self.slot.id})
+        edit = lambda: self.client.patch(url, {'price': '50.00'}, format='json', HTTP_IF_MATCH='"1"', HTTP_IDEMPOTENCY_KEY='edit')
+        first = edit()
+        retry = edit()
+        self.assertEqual((first.status_code, retry.status_code), (status.HTTP_200_OK, status.HTTP_200_OK))
+        self.assertEqual((first['ETag'], retry['ETag']), ('"2"', '"2"'))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
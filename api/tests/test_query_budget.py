@@ -0,0 +1,76 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking
+from api.query_budget import QueryBudgetTestMixin
+from api.views import TherapistAvailableSlotsListView
+from datetime import datetime, timedelta
+import pytz
+from decimal import Decimal
+from unittest.mock import patch
+
+User = get_user_model()
+
+class QueryBudgetTests(QueryBudgetTestMixin, APITestCase):
+
+    def setUp(self):
+        self.utc = pytz.UTC
+        self.therapist_user = User.objects.create_user(
+            username='budgettherapist', email='budget@example.com', password='password123', is_therapist=True
+        )
+        self.admin_user = User.objects.create_user(
+            username='budgetadmin', email='budgetadmin@example.com', password='password123', is_admin=True
+        )
+        self.cabins = [Cabin.objects.create(name=f'Budget Cabin {i}') for i in range(3)]
+        self.client = APIClient()
+
+    def make_slots(self, therapist=None, slot_status='available'):
+        def populate(count):
+            start = self.utc.localize(datetime.now() + timedelta(days=1))
+            Booking.objects.bulk_create([
+                Booking(
+                    cabin=self.cabins[i % len(self.cabins)], therapist=therapist, status=slot_status,
+                    start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i + 1),
+                    price=Decimal('50.00'),
+                )
+                for i in range(count)
+            ])
+        return populate
+
+    def test_available_slots_list_budget(self):
+        self.client.force_authenticate(user=self.therapist_user)
+        self.assertWithinQueryBudget(reverse('api:therapist_slots_available'), self.make_slots())
+
+    def test_my_bookings_list_budget(self):
+        self.client.force_authenticate(user=self.therapist_user)
+        self.assertWithinQueryBudget(
+            reverse('api:therapist_bookings_mine'), self.make_slots(self.therapist_user, 'booked')
+        )
+
+    def test_admin_all_bookings_list_budget(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.assertWithinQueryBudget(
+            reverse('api:admin_bookings_all'), self.make_slots(self.therapist_user, 'booked')
+        )
+
+    def test_helper_fails_on_row_dependent_query_count(self):
+        self.client.force_authenticate(user=self.therapist_user)
+        # Without select_related every row dereferences its cabin.
+        unjoined = Booking.objects.filter(status='available')
+        with patch.object(TherapistAvailableSlotsListView, 'get_queryset', lambda view: unjoined):
+            with self.assertRaises(AssertionError):
+                self.assertWithinQueryBudget(
+                    reverse('api:therapist_slots_available'), self.make_slots(), sizes=(1, 5)
+                )
+
+    @override_settings(QUERY_BUDGET_MODE='log')
+    def test_runtime_alert_when_budget_exceeded(self):
+        self.client.force_authenticate(user=self.therapist_user)
+        self.make_slots()(2)
+        with patch.object(TherapistAvailableSlotsListView, 'query_budget', 0):
+            with self.assertLogs('api.query_budget', level='ERROR') as logs:
+                response = self.client.get(reverse('api:therapist_slots_available'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('TherapistAvailableSlotsListView', logs.output[0])
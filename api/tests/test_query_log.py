@@ -0,0 +1,106 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin
+from api.query_log import (
+    QueryInstrumentation, QueryStats, normalize_sql, redact_params, query_stats,
+)
+
+User = get_user_model()
+
+class QueryLogHelperTests(TestCase):
+
+    def test_normalize_sql_replaces_literals_and_in_lists(self):
+        sql = 'SELECT  "api_booking"."id" FROM "api_booking"\n WHERE "status" = \'booked\' AND "cabin_id" IN (%s, %s, %s) LIMIT 21'
+        self.assertEqual(
+            normalize_sql(sql),
+            'SELECT "api_booking"."id" FROM "api_booking" WHERE "status" = ? AND "cabin_id" IN (...) LIMIT ?'
+        )
+
+    def test_redact_params_hides_values(self):
+        self.assertEqual(redact_params(('secret@example.com', 42, None)), ['<str>', '<int>', None])
+        self.assertEqual(redact_params([(1,), (2,)], many=True), '<2 parameter sets>')
+
+    def test_query_stats_orders_by_total_time_and_evicts(self):
+        stats = QueryStats(max_entries=2)
+        stats.record('SELECT a', 5.0)
+        stats.record('SELECT a', 5.0)
+        stats.record('SELECT b', 20.0)
+        stats.record('SELECT c', 1.0) # Evicts the cheapest entry ('SELECT a')
+        top = stats.top()
+        self.assertEqual([entry['sql'] for entry in top], ['SELECT b', 'SELECT c'])
+        self.assertEqual(top[0]['calls'], 1)
+
+
+class QueryInstrumentationTests(TestCase):
+
+    def setUp(self):
+        Cabin.objects.create(name='Logged Cabin')
+
+    def test_slow_query_is_logged_with_plan(self):
+        stats = QueryStats()
+        wrapper = QueryInstrumentation(threshold_ms=0, explain=True, stats=stats)
+        with self.assertLogs('api.query_log', level='WARNING') as logs:
+            with connection.execute_wrapper(wrapper):
+                list(Cabin.objects.filter(name='Logged Cabin'))
+        record = logs.records[0]
+        self.assertIn('FROM "api_cabin"', record.sql)
+        self.assertIn('?', record.sql)
+        self.assertNotIn('Logged Cabin', record.getMessage())
+        self.assertTrue(record.plan)
+        self.assertEqual(stats.top()[0]['calls'], 1)
+
+    def test_fast_query_is_only_aggregated(self):
+        stats = QueryStats()
+        wrapper = QueryInstrumentation(threshold_ms=10_000, stats=stats)
+        with self.assertNoLogs('api.query_log', level='WARNING'):
+            with connection.execute_wrapper(wrapper):
+                list(Cabin.objects.all())
+        self.assertEqual(len(stats.top()), 1)
+
+
+class AdminQueryStatsViewTests(APITestCase):
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            username='statsadmin', email='statsadmin@example.com', password='password123', is_admin=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+        query_stats.reset()
+        query_stats.record('SELECT ? FROM "api_booking"', 12.5)
+
+    def tearDown(self):
+        query_stats.reset()
+
+    def test_dump_query_stats(self):
+        url = reverse('api:admin_query_stats')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['queries'][0]['sql'], 'SELECT ? FROM "api_booking"')
+
+    def test_reset_query_stats(self):
+        url = reverse('api:admin_query_stats')
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(query_stats.top(), [])
+
+    def test_query_stats_requires_admin(self):
+        therapist = User.objects.create_user(
+            username='statstherapist', email='statstherapist@example.com', password='password123', is_therapist=True
+        )
+        self.client.force_authenticate(user=therapist)
+        response = self.client.get(reverse('api:admin_query_stats'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(SLOW_QUERY_LOG={'ENABLED': True, 'THRESHOLD_MS': 0, 'EXPLAIN': False})
+    def test_middleware_logs_calling_view(self):
+        client = APIClient()
+        client.force_authenticate(user=self.admin_user)
+        with self.assertLogs('api.query_log', level='WARNING') as logs:
+            response = client.get(reverse('api:admin_bookings_all'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(logs.records[0].view, 'api.views.AdminListAllBookingsView')
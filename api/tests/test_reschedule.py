@@ -0,0 +1,106 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking, Reservation, SlotChangeEvent
+from api.holds import claim_slot
+from api.stats import find_inconsistencies, rebuild_stats
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+User = get_user_model()
+
+@patch('api.views.send_app_email')
+class RescheduleTests(APITestCase):
+
+    def setUp(self):
+        self.therapist_user = User.objects.create_user(
+            username='movetherapist', email='movetherapist@example.com', password='password123', is_therapist=True
+        )
+        self.other_therapist = User.objects.create_user(
+            username='moveother', email='moveother@example.com', password='password123', is_therapist=True
+        )
+        self.cabin = Cabin.objects.create(name='Move Cabin', capacity=1)
+        self.shared_cabin = Cabin.objects.create(name='Shared Move Cabin', capacity=3)
+        self.start = timezone.now() + timedelta(days=3)
+        self.booking = self.make_slot(0, therapist=self.therapist_user, status='booked')
+        self.target = self.make_slot(2)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.therapist_user)
+
+    def make_slot(self, hours, cabin=None, **fields):
+        start = self.start + timedelta(hours=hours)
+        return Booking.objects.create(
+            cabin=cabin or self.cabin, start_time=start, end_time=start + timedelta(hours=1), price=Decimal('40.00'), **fields
+        )
+
+    def move(self, booking, slot_id):
+        return self.client.post(
+            reverse('api:therapist_booking_reschedule', kwargs={'pk': booking.pk}), {'slot': slot_id}, format='json'
+        )
+
+    def test_moves_booking_in_one_step(self, mock_send_email):
+        rebuild_stats()
+        response = self.move(self.booking, self.target.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual((response.data['id'], response.data['status']), (self.target.pk, 'booked'))
+        self.booking.refresh_from_db()
+        self.target.refresh_from_db()
+        self.assertEqual(self.booking.status, 'cancelled')
+        self.assertEqual((self.target.status, self.target.therapist_id), ('booked', self.therapist_user.pk))
+        self.assertEqual(
+            list(SlotChangeEvent.objects.order_by('pk').values_list('booking_id', 'kind')),
+            [(self.target.pk, 'booked'), (self.booking.pk, 'cancelled')],
+        )
+        self.assertEqual(find_inconsistencies(), [])
+        # One notice to the therapist (and one to the admins when configured), naming both slots.
+        therapist_mails = [call for call in mock_send_email.call_args_list if call.args[2] == [self.therapist_user.email]]
+        self.assertEqual(len(therapist_mails), 1)
+        self.assertIn(f"Booking ID: {self.booking.pk}", therapist_mails[0].args[1])
+        self.assertIn(f"Booking ID: {self.target.pk}", therapist_mails[0].args[1])
+
+    def test_taken_or_missing_target_leaves_booking_untouched(self, mock_send_email):
+        taken = self.make_slot(4, therapist=self.other_therapist, status='booked')
+        for slot_id in (taken.pk, taken.pk + 1000):
+            response = self.move(self.booking, slot_id)
+            self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.booking.refresh_from_db()
+        self.assertEqual((self.booking.status, self.booking.therapist_id), ('booked', self.therapist_user.pk))
+        self.assertFalse(SlotChangeEvent.objects.exists())
+        mock_send_email.assert_not_called()
+
+    def test_cancelled_booking_rolls_back_the_claim(self, mock_send_email):
+        def cancelled_meanwhile(slot_id, user):
+            # The booking is cancelled elsewhere after the view read it.
+            Booking.objects.filter(pk=self.booking.pk).update(status='cancelled')
+            return claim_slot(slot_id, user)
+
+        with patch('api.reschedule.claim_slot', side_effect=cancelled_meanwhile):
+            response = self.move(self.booking, self.target.pk)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.target.refresh_from_db()
+        self.assertEqual((self.target.status, self.target.therapist_id), ('available', None))
+
+    def test_moves_between_seats_and_slots(self, mock_send_email):
+        shared = self.make_slot(6, cabin=self.shared_cabin, seats_total=3)
+        response = self.move(self.booking, shared.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual((response.data['status'], response.data['therapist']), ('booked', self.therapist_user.pk))
+        shared.refresh_from_db()
+        self.assertEqual((shared.status, shared.seats_taken), ('available', 1))
+
+        response = self.move(shared, self.target.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        shared.refresh_from_db()
+        self.assertEqual(shared.seats_taken, 0)
+        self.assertEqual(Reservation.objects.get().status, 'cancelled')
+
+    def test_invalid_requests(self, mock_send_email):
+        self.assertEqual(self.move(self.booking, self.booking.pk).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.move(self.booking, 'soon').status_code, status.HTTP_400_BAD_REQUEST)
+        others = self.make_slot(8, therapist=self.other_therapist, status='booked')
+        self.assertEqual(self.move(others, self.target.pk).status_code, status.HTTP_403_FORBIDDEN)
+        self.target.refresh_from_db()
+        self.assertEqual(self.target.status, 'available')
@@ -0,0 +1,143 @@
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from api.models import Cabin, Booking, JobRun, Reservation, SlotChangeEvent
+from api.maintenance import expire_past_slots, purge_expired
+from api.scheduler import Cron, Every, Job, Scheduler, run_job
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+
+User = get_user_model()
+
+class CronTests(SimpleTestCase):
+
+    def at(self, *args):
+        return timezone.make_aware(datetime(*args))
+
+    def test_next_after(self):
+        self.assertEqual(Cron('*/15 * * * *').next_after(self.at(2026, 10, 19, 10, 7, 30)), self.at(2026, 10, 19, 10, 15))
+        self.assertEqual(Cron('30 3 * * *').next_after(self.at(2026, 10, 19, 3, 30)), self.at(2026, 10, 20, 3, 30))
+        # Weekdays at 9:00; 2026-10-24 is a Saturday.
+        self.assertEqual(Cron('0 9 * * 1-5').next_after(self.at(2026, 10, 23, 9, 0)), self.at(2026, 10, 26, 9, 0))
+        # Both day fields restricted: either one matches.
+        self.assertEqual(Cron('0 0 1 * 0').next_after(self.at(2026, 10, 19)), self.at(2026, 10, 25))
+        self.assertEqual(Cron('0 0 29 2 *').next_after(self.at(2026, 3, 1)), self.at(2028, 2, 29))
+
+    def test_invalid_expressions(self):
+        for expression in ('* * * *', '60 * * * *', '*/0 * * * *', 'a * * * *', '0 0 31 2 *'):
+            with self.assertRaises(ValueError, msg=expression):
+                Cron(expression).next_after(self.at(2026, 1, 1))
+
+class SchedulerTests(APITestCase):
+
+    def setUp(self):
+        self.calls = []
+
+    def make_job(self, name, schedule, rows=1):
+        def func():
+            self.calls.append(name)
+            if rows is None:
+                raise RuntimeError("boom")
+            return rows
+        return Job(name, func, schedule)
+
+    def test_runs_are_recorded_and_schedules_survive_a_restart(self):
+        jobs = {
+            'often': self.make_job('often', Every(60), rows=3),
+            'nightly': self.make_job('nightly', Cron('0 3 * * *')),
+            'broken': self.make_job('broken', Every(60), rows=None),
+        }
+        scheduler = Scheduler(jobs)
+        runs = scheduler.run_due()
+        self.assertEqual(sorted(self.calls), ['broken', 'often']) # The cron job waits for 3:00
+        often = JobRun.objects.get(name='often')
+        self.assertEqual((often.status, often.rows), ('ok', 3))
+        self.assertGreaterEqual(often.duration_ms, 0)
+        broken = JobRun.objects.get(name='broken')
+        self.assertEqual((broken.status, broken.error), ('failed', 'boom'))
+        self.assertEqual(len(runs), 2)
+
+        self.assertEqual(scheduler.run_due(), [])
+        restarted = Scheduler(jobs)
+        self.assertEqual(restarted.run_due(), []) # Last runs come from JobRun
+        self.assertEqual(len(restarted.run_due(timezone.now() + timedelta(seconds=61))), 2)
+        self.assertLessEqual(restarted.seconds_until_due(), 60)
+
+    def test_a_job_running_elsewhere_is_skipped(self):
+        job = self.make_job('locked', Every(60))
+        running = JobRun.objects.create(name='locked', started_at=timezone.now(), duration_ms=0, status='running')
+        self.assertIsNone(run_job(job))
+        self.assertEqual(self.calls, [])
+
+        # A run left 'running' by a crashed scheduler stops blocking the job after LOCK_SECONDS.
+        JobRun.objects.filter(pk=running.pk).update(started_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(run_job(job).status, 'ok')
+        self.assertEqual(self.calls, ['locked'])
+        running.refresh_from_db()
+        self.assertEqual(running.status, 'failed')
+
+    @override_settings(SCHEDULER={'JOBS': {'analyze_database': None, 'purge_expired': {'every': 10}}})
+    def test_command_lists_and_runs_jobs(self):
+        out = StringIO()
+        call_command('run_scheduler', list=True, stdout=out)
+        self.assertNotIn('analyze_database', out.getvalue())
+        self.assertIn('every 10s', out.getvalue())
+        call_command('run_scheduler', run=['optimize_database', 'purge_expired'], stdout=out)
+        self.assertEqual(sorted(JobRun.objects.values_list('name', flat=True)), ['optimize_database', 'purge_expired'])
+        with self.assertRaises(CommandError):
+            call_command('run_scheduler', run=['analyze_database'], stdout=out)
+
+@override_settings(SCHEDULER={'BATCH_SIZE': 2})
+class MaintenanceJobTests(APITestCase):
+
+    def setUp(self):
+        self.therapist_user = User.objects.create_user(
+            username='maintherapist', email='maintherapist@example.com', password='password123', is_therapist=True
+        )
+        self.cabin = Cabin.objects.create(name='Maintenance Cabin', capacity=3)
+        self.now = timezone.now()
+
+    def make_slot(self, hours, **fields):
+        start = self.now + timedelta(hours=hours)
+        return Booking.objects.create(
+            cabin=self.cabin, start_time=start, end_time=start + timedelta(hours=1), price=Decimal('40.00'), **fields
+        )
+
+    def test_expire_past_slots(self):
+        past_open = [self.make_slot(-hours) for hours in (1, 2, 3)]
+        past_booked = self.make_slot(-1, therapist=self.therapist_user, status='booked')
+        shared = self.make_slot(-1, seats_total=3, seats_taken=1)
+        Reservation.objects.create(slot=shared, therapist=self.therapist_user)
+        upcoming = self.make_slot(1)
+
+        self.assertEqual(expire_past_slots(), 3)
+        self.assertEqual(
+            dict(Booking.objects.values_list('pk', 'status')),
+            {**{slot.pk: 'expired' for slot in past_open}, past_booked.pk: 'booked', shared.pk: 'available', upcoming.pk: 'available'},
+        )
+        self.assertEqual(SlotChangeEvent.objects.filter(kind='expired').count(), 3)
+        self.assertEqual(expire_past_slots(), 0)
+
+        client = APIClient()
+        client.force_authenticate(user=self.therapist_user)
+        slots = client.get(reverse('api:therapist_slots_available')).data
+        self.assertEqual(sorted(slot['id'] for slot in slots), sorted([shared.pk, upcoming.pk]))
+
+    def test_purge_expired(self):
+        Session.objects.create(session_key='old', session_data='', expire_date=self.now - timedelta(days=1))
+        Session.objects.create(session_key='live', session_data='', expire_date=self.now + timedelta(days=1))
+        for days in (40, 1):
+            JobRun.objects.create(name='old', started_at=self.now - timedelta(days=days), duration_ms=1, status='ok')
+        caches['shared'].set('gone', 1, timeout=-1) # Stored already expired
+        caches['shared'].set('kept', 1)
+        self.assertEqual(purge_expired(), 3)
+        self.assertEqual(caches['shared'].get('kept'), 1)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+        self.assertEqual(JobRun.objects.count(), 1)
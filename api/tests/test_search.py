@@ -0,0 +1,89 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin
+from api.search import match_expression, search_terms
+
+User = get_user_model()
+
+class AdminSearchTests(APITestCase):
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            username='searchadmin', email='searchadmin@example.com', password='password123', is_admin=True
+        )
+        self.johanna = User.objects.create_user(
+            username='jsmith', email='johanna.smith@clinic.example', password='password123',
+            first_name='Johanna', last_name='Smith', phone_number='555-0199', is_therapist=True
+        )
+        self.john = User.objects.create_user(
+            username='johnny', email='jd@example.com', password='password123',
+            first_name='John', last_name='Doe', phone_number='555-0100', is_therapist=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+        self.url = reverse('api:admin_search_therapists')
+
+    def search(self, url, q, **params):
+        response = self.client.get(url, {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in response.data]
+
+    def test_prefix_matches_names_email_and_phone(self):
+        self.assertEqual(set(self.search(self.url, 'joh')), {self.johanna.pk, self.john.pk})
+        self.assertEqual(self.search(self.url, 'smi'), [self.johanna.pk])
+        self.assertEqual(self.search(self.url, 'clinic.exa'), [self.johanna.pk])
+        self.assertEqual(self.search(self.url, '0100'), [self.john.pk])
+        self.assertEqual(self.search(self.url, 'john doe'), [self.john.pk]) # Every word must match
+
+    def test_only_therapists_are_returned(self):
+        self.assertEqual(self.search(self.url, 'searchadmin'), [])
+
+    def test_username_match_ranks_first(self):
+        User.objects.create_user(
+            username='someone', email='johnny@example.com', password='password123', is_therapist=True
+        )
+        self.assertEqual(self.search(self.url, 'johnny')[0], self.john.pk)
+
+    def test_index_follows_updates_and_deletes(self):
+        self.john.last_name = 'Fairweather'
+        self.john.save()
+        self.assertEqual(self.search(self.url, 'fairw'), [self.john.pk])
+        self.assertEqual(self.search(self.url, 'doe'), [])
+        User.objects.filter(pk=self.john.pk).update(first_name='Jonathan') # Bulk writes are indexed too
+        self.assertEqual(self.search(self.url, 'jonat'), [self.john.pk])
+        self.john.delete()
+        self.assertEqual(self.search(self.url, 'fairw'), [])
+
+    @override_settings(ADMIN_SEARCH={'LIMIT': 3})
+    def test_results_are_capped(self):
+        for index in range(5):
+            User.objects.create_user(username=f'limit{index}', password='password123', is_therapist=True)
+        self.assertEqual(len(self.search(self.url, 'limit')), 3)
+        self.assertEqual(len(self.search(self.url, 'limit', limit=2)), 2)
+
+    @override_settings(ADMIN_SEARCH={'CANDIDATES': 3})
+    def test_candidates_are_the_best_ranked_matches(self):
+        for index in range(5):
+            User.objects.create_user(username=f'member{index}', email=f'pat{index}@example.com', password='password123', is_therapist=True)
+        newest = User.objects.create_user(username='pat', email='newest@example.com', password='password123', is_therapist=True)
+        self.assertEqual(self.search(self.url, 'pat')[0], newest.pk) # Username match, indexed after the cap
+
+    def test_short_or_symbol_only_queries_return_nothing(self):
+        self.assertEqual(self.search(self.url, 'j'), [])
+        self.assertEqual(self.search(self.url, '"*)(-'), [])
+        self.assertEqual(match_expression(search_terms('jo" OR x')), '"jo"* "OR"* "x"*')
+
+    def test_cabin_search(self):
+        quiet = Cabin.objects.create(name='Quiet Room', description='Soundproofed, with a massage table')
+        Cabin.objects.create(name='Garden Cabin', description='Opens onto the quiet garden')
+        url = reverse('api:admin_search_cabins')
+        self.assertEqual(self.search(url, 'quie')[0], quiet.pk) # Name outranks description
+        self.assertEqual(self.search(url, 'massage'), [quiet.pk])
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(user=self.john)
+        response = self.client.get(self.url, {'q': 'john'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,195 @@
+from django.apps import apps
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking, Reservation, SlotChangeEvent
+from api.seats import SeatUnavailable, take_seat
+from api.stats import find_inconsistencies
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from unittest.mock import patch
+
+User = get_user_model()
+
+@patch('api.views.send_app_email')
+class MultiSeatSlotTests(APITestCase):
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            username='seatadmin', email='seatadmin@example.com', password='password123', is_admin=True
+        )
+        self.therapists = [
+            User.objects.create_user(
+                username=f'seat{i}', email=f'seat{i}@example.com', password='password123', is_therapist=True
+            )
+            for i in range(3)
+        ]
+        self.cabin = Cabin.objects.create(name='Group Room', capacity=2)
+        self.start = timezone.now() + timedelta(days=7)
+        self.slot = Booking.objects.create(
+            cabin=self.cabin, start_time=self.start, end_time=self.start + timedelta(hours=2),
+            price=Decimal('30.00'), status='available', seats_total=2
+        )
+        self.client = APIClient()
+
+    def as_user(self, user):
+        self.client.force_authenticate(user=user)
+        return self.client
+
+    def book(self, user, slot=None):
+        return self.as_user(user).patch(reverse('api:therapist_slot_book', kwargs={'pk': (slot or self.slot).id}), {}, format='json')
+
+    def cancel(self, user):
+        return self.as_user(user).patch(reverse('api:therapist_booking_cancel', kwargs={'pk': self.slot.id}), {}, format='json')
+
+    def test_slot_creation_defaults_to_cabin_capacity(self, mock_send_email):
+        url = reverse('api:admin_slot_create')
+        data = {
+            'cabin': self.cabin.id, 'start_time': (self.start + timedelta(days=1)).isoformat(),
+            'end_time': (self.start + timedelta(days=1, hours=1)).isoformat(), 'price': '30.00',
+        }
+        response = self.as_user(self.admin_user).post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data['seats_total'], 2)
+        self.assertEqual(response.data['seats_taken'], 0)
+
+        response = self.client.post(url, dict(data, seats_total=3), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_seats_fill_up(self, mock_send_email):
+        response = self.book(self.therapists[0])
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data['status'], 'booked')
+        self.assertEqual(response.data['therapist'], self.therapists[0].id)
+        self.slot.refresh_from_db()
+        self.assertEqual((self.slot.status, self.slot.seats_taken), ('available', 1))
+
+        # Still listed for others, but the same therapist cannot take a second seat.
+        listed = self.as_user(self.therapists[1]).get(reverse('api:therapist_slots_available'))
+        self.assertIn(self.slot.id, [row['id'] for row in listed.data])
+        self.assertEqual(self.book(self.therapists[0]).status_code, status.HTTP_409_CONFLICT)
+
+        self.assertEqual(self.book(self.therapists[1]).status_code, status.HTTP_200_OK)
+        self.slot.refresh_from_db()
+        self.assertEqual((self.slot.status, self.slot.seats_taken), ('booked', 2))
+        self.assertEqual(self.book(self.therapists[2]).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Reservation.objects.filter(slot=self.slot, status='booked').count(), 2)
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(find_inconsistencies(), [])
+        # Events carry the slot's real status: it only became booked with the last seat.
+        self.assertEqual(
+            list(SlotChangeEvent.objects.order_by('pk').values_list('kind', 'previous_status', 'status')),
+            [('seat_taken', 'available', 'available'), ('seat_taken', 'available', 'booked')],
+        )
+
+    def test_guarded_update_never_oversells(self, mock_send_email):
+        Booking.objects.filter(pk=self.slot.pk).update(seats_taken=2)
+        with self.assertRaises(SeatUnavailable):
+            take_seat(self.slot, self.therapists[0])
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_my_bookings_show_own_reservation(self, mock_send_email):
+        self.book(self.therapists[0])
+        self.book(self.therapists[1])
+        response = self.as_user(self.therapists[0]).get(reverse('api:therapist_bookings_mine'), {'status': 'booked'})
+        self.assertEqual([(row['id'], row['status'], row['therapist']) for row in response.data],
+                         [(self.slot.id, 'booked', self.therapists[0].id)])
+
+    def test_cancel_frees_the_seat(self, mock_send_email):
+        self.book(self.therapists[0])
+        self.book(self.therapists[1])
+        response = self.cancel(self.therapists[0])
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data['status'], 'cancelled')
+        self.slot.refresh_from_db()
+        self.assertEqual((self.slot.status, self.slot.seats_taken), ('available', 1))
+
+        mine = self.as_user(self.therapists[0]).get(reverse('api:therapist_bookings_mine'))
+        self.assertEqual([row['status'] for row in mine.data], ['cancelled'])
+        self.assertEqual(self.cancel(self.therapists[2]).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(find_inconsistencies(), [])
+        self.assertEqual(
+            SlotChangeEvent.objects.order_by('pk').values_list('kind', 'previous_status', 'status').last(),
+            ('seat_released', 'booked', 'available'),
+        )
+
+        # The freed seat can be taken again.
+        self.assertEqual(self.book(self.therapists[2]).status_code, status.HTTP_200_OK)
+
+    def test_admin_cancel_cancels_every_seat(self, mock_send_email):
+        self.book(self.therapists[0])
+        self.book(self.therapists[1])
+        mock_send_email.reset_mock()
+        response = self.as_user(self.admin_user).patch(reverse('api:admin_booking_cancel', kwargs={'pk': self.slot.id}), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.slot.refresh_from_db()
+        self.assertEqual((self.slot.status, self.slot.seats_taken), ('cancelled', 0))
+        self.assertFalse(Reservation.objects.filter(status='booked').exists())
+        self.assertEqual(mock_send_email.call_count, 2)
+        self.assertEqual(find_inconsistencies(), [])
+
+    def test_cancel_body_cannot_change_the_slot(self, mock_send_email):
+        single = Booking.objects.create(
+            cabin=self.cabin, start_time=self.start + timedelta(days=1), end_time=self.start + timedelta(days=1, hours=1),
+            price=Decimal('30.00'), seats_total=1
+        )
+        self.book(self.therapists[0], single)
+        self.book(self.therapists[1])
+        body = {'seats_total': 5, 'price': '1.00', 'end_time': (self.start + timedelta(days=2)).isoformat()}
+        response = self.as_user(self.therapists[0]).patch(reverse('api:therapist_booking_cancel', kwargs={'pk': single.id}), body, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        response = self.as_user(self.admin_user).patch(reverse('api:admin_booking_cancel', kwargs={'pk': self.slot.id}), body, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        for slot, seats_total in ((single, 1), (self.slot, 2)):
+            slot.refresh_from_db()
+            self.assertEqual((slot.status, slot.seats_total, slot.price, slot.version), ('cancelled', seats_total, Decimal('30.00'), 1))
+            self.assertEqual(slot.end_time - slot.start_time, timedelta(hours=1 if slot is single else 2))
+
+    def test_delta_sync_of_my_bookings_includes_seats(self, mock_send_email):
+        url = reverse('api:therapist_bookings_mine')
+        with self.settings(DELTA_SYNC={'SETTLE_SECONDS': 0}):
+            cursor = self.as_user(self.therapists[0]).get(url, {'since': ''}).data['cursor']
+            self.book(self.therapists[0])
+            response = self.as_user(self.therapists[0]).get(url, {'since': cursor})
+        self.assertEqual([(row['id'], row['status']) for row in response.data['results']], [(self.slot.id, 'booked')])
+
+    def test_slot_with_reservations_cannot_be_deleted(self, mock_send_email):
+        self.book(self.therapists[0])
+        response = self.as_user(self.admin_user).delete(reverse('api:admin_slot_delete', kwargs={'pk': self.slot.id}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MergeDuplicateSeatRowsTests(APITestCase):
+
+    def test_duplicate_rows_become_one_slot_with_reservations(self):
+        therapists = [
+            User.objects.create_user(username=f'merge{i}', email=f'merge{i}@example.com', password='password123', is_therapist=True)
+            for i in range(3)
+        ]
+        cabin = Cabin.objects.create(name='Shared Room', capacity=4)
+        single = Cabin.objects.create(name='Single Room', capacity=1)
+        start = timezone.now() + timedelta(days=3)
+        end = start + timedelta(hours=1)
+        rows = [
+            ('booked', therapists[0]), ('booked', therapists[1]), ('cancelled', therapists[2]),
+            ('available', None), ('available', None),
+        ]
+        ids = [
+            Booking.objects.create(cabin=cabin, therapist=therapist, status=slot_status, price=Decimal('20.00'),
+                                   start_time=start, end_time=end).id
+            for slot_status, therapist in rows
+        ]
+        untouched = Booking.objects.create(cabin=single, status='available', price=Decimal('20.00'), start_time=start, end_time=end)
+
+        import_module('api.migrations.0010_merge_duplicate_seat_rows').merge_duplicate_seat_rows(apps, None)
+
+        self.assertEqual(sorted(Booking.objects.values_list('id', flat=True)), [ids[0], untouched.id])
+        slot = Booking.objects.get(pk=ids[0])
+        self.assertEqual((slot.seats_total, slot.seats_taken, slot.status, slot.therapist), (4, 2, 'available', None))
+        self.assertEqual(
+            sorted(Reservation.objects.values_list('therapist__username', 'status')),
+            [('merge0', 'booked'), ('merge1', 'booked'), ('merge2', 'cancelled')]
+        )
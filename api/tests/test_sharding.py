@@ -0,0 +1,152 @@
+from django.core.management import call_command
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import Cabin, Booking, Location, SlotChangeEvent
+from api.sharding import get_config, set_id_ranges, shard_for_pk, use_shard
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+User = get_user_model()
+
+SHARDS = ['default', 'clinic_a', 'clinic_b']
+
+
+@override_settings(SHARDING={'SHARDS': SHARDS})
+@patch('api.views.send_app_email')
+class ShardingTests(TransactionTestCase):
+    databases = set(SHARDS)
+
+    def setUp(self):
+        for alias in SHARDS:
+            set_id_ranges(alias)
+        self.admin_user = User.objects.create_user(
+            username='shardadmin', email='shardadmin@example.com', password='password123', is_admin=True
+        )
+        self.therapist_user = User.objects.create_user(
+            username='shardtherapist', email='shardtherapist@example.com', password='password123', is_therapist=True
+        )
+        self.north = Location.objects.create(name='North', slug='north', database='clinic_a')
+        self.south = Location.objects.create(name='South', slug='south', database='clinic_b')
+        self.north_cabin = Cabin.objects.create(name='North Cabin', location=self.north)
+        self.south_cabin = Cabin.objects.create(name='South Cabin', location=self.south)
+        self.client = APIClient()
+
+    def create_slot(self, cabin, hours_from_now, **kwargs):
+        start = timezone.now() + timedelta(hours=hours_from_now)
+        return Booking.objects.create(
+            cabin=cabin, start_time=start, end_time=start + timedelta(hours=1), price=Decimal('50.00'), **kwargs
+        )
+
+    def test_rows_live_on_their_location_shard_with_ids_in_its_range(self, mock_send_email):
+        span = get_config()['ID_SPAN']
+        slot = self.create_slot(self.south_cabin, 5)
+        self.assertEqual(self.south_cabin._state.db, 'clinic_b')
+        self.assertEqual(slot._state.db, 'clinic_b')
+        self.assertEqual(slot.pk // span, 2)
+        self.assertEqual(shard_for_pk(slot.pk), 'clinic_b')
+        self.assertTrue(Booking.objects.using('clinic_b').filter(pk=slot.pk).exists())
+        self.assertFalse(Booking.objects.using('default').filter(pk=slot.pk).exists())
+        self.assertFalse(Booking.objects.using('clinic_a').exists())
+
+    def test_users_and_locations_are_copied_to_every_shard(self, mock_send_email):
+        for alias in SHARDS[1:]:
+            self.assertTrue(User.objects.using(alias).filter(username='shardtherapist').exists())
+            self.assertEqual(Location.objects.using(alias).count(), 2)
+        self.therapist_user.phone_number = '555-0100'
+        self.therapist_user.save()
+        self.assertEqual(User.objects.using('clinic_a').get(pk=self.therapist_user.pk).phone_number, '555-0100')
+
+    def test_booking_by_pk_runs_on_the_slot_shard(self, mock_send_email):
+        slot = self.create_slot(self.north_cabin, 5)
+        self.client.force_authenticate(user=self.therapist_user)
+        response = self.client.put(reverse('api:therapist_slot_book', kwargs={'pk': slot.pk}), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        slot = Booking.objects.using('clinic_a').get(pk=slot.pk)
+        self.assertEqual(slot.status, 'booked')
+        self.assertEqual(slot.therapist_id, self.therapist_user.pk)
+        # The slot change event is written in the same (shard) transaction.
+        self.assertTrue(SlotChangeEvent.objects.using('clinic_a').filter(booking_id=slot.pk, kind='booked').exists())
+        self.assertFalse(SlotChangeEvent.objects.using('default').exists())
+
+    def test_admin_list_merges_every_shard_by_start_time(self, mock_send_email):
+        default_cabin = Cabin.objects.create(name='Legacy Cabin')
+        expected = [
+            self.create_slot(self.north_cabin, 3).pk,
+            self.create_slot(default_cabin, 4).pk,
+            self.create_slot(self.south_cabin, 5).pk,
+            self.create_slot(self.north_cabin, 6).pk,
+        ]
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('api:admin_bookings_all'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data], expected)
+
+        response = self.client.get(reverse('api:admin_bookings_all'), {'include_archived': 'true'})
+        self.assertEqual([row['id'] for row in response.data], expected)
+
+        response = self.client.get(reverse('api:admin_bookings_all'), {'location': 'south'})
+        self.assertEqual([row['id'] for row in response.data], [expected[2]])
+
+        # ?fields= without start_time still loads it for the merge instead of once per row.
+        refresh_from_db = Booking.refresh_from_db
+        with patch.object(Booking, 'refresh_from_db', autospec=True, side_effect=refresh_from_db) as refresh:
+            response = self.client.get(reverse('api:admin_bookings_all'), {'fields': 'id,status'})
+        self.assertEqual([row['id'] for row in response.data], expected)
+        refresh.assert_not_called()
+
+    def test_slot_search_covers_every_shard(self, mock_send_email):
+        default_cabin = Cabin.objects.create(name='Legacy Cabin')
+        expected = [
+            self.create_slot(self.north_cabin, 3).pk,
+            self.create_slot(default_cabin, 4).pk,
+            self.create_slot(self.south_cabin, 5).pk,
+        ]
+        self.create_slot(self.north_cabin, 6)
+        self.client.force_authenticate(user=self.therapist_user)
+        response = self.client.get(reverse('api:therapist_slots_search'), {'limit': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data], expected)
+
+    def test_delta_sync_across_locations_needs_a_location(self, mock_send_email):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('api:admin_bookings_all'), {'since': ''})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('api:admin_bookings_all'), {'since': '', 'location': 'north'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_therapist_stats_sum_every_shard(self, mock_send_email):
+        self.client.force_authenticate(user=self.therapist_user)
+        for cabin in (self.north_cabin, self.south_cabin):
+            slot = self.create_slot(cabin, 24 * 40)
+            response = self.client.put(reverse('api:therapist_slot_book', kwargs={'pk': slot.pk}), {}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse('api:therapist_stats'))
+        self.assertEqual(response.data['total_bookings'], 2)
+        self.assertEqual(response.data['spend_to_date'], Decimal('100.00'))
+        out = StringIO()
+        call_command('rebuild_therapist_stats', stdout=out)
+        self.assertIn(f"for {2 * len(SHARDS)} users", out.getvalue()) # Every shard's rebuild is counted
+
+    def test_booking_analytics_cover_every_shard(self, mock_send_email):
+        for cabin in (self.north_cabin, self.south_cabin):
+            self.create_slot(cabin, -2, therapist=self.therapist_user, status='booked')
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('api:admin_booking_analytics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['totals']['bookings'], response.data['totals']['revenue']), (2, 100.0))
+        self.assertEqual({row['cabin_name'] for row in response.data['by_cabin']}, {'North Cabin', 'South Cabin'})
+        response = self.client.get(reverse('api:admin_booking_analytics'), {'location': 'north'})
+        self.assertEqual([row['cabin_name'] for row in response.data['by_cabin']], ['North Cabin'])
+
+    def test_use_shard_pins_queries(self, mock_send_email):
+        self.create_slot(self.north_cabin, 5)
+        with use_shard('clinic_a'):
+            self.assertEqual(Booking.objects.count(), 1)
+        with use_shard('clinic_b'):
+            self.assertEqual(Booking.objects.count(), 0)
@@ -0,0 +1,209 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from api.models import Cabin, Booking, SlotChangeEvent
+from api.events import format_sse, publisher, record_slot_change, stream_slot_changes
+from asgiref.sync import async_to_sync, sync_to_async
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+import asyncio
+import json
+
+User = get_user_model()
+
+@patch('api.views.send_app_email')
+class SlotChangeRecordingTests(APITestCase):
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            username='eventsadmin', email='eventsadmin@example.com', password='password123', is_admin=True
+        )
+        self.therapist_user = User.objects.create_user(
+            username='eventstherapist', email='eventstherapist@example.com', password='password123', is_therapist=True
+        )
+        self.cabin = Cabin.objects.create(name='Events Cabin')
+        self.start = timezone.now() + timedelta(days=10)
+        self.client = APIClient()
+
+    def kinds(self):
+        return list(SlotChangeEvent.objects.order_by('pk').values_list('kind', flat=True))
+
+    def test_write_paths_record_events(self, mock_send_email):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(reverse('api:admin_slot_create'), {
+            'cabin': self.cabin.id, 'start_time': self.start.isoformat(),
+            'end_time': (self.start + timedelta(hours=1)).isoformat(), 'price': '50.00',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        slot_id = response.data['id']
+
+        self.client.force_authenticate(user=self.therapist_user)
+        self.client.patch(reverse('api:therapist_slot_book', kwargs={'pk': slot_id}), {}, format='json')
+        self.client.patch(reverse('api:therapist_booking_cancel', kwargs={'pk': slot_id}), {}, format='json')
+
+        other = Booking.objects.create(
+            cabin=self.cabin, start_time=self.start + timedelta(hours=2),
+            end_time=self.start + timedelta(hours=3), price=Decimal('40.00'), status='available'
+        )
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.delete(reverse('api:admin_slot_delete', kwargs={'pk': other.id}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(self.kinds(), ['created', 'booked', 'cancelled', 'deleted'])
+        deleted = SlotChangeEvent.objects.get(kind='deleted')
+        self.assertEqual(deleted.booking_id, other.id)
+        self.assertEqual(deleted.cabin_id, self.cabin.id)
+
+    def test_slot_history(self, mock_send_email):
+        self.client.force_authenticate(user=self.admin_user)
+        slot_id = self.client.post(reverse('api:admin_slot_create'), {
+            'cabin': self.cabin.id, 'start_time': self.start.isoformat(),
+            'end_time': (self.start + timedelta(hours=1)).isoformat(), 'price': '50.00',
+        }, format='json').data['id']
+        self.client.force_authenticate(user=self.therapist_user)
+        self.client.patch(reverse('api:therapist_slot_book', kwargs={'pk': slot_id}), {}, format='json')
+        self.client.patch(reverse('api:therapist_booking_cancel', kwargs={'pk': slot_id}), {}, format='json')
+        url = reverse('api:admin_slot_history', kwargs={'pk': slot_id})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(e['kind'], e['actor_username'], e['previous_status'], e['status'], e['previous_therapist_id'], e['therapist_id'])
+             for e in response.data],
+            [
+                ('created', 'eventsadmin', '', 'available', None, None),
+                ('booked', 'eventstherapist', 'available', 'booked', None, self.therapist_user.id),
+                ('cancelled', 'eventstherapist', 'booked', 'cancelled', self.therapist_user.id, self.therapist_user.id),
+            ],
+        )
+        month = timezone.localtime().strftime('%Y-%m')
+        self.assertEqual(len(self.client.get(url, {'month': month}).data), 3)
+        self.assertEqual(self.client.get(url, {'month': '2001-01'}).data, [])
+        self.assertEqual(self.client.get(url, {'month': 'soon'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_format_sse(self, mock_send_email):
+        slot = Booking.objects.create(
+            cabin=self.cabin, start_time=self.start, end_time=self.start + timedelta(hours=1),
+            price=Decimal('40.00'), status='available'
+        )
+        event = record_slot_change(slot, 'created')
+        message = format_sse(event)
+        self.assertTrue(message.startswith(f'id: {event.pk}\nevent: created\ndata: '))
+        self.assertTrue(message.endswith('\n\n'))
+        payload = json.loads(message.split('data: ', 1)[1])
+        self.assertEqual(payload['slot'], slot.id)
+        self.assertEqual(payload['cabin'], self.cabin.id)
+
+
+@override_settings(SLOT_EVENTS={'POLL_INTERVAL': 0.01, 'HEARTBEAT': 5.0})
+class SlotChangeStreamTests(APITestCase):
+
+    def setUp(self):
+        self.cabin1 = Cabin.objects.create(name='Stream Cabin A')
+        self.cabin2 = Cabin.objects.create(name='Stream Cabin B')
+        self.start = timezone.now() + timedelta(days=10)
+
+    def make_event(self, cabin, kind='created'):
+        slot = Booking.objects.create(
+            cabin=cabin, start_time=self.start, end_time=self.start + timedelta(hours=1),
+            price=Decimal('40.00'), status='available'
+        )
+        return record_slot_change(slot, kind)
+
+    def collect(self, count, cabin_ids=None, last_event_id=None, during=None):
+        """Open a stream, run `during` once subscribed, and return the next `count` messages."""
+        async def run():
+            stream = stream_slot_changes(cabin_ids, last_event_id)
+            messages = [await stream.__anext__()] # retry: ...
+            if during:
+                await sync_to_async(during)()
+            try:
+                for _ in range(count):
+                    messages.append(await asyncio.wait_for(stream.__anext__(), timeout=2))
+            finally:
+                await stream.aclose()
+                if publisher._task:
+                    publisher._task.cancel()
+            return messages
+        return async_to_sync(run)()
+
+    def test_live_events_are_filtered_by_cabin(self):
+        def write():
+            self.make_event(self.cabin2)
+            self.make_event(self.cabin1, 'booked')
+        messages = self.collect(1, cabin_ids=[self.cabin1.id], during=write)
+        self.assertTrue(messages[0].startswith('retry: '))
+        self.assertIn('event: booked', messages[1])
+
+    def test_resume_from_last_event_id(self):
+        first = self.make_event(self.cabin1)
+        second = self.make_event(self.cabin1, 'booked')
+        third = self.make_event(self.cabin2, 'cancelled')
+        messages = self.collect(2, last_event_id=first.pk)
+        self.assertTrue(messages[1].startswith(f'id: {second.pk}\n'))
+        self.assertTrue(messages[2].startswith(f'id: {third.pk}\n'))
+
+    @override_settings(SLOT_EVENTS={'POLL_INTERVAL': 0.01, 'BUFFER_SIZE': 1})
+    def test_resume_too_far_behind_sends_reset(self):
+        first = self.make_event(self.cabin1)
+        self.make_event(self.cabin1)
+        self.make_event(self.cabin1)
+        messages = self.collect(1, last_event_id=first.pk)
+        self.assertTrue(messages[1].startswith('event: reset'))
+
+
+class SlotEventStreamViewTests(APITestCase):
+
+    def setUp(self):
+        self.url = reverse('api:slot_events')
+        self.regular_user = User.objects.create_user(
+            username='eventsregular', email='eventsregular@example.com', password='password123'
+        )
+        self.therapist_user = User.objects.create_user(
+            username='eventsviewer', email='eventsviewer@example.com', password='password123', is_therapist=True
+        )
+
+    def token_for(self, user):
+        return str(RefreshToken.for_user(user).access_token)
+
+    def ticket_for(self, user):
+        response = self.client.post(reverse('api:slot_events_ticket'), HTTP_AUTHORIZATION=f'Bearer {self.token_for(user)}')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['ticket']
+
+    def test_requires_valid_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get(self.url, {'ticket': 'garbage'}).status_code, status.HTTP_401_UNAUTHORIZED)
+        # Access tokens are only accepted in the Authorization header, never in the URL.
+        response = self.client.get(self.url, {'token': self.token_for(self.therapist_user)})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_requires_therapist_or_admin(self):
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {self.token_for(self.regular_user)}')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.post(reverse('api:slot_events_ticket'), HTTP_AUTHORIZATION=f'Bearer {self.token_for(self.regular_user)}')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.url, {'ticket': self.ticket_for(self.therapist_user), 'cabin_ids': 'a,b'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_opens_event_stream(self):
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {self.token_for(self.therapist_user)}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(response.streaming)
+
+    def test_ticket_opens_one_stream(self):
+        ticket = self.ticket_for(self.therapist_user)
+        response = self.client.get(self.url, {'ticket': ticket})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(self.client.get(self.url, {'ticket': ticket}).status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,85 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking
+from datetime import datetime, timedelta
+import pytz
+from decimal import Decimal
+from unittest import skipUnless
+
+User = get_user_model()
+
+class TherapistSlotSearchTests(APITestCase):
+
+    def setUp(self):
+        self.utc = pytz.UTC
+        self.therapist_user = User.objects.create_user(
+            username='searcher', email='searcher@example.com', password='password123', is_therapist=True
+        )
+        self.cabin1 = Cabin.objects.create(name='Search Cabin A')
+        self.cabin2 = Cabin.objects.create(name='Search Cabin B')
+        # Monday 2030-06-03 onwards
+        self.monday = self.utc.localize(datetime(2030, 6, 3))
+
+        self.short_morning = self.make_slot(self.cabin1, 0, 8, 1, '50.00')    # Mon 08-09
+        self.long_morning = self.make_slot(self.cabin1, 0, 10, 2, '90.00')    # Mon 10-12
+        self.expensive = self.make_slot(self.cabin2, 1, 10, 3, '300.00')      # Tue 10-13
+        self.tuesday_long = self.make_slot(self.cabin2, 1, 14, 2, '80.00')    # Tue 14-16
+        self.saturday_long = self.make_slot(self.cabin1, 5, 10, 2, '80.00')   # Sat 10-12
+        self.booked = self.make_slot(self.cabin1, 0, 9, 3, '70.00', therapist=self.therapist_user, slot_status='booked')
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.therapist_user)
+        self.url = reverse('api:therapist_slots_search')
+
+    def make_slot(self, cabin, day, hour, hours, price, therapist=None, slot_status='available'):
+        start = self.monday + timedelta(days=day, hours=hour)
+        return Booking.objects.create(
+            cabin=cabin, therapist=therapist, status=slot_status, price=Decimal(price),
+            start_time=start, end_time=start + timedelta(hours=hours),
+        )
+
+    def search(self, **params):
+        params.setdefault('start', self.monday.isoformat())
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [slot['id'] for slot in response.data]
+
+    def test_earliest_two_hour_slot_after_nine(self):
+        self.assertEqual(self.search(min_duration=120, time_from='09:00', limit=1), [self.long_morning.id])
+
+    def test_results_are_ordered_and_limited(self):
+        self.assertEqual(
+            self.search(min_duration=120, limit=3),
+            [self.long_morning.id, self.expensive.id, self.tuesday_long.id]
+        )
+
+    def test_filters_combine(self):
+        self.assertEqual(
+            self.search(min_duration=120, max_price='100', weekdays='1,5', time_to='13:00'),
+            [self.saturday_long.id]
+        )
+        self.assertEqual(self.search(cabin_ids=f'{self.cabin2.id}', max_price='100'), [self.tuesday_long.id])
+
+    def test_booked_slots_are_excluded(self):
+        self.assertNotIn(self.booked.id, self.search(limit=50))
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.url, {'weekdays': '1,9'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'time_from': '12:00', 'time_to': '09:00'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(connection.vendor == 'sqlite', "Query plan format is SQLite specific")
+    def test_search_walks_index_without_sorting(self):
+        with CaptureQueriesContext(connection) as context:
+            self.search(min_duration=120, time_from='09:00', cabin_ids=f'{self.cabin1.id},{self.cabin2.id}', limit=1)
+        sql = [query['sql'] for query in context.captured_queries if 'api_booking' in query['sql']][-1]
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('booking_status_start_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
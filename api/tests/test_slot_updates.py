@@ -0,0 +1,91 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking, SlotChangeEvent
+from api.availability import availability_index
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+User = get_user_model()
+
+class SlotUpdateTests(APITestCase):
+
+    def setUp(self):
+        availability_index.invalidate()
+        self.admin_user = User.objects.create_user(
+            username='editadmin', email='editadmin@example.com', password='password123', is_admin=True
+        )
+        self.therapist_user = User.objects.create_user(
+            username='edittherapist', email='edittherapist@example.com', password='password123', is_therapist=True
+        )
+        self.cabin = Cabin.objects.create(name='Edit Cabin', capacity=1)
+        self.other_cabin = Cabin.objects.create(name='Other Edit Cabin', capacity=1)
+        self.day = timezone.localdate() + timedelta(days=5)
+        self.slot = self.make_slot(10, 11)
+        self.url = reverse('api:admin_slot_detail', kwargs={'pk': self.slot.pk})
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+
+    def at(self, hour):
+        return timezone.make_aware(datetime.combine(self.day, time(hour)))
+
+    def make_slot(self, start_hour, end_hour, cabin=None, **fields):
+        return Booking.objects.create(
+            cabin=cabin or self.cabin, start_time=self.at(start_hour), end_time=self.at(end_hour), price=Decimal('40.00'), **fields
+        )
+
+    def patch(self, data, version=None):
+        headers = {'HTTP_IF_MATCH': f'"{version}"'} if version is not None else {}
+        return self.client.patch(self.url, data, format='json', **headers)
+
+    def test_edit_keeps_id_and_bumps_version(self):
+        response = self.client.get(self.url)
+        self.assertEqual((response['ETag'], response.data['version']), ('"1"', 1))
+        self.assertEqual(availability_index.calendar(self.cabin.id, self.day, 1)[0]['free'], [('10:00', '11:00')])
+
+        response = self.patch({'start_time': self.at(14).isoformat(), 'end_time': self.at(16).isoformat(), 'price': '55.00'}, 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual((response.data['id'], response.data['version'], response['ETag']), (self.slot.pk, 2, '"2"'))
+        self.slot.refresh_from_db()
+        self.assertEqual((self.slot.start_time, self.slot.price), (self.at(14), Decimal('55.00')))
+        event = SlotChangeEvent.objects.get()
+        self.assertEqual((event.kind, event.actor_id, event.previous_start_time), ('updated', self.admin_user.pk, self.at(10)))
+        # The index frees the old range and offers the new one.
+        self.assertEqual(availability_index.calendar(self.cabin.id, self.day, 1)[0]['free'], [('14:00', '16:00')])
+
+        # A second writer still holding version 1 loses instead of overwriting.
+        response = self.patch({'price': '60.00'}, 1)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(self.patch({'price': '60.00', 'version': 2}).status_code, status.HTTP_200_OK)
+
+    def test_version_is_required(self):
+        self.assertEqual(self.patch({'price': '60.00'}).status_code, status.HTTP_428_PRECONDITION_REQUIRED)
+        response = self.client.patch(self.url, {'price': '60.00'}, format='json', HTTP_IF_MATCH='latest')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.patch({}, 1).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Booking.objects.get(pk=self.slot.pk).version, 1)
+
+    def test_overlapping_time_ranges_are_rejected(self):
+        self.make_slot(12, 13, therapist=self.therapist_user, status='booked')
+        self.make_slot(8, 9, status='cancelled')
+        self.make_slot(10, 14, cabin=self.other_cabin)
+        response = self.patch({'end_time': self.at(13).isoformat()}, 1)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn('overlaps', response.data['detail'])
+        response = self.patch({'start_time': self.at(8).isoformat()}, 1) # Only the cancelled slot is in the way
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        response = self.patch({'start_time': self.at(11).isoformat()}, 2) # After the stored end
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_open_slots_can_be_edited(self):
+        Booking.objects.filter(pk=self.slot.pk).update(held_by=self.therapist_user, hold_expires_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(self.patch({'price': '60.00'}, 1).status_code, status.HTTP_409_CONFLICT)
+        Booking.objects.filter(pk=self.slot.pk).update(held_by=None, hold_expires_at=None, therapist=self.therapist_user, status='booked')
+        self.assertEqual(self.patch({'price': '60.00'}, 1).status_code, status.HTTP_409_CONFLICT)
+        missing = reverse('api:admin_slot_detail', kwargs={'pk': self.slot.pk + 1000})
+        response = self.client.patch(missing, {'price': '60.00'}, format='json', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=self.therapist_user)
+        self.assertEqual(self.patch({'price': '60.00'}, 1).status_code, status.HTTP_403_FORBIDDEN)
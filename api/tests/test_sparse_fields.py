@@ -0,0 +1,83 @@
+from django.db import connection
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking, Reservation
+from datetime import timedelta
+from decimal import Decimal
+
+User = get_user_model()
+
+class SparseFieldsTests(APITestCase):
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            username='sparseadmin', email='sparseadmin@example.com', password='password123', is_admin=True
+        )
+        self.therapist_user = User.objects.create_user(
+            username='sparsetherapist', email='sparsetherapist@example.com', password='password123', is_therapist=True
+        )
+        self.cabin = Cabin.objects.create(name='Sparse Cabin', description='Quiet', capacity=3)
+        start = timezone.now() + timedelta(days=1)
+        self.slot = Booking.objects.create(
+            cabin=self.cabin, start_time=start, end_time=start + timedelta(hours=1), price=Decimal('50.00')
+        )
+        self.client = APIClient()
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, [query['sql'] for query in queries.captured_queries if 'api_booking' in query['sql']]
+
+    def test_fields_trim_output_and_query(self):
+        self.client.force_authenticate(user=self.therapist_user)
+        url = reverse('api:therapist_slots_available')
+        response, queries = self.get(url, fields='id,start_time,end_time,cabin_name')
+        self.assertEqual(list(response.data[0]), ['id', 'cabin_name', 'start_time', 'end_time'])
+        self.assertEqual(response.data[0]['cabin_name'], 'Sparse Cabin')
+        (sql,) = queries
+        self.assertNotIn('JOIN', sql) # cabin_name comes from the cabin catalog, not a join
+        self.assertNotIn('"api_booking"."price"', sql)
+
+        # therapist_username keeps the therapist join.
+        response, queries = self.get(url, fields='id,therapist_username')
+        self.assertIn('JOIN "api_user"', queries[0])
+        self.assertNotIn('"api_user"."email"', queries[0])
+
+    def test_without_fields_the_full_representation_is_returned(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response, _ = self.get(reverse('api:admin_bookings_all'))
+        self.assertIn('cabin_name', response.data[0])
+        self.assertIn('price', response.data[0])
+
+    def test_unknown_field_is_rejected(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('api:admin_bookings_all'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', str(response.data['fields']))
+
+    def test_archived_history_and_delta_sync_honour_fields(self):
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('api:admin_bookings_all')
+        response, _ = self.get(url, include_archived='true', fields='id,archived')
+        self.assertEqual(response.data, [{'id': self.slot.pk, 'archived': False}])
+        response, _ = self.get(url, since='', fields='id,status')
+        self.assertEqual(response.data['results'], [{'id': self.slot.pk, 'status': 'available'}])
+
+    def test_my_bookings_keep_seat_status_with_fields(self):
+        self.slot.seats_total = 3
+        self.slot.save()
+        Reservation.objects.create(slot=self.slot, therapist=self.therapist_user, status='cancelled')
+        self.client.force_authenticate(user=self.therapist_user)
+        response, _ = self.get(reverse('api:therapist_bookings_mine'), fields='id,status')
+        self.assertEqual(response.data, [{'id': self.slot.pk, 'status': 'cancelled'}])
+
+    def test_cabin_list_fields(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('api:admin_cabin-list'), {'fields': 'id,name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{'id': self.cabin.pk, 'name': 'Sparse Cabin'}])
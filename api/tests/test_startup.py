@@ -0,0 +1,37 @@
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.test import SimpleTestCase
+from api.startup import get_config, warm_up
+
+IMPORT_URLS = """
+import json, sys, time
+import django
+django.setup()
+began = time.perf_counter()
+import api.urls
+print(json.dumps({'ms': (time.perf_counter() - began) * 1000, 'numpy': 'numpy' in sys.modules}))
+"""
+
+class StartupTests(SimpleTestCase):
+
+    def import_urls(self):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_URLS], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'therapy_booking.settings'},
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    def test_import_api_urls_stays_within_budget(self):
+        runs = [self.import_urls() for _ in range(3)] # Best of three, to ride out a noisy machine
+        budget = get_config()['URLS_IMPORT_BUDGET_MS']
+        best = min(run['ms'] for run in runs)
+        self.assertLess(best, budget, f"import api.urls took {best:.0f} ms (budget {budget} ms)")
+        # Heavy optional modules stay deferred until a path (or the warm-up) needs them.
+        self.assertFalse(any(run['numpy'] for run in runs))
+
+    def test_warm_up_is_repeatable(self):
+        warm_up()
+        self.assertGreaterEqual(warm_up(), 0)
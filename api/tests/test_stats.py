@@ -0,0 +1,106 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking, TherapistMonthlyStats
+from api.stats import find_inconsistencies, rebuild_stats
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+User = get_user_model()
+
+@patch('api.views.send_app_email')
+class TherapistStatsTests(APITestCase):
+
+    def setUp(self):
+        self.therapist_user = User.objects.create_user(
+            username='statsuser', email='statsuser@example.com', password='password123', is_therapist=True
+        )
+        self.admin_user = User.objects.create_user(
+            username='statsadmin2', email='statsadmin2@example.com', password='password123', is_admin=True
+        )
+        self.cabin = Cabin.objects.create(name='Stats Cabin')
+        start = timezone.now() + timedelta(days=40)
+        self.slot = Booking.objects.create(
+            cabin=self.cabin, start_time=start, end_time=start + timedelta(hours=2),
+            price=Decimal('80.00'), status='available'
+        )
+        self.second_slot = Booking.objects.create(
+            cabin=self.cabin, start_time=start + timedelta(hours=3), end_time=start + timedelta(hours=4),
+            price=Decimal('40.00'), status='available'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.therapist_user)
+
+    def book(self, slot):
+        response = self.client.patch(reverse('api:therapist_slot_book', kwargs={'pk': slot.id}), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def get_stats(self):
+        response = self.client.get(reverse('api:therapist_stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_booking_updates_stats(self, mock_send_email):
+        self.book(self.slot)
+        self.book(self.second_slot)
+        stats = self.get_stats()
+        self.assertEqual(stats['upcoming_bookings'], 2)
+        self.assertEqual(stats['total_hours_booked'], 3.0)
+        self.assertEqual(stats['spend_to_date'], Decimal('120.00'))
+        self.assertEqual(stats['cancellations'], 0)
+        self.assertEqual(find_inconsistencies(), [])
+
+    def test_upcoming_counts_seats_this_month(self, mock_send_email):
+        start = timezone.now() + timedelta(hours=1)
+        shared = Booking.objects.create(
+            cabin=self.cabin, start_time=start, end_time=start + timedelta(hours=1),
+            price=Decimal('30.00'), status='available', seats_total=3
+        )
+        self.book(shared)
+        self.book(self.slot)
+        self.assertEqual(self.get_stats()['upcoming_bookings'], 2)
+
+    def test_cancel_and_admin_cancel_update_stats(self, mock_send_email):
+        self.book(self.slot)
+        self.book(self.second_slot)
+        response = self.client.patch(reverse('api:therapist_booking_cancel', kwargs={'pk': self.slot.id}), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.patch(reverse('api:admin_booking_cancel', kwargs={'pk': self.second_slot.id}), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=self.therapist_user)
+        stats = self.get_stats()
+        self.assertEqual(stats['upcoming_bookings'], 0)
+        self.assertEqual(stats['spend_to_date'], Decimal('0.00'))
+        self.assertEqual(stats['cancellations'], 2)
+        self.assertEqual(find_inconsistencies(), [])
+
+    def test_rebuild_repairs_drift(self, mock_send_email):
+        self.book(self.slot)
+        TherapistMonthlyStats.objects.update(booked_count=5)
+        self.assertEqual(find_inconsistencies()[0][2], 'booked_count')
+
+        rebuild_stats(batch_size=1)
+        self.assertEqual(find_inconsistencies(), [])
+        self.assertEqual(self.get_stats()['upcoming_bookings'], 1)
+
+    def test_rebuild_command_check(self, mock_send_email):
+        self.book(self.slot)
+        TherapistMonthlyStats.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_therapist_stats', '--check', stdout=StringIO())
+        call_command('rebuild_therapist_stats', '--batch-size', '1', stdout=StringIO())
+        call_command('rebuild_therapist_stats', '--check', stdout=StringIO())
+
+    def test_stats_requires_therapist(self, mock_send_email):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('api:therapist_stats'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
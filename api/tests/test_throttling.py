@@ -0,0 +1,88 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from api.models import Cabin, Booking
+from api.throttling import hit
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+User = get_user_model()
+cache = caches['shared']
+
+class RateLimitTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='limited', email='limited@example.com', password='password123', is_therapist=True)
+
+    def tearDown(self):
+        cache.clear()
+
+    def login(self, username='limited', ip='203.0.113.1', **headers):
+        return self.client.post(
+            reverse('api:token_obtain_pair'), {'username': username, 'password': 'wrong'}, format='json', REMOTE_ADDR=ip, **headers
+        )
+
+    @override_settings(RATE_LIMITS={'RATES': {'login_account': '2/min', 'login_ip': '100/min'}})
+    def test_login_is_limited_per_account_across_ips(self):
+        self.assertEqual(self.login(ip='203.0.113.1').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.login(ip='203.0.113.2').status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.login(username='LIMITED', ip='203.0.113.3')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+        # Another account from the same IP is unaffected.
+        self.assertEqual(self.login(username='someone', ip='203.0.113.3').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(RATE_LIMITS={'RATES': {'login_ip': '2/min', 'login_account': None}})
+    def test_login_is_limited_per_ip(self):
+        for username in ('a', 'b'):
+            self.assertEqual(self.login(username=username).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.login(username='c').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.login(username='c', ip='203.0.113.9').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(RATE_LIMITS={'RATES': {'login_ip': '2/min', 'login_account': None}})
+    def test_forwarded_for_does_not_change_the_client_ip(self):
+        responses = [self.login(username=f'user{i}', HTTP_X_FORWARDED_FOR=f'198.51.100.{i}') for i in range(6)]
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [status.HTTP_401_UNAUTHORIZED] * 2 + [status.HTTP_429_TOO_MANY_REQUESTS] * 4,
+        )
+
+    @override_settings(RATE_LIMITS={'RATES': {'password_reset_account': '1/hour'}})
+    @patch('api.views.send_app_email')
+    def test_password_reset_is_limited(self, mock_send_email):
+        url = reverse('api:password_reset_request')
+        self.assertEqual(self.client.post(url, {'email': 'limited@example.com'}, format='json').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.post(url, {'email': 'limited@example.com'}, format='json').status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(RATE_LIMITS={'RATES': {'booking': '1/min'}})
+    @patch('api.views.send_app_email')
+    def test_booking_endpoints_have_their_own_limit(self, mock_send_email):
+        cabin = Cabin.objects.create(name='Throttle Cabin')
+        start = timezone.now() + timedelta(days=1)
+        slots = [
+            Booking.objects.create(cabin=cabin, start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i + 1),
+                                   price=Decimal('30.00'), status='available')
+            for i in range(2)
+        ]
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        book = lambda slot: client.patch(reverse('api:therapist_slot_book', kwargs={'pk': slot.id}), {}, format='json')
+        self.assertEqual(book(slots[0]).status_code, status.HTTP_200_OK)
+        self.assertEqual(book(slots[1]).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # Reads are not counted, and login keeps its own limits.
+        self.assertEqual(client.get(reverse('api:therapist_slots_available')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.login().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_sliding_window_weights_the_previous_window(self):
+        for _ in range(10):
+            hit(cache, 'window-test', 60, now=600 + 30)
+        estimate, previous, count, elapsed = hit(cache, 'window-test', 60, now=660 + 15)
+        self.assertEqual((previous, count, elapsed), (10, 1, 15))
+        self.assertAlmostEqual(estimate, 10 * 0.75 + 1)
@@ -3,6 +3,7 @@ from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from api.models import Cabin, Booking
+from api.deletion import run_pending_jobs
 from datetime import datetime, timedelta
 import pytz
 from decimal import Decimal
@@ -77,7 +78,11 @@ class AdminViewTests(APITestCase):
     def test_admin_delete_cabin_success(self):
         url = reverse('api:admin_cabin-detail', kwargs={'pk': self.cabin1.id})
         response = self.client.delete(url)
-        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        # Hidden at once, deleted by the background job (see test_deletion.py)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        run_pending_jobs()
         self.assertFalse(Cabin.objects.filter(id=self.cabin1.id).exists())
 
     def test_admin_cabin_access_denied_for_therapist(self):
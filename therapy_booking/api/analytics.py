@@ -0,0 +1,228 @@
+"""
+Utilization and revenue analytics computed with NumPy.
+
+Bookings in the requested range are pulled as six compact columns with a
+single raw query (no model instances and no per-row field conversion: the
+database returns epoch seconds and status codes) and all aggregates are
+computed with vectorized array operations.
+"""
+from datetime import datetime, timedelta
+
+from django.db import connections
+from django.db.models import BigIntegerField, Case, FloatField, Func, Value, When
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError: # pragma: no cover - numpy is required for analytics only
+    np = None
+
+from .models import Booking, BookingArchive
+from .sharding import current_db, fan_out
+
+SECONDS_PER_HOUR = 3600
+HOURS_PER_WEEK = 7 * 24
+# 1970-01-01 was a Thursday; shifts epoch days so that Monday == 0.
+EPOCH_WEEKDAY = 3
+
+
+STATUS_CODES = {'available': 0, 'booked': 1, 'cancelled': 2, 'expired': 3}
+OTHER_STATUS_CODE = 4
+
+if np is not None:
+    ROW_DTYPE = np.dtype([
+        ('cabin_id', np.int64),
+        ('therapist_id', np.int64),
+        ('start', np.int64),
+        ('end', np.int64),
+        ('status', np.int8),
+        ('price', np.float64),
+    ])
+
+
+class AnalyticsUnavailable(Exception):
+    pass
+
+
+class EpochSeconds(Func):
+    """
+    Seconds since the Unix epoch, computed by the database so rows come back
+    as plain integers instead of datetimes parsed one by one in Python.
+    """
+    output_field = BigIntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="CAST(strftime('%%%%s', %(expressions)s) AS INTEGER)", **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="CAST(EXTRACT(EPOCH FROM %(expressions)s) AS BIGINT)", **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="UNIX_TIMESTAMP(%(expressions)s)", **extra_context)
+
+
+def fetch_booking_columns(start, end, using='default'):
+    """
+    Return (cabin_ids, therapist_ids, starts, ends, status_codes, prices) as
+    NumPy arrays for bookings (live and archived) starting in [start, end).
+    Times are epoch seconds, status codes follow STATUS_CODES, a missing
+    therapist is -1 and a missing price is 0. `using` is a database alias,
+    or a list of location shards, fetched in parallel and concatenated.
+    """
+    if np is None:
+        raise AnalyticsUnavailable("NumPy is required for booking analytics.")
+    if not isinstance(using, str):
+        parts = fan_out(lambda: fetch_booking_columns(start, end, using=current_db()), aliases=using)
+        return tuple(np.concatenate(column) for column in zip(*parts))
+    records = np.concatenate([_fetch_records(model, start, end, using) for model in (Booking, BookingArchive)])
+    return tuple(records[name] for name in ROW_DTYPE.names)
+
+
+def _fetch_records(model, start, end, using):
+    queryset = (
+        model.objects.using(using)
+        .filter(start_time__gte=start, start_time__lt=end)
+        .annotate(
+            therapist_or_none=Coalesce('therapist_id', Value(-1)),
+            start_epoch=EpochSeconds('start_time'),
+            end_epoch=EpochSeconds('end_time'),
+            status_code=Case(
+                *[When(status=name, then=Value(code)) for name, code in STATUS_CODES.items()],
+                default=Value(OTHER_STATUS_CODE),
+            ),
+            price_or_zero=Coalesce(Cast('price', FloatField()), Value(0.0)),
+        )
+        .values_list('cabin_id', 'therapist_or_none', 'start_epoch', 'end_epoch', 'status_code', 'price_or_zero')
+    )
+    sql, params = queryset.query.sql_with_params()
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        # Rows are unpacked straight into a packed record array, without an
+        # intermediate list of tuples.
+        return np.fromiter(cursor, dtype=ROW_DTYPE)
+
+
+def compute_booking_analytics(cabin_ids, therapist_ids, starts, ends, status_codes, prices, utc_offset=0):
+    """
+    Aggregate booking columns. Offered time is every slot that is available,
+    booked or expired unbooked; utilization is booked hours / offered hours. Revenue counts
+    booked slots only. Weekday (Monday == 0) and hour are taken from the start
+    time shifted by utc_offset seconds.
+    """
+    durations = (ends - starts) / SECONDS_PER_HOUR
+    booked = status_codes == STATUS_CODES['booked']
+    offered = booked | (status_codes == STATUS_CODES['available']) | (status_codes == STATUS_CODES['expired'])
+    revenue = np.where(booked, prices, 0.0)
+
+    local_starts = starts + utc_offset
+    weekdays = (local_starts // 86400 + EPOCH_WEEKDAY) % 7
+    hours = (local_starts // SECONDS_PER_HOUR) % 24
+
+    cabins, cabin_index = np.unique(cabin_ids, return_inverse=True)
+    cabin_offered = np.bincount(cabin_index, weights=durations * offered, minlength=len(cabins))
+    cabin_booked = np.bincount(cabin_index, weights=durations * booked, minlength=len(cabins))
+    by_cabin = [
+        {
+            'cabin_id': int(cabin_id),
+            'offered_hours': round(float(offered_hours), 2),
+            'booked_hours': round(float(booked_hours), 2),
+            'utilization': _ratio(booked_hours, offered_hours),
+            'revenue': round(float(cabin_revenue), 2),
+            'bookings': int(count),
+        }
+        for cabin_id, offered_hours, booked_hours, cabin_revenue, count in zip(
+            cabins, cabin_offered, cabin_booked,
+            np.bincount(cabin_index, weights=revenue, minlength=len(cabins)),
+            np.bincount(cabin_index, weights=booked, minlength=len(cabins)),
+        )
+    ]
+
+    therapist_mask = booked & (therapist_ids >= 0)
+    therapists, therapist_index = np.unique(therapist_ids[therapist_mask], return_inverse=True)
+    by_therapist = [
+        {
+            'therapist_id': int(therapist_id),
+            'booked_hours': round(float(booked_hours), 2),
+            'revenue': round(float(therapist_revenue), 2),
+            'bookings': int(count),
+        }
+        for therapist_id, booked_hours, therapist_revenue, count in zip(
+            therapists,
+            np.bincount(therapist_index, weights=durations[therapist_mask], minlength=len(therapists)),
+            np.bincount(therapist_index, weights=revenue[therapist_mask], minlength=len(therapists)),
+            np.bincount(therapist_index, minlength=len(therapists)),
+        )
+    ]
+
+    total_offered = float(durations[offered].sum())
+    total_booked = float(durations[booked].sum())
+    return {
+        'totals': {
+            'offered_hours': round(total_offered, 2),
+            'booked_hours': round(total_booked, 2),
+            'utilization': _ratio(total_booked, total_offered),
+            'revenue': round(float(revenue.sum()), 2),
+            'bookings': int(booked.sum()),
+            'cancellations': int((status_codes == STATUS_CODES['cancelled']).sum()),
+        },
+        'by_cabin': by_cabin,
+        'by_therapist': by_therapist,
+        'by_weekday': _bucket_totals('weekday', weekdays, 7, booked, durations, revenue),
+        'by_hour': _bucket_totals('hour', hours, 24, booked, durations, revenue),
+        'heatmap': _hour_of_week_heatmap(starts[booked] + utc_offset, ends[booked] + utc_offset),
+    }
+
+
+def _bucket_totals(name, buckets, size, booked, durations, revenue):
+    booked_buckets = buckets[booked]
+    booked_hours = np.bincount(booked_buckets, weights=durations[booked], minlength=size)
+    bucket_revenue = np.bincount(booked_buckets, weights=revenue[booked], minlength=size)
+    counts = np.bincount(booked_buckets, minlength=size)
+    return [
+        {name: bucket, 'booked_hours': round(float(booked_hours[bucket]), 2),
+         'revenue': round(float(bucket_revenue[bucket]), 2), 'bookings': int(counts[bucket])}
+        for bucket in range(size)
+    ]
+
+
+def _hour_of_week_heatmap(starts, ends):
+    """
+    Booked hours per (weekday, hour) cell. Each booking is split across every
+    clock hour it overlaps, using repeat/arange instead of a Python loop.
+    """
+    if len(starts) == 0:
+        return np.zeros((7, 24)).tolist()
+    first_hour = starts // SECONDS_PER_HOUR
+    last_hour = (ends - 1) // SECONDS_PER_HOUR
+    spans = np.maximum(last_hour - first_hour + 1, 0)
+    booking_index = np.repeat(np.arange(len(starts)), spans)
+    offsets = np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans)
+    hour_bucket = first_hour[booking_index] + offsets
+    overlap = (
+        np.minimum(ends[booking_index], (hour_bucket + 1) * SECONDS_PER_HOUR)
+        - np.maximum(starts[booking_index], hour_bucket * SECONDS_PER_HOUR)
+    )
+    hour_of_week = (hour_bucket + EPOCH_WEEKDAY * 24) % HOURS_PER_WEEK
+    heatmap = np.bincount(hour_of_week, weights=overlap / SECONDS_PER_HOUR, minlength=HOURS_PER_WEEK)
+    return np.round(heatmap.reshape(7, 24), 2).tolist()
+
+
+def _ratio(numerator, denominator):
+    return round(float(numerator) / float(denominator), 4) if denominator else 0.0
+
+
+def booking_analytics(start, end, using='default'):
+    """Fetch and aggregate bookings starting in [start, end)."""
+    columns = fetch_booking_columns(start, end, using=using)
+    offset = start.astimezone(timezone.get_current_timezone()).utcoffset()
+    result = compute_booking_analytics(*columns, utc_offset=int(offset.total_seconds()))
+    result['range'] = {'start': start.isoformat(), 'end': end.isoformat()}
+    return result
+
+
+def day_range(start_date, end_date):
+    """Aware datetimes covering the dates start_date..end_date inclusive."""
+    start = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+    end = timezone.make_aware(datetime.combine(end_date, datetime.min.time()))
+    return start, end + timedelta(days=1)
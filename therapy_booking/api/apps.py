@@ -1,6 +1,33 @@
 from django.apps import AppConfig
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Sharding (api/sharding.py): give each shard its id range and keep
+        # reference data (users, locations) copied to every shard.
+        post_migrate.connect(_set_id_ranges, sender=self)
+        for model in (self.get_model('User'), self.get_model('Location')):
+            post_save.connect(_replicate_saved, sender=model, dispatch_uid=f'replicate_{model._meta.model_name}_save')
+            post_delete.connect(_replicate_deleted, sender=model, dispatch_uid=f'replicate_{model._meta.model_name}_delete')
+
+
+def _set_id_ranges(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    from .sharding import set_id_ranges
+    set_id_ranges(using)
+
+
+def _replicate_saved(sender, instance, using=DEFAULT_DB_ALIAS, raw=False, **kwargs):
+    from .sharding import is_sharded, replicate_reference_row
+    if is_sharded() and using == DEFAULT_DB_ALIAS and not raw:
+        replicate_reference_row(instance)
+
+
+def _replicate_deleted(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    from .sharding import is_sharded, replicate_reference_row
+    if is_sharded() and using == DEFAULT_DB_ALIAS:
+        replicate_reference_row(instance, deleted=True)
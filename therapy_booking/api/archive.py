@@ -0,0 +1,114 @@
+"""
+Archival of old bookings to BookingArchive.
+
+archive_bookings() (`manage.py archive_bookings`, or the scheduler job)
+moves every booking that ended before the retention cutoff (past
+bookings, cancellations and slots nobody booked) out of api_booking in
+small batches. Each batch records a 'deleted' slot event per row, copies
+its rows and then deletes them in its own short transaction, so writers
+are never blocked for long.
+Reads that need history can combine both tables with booking_history().
+TherapistMonthlyStats and the analytics endpoint already read both.
+"""
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Value
+from django.utils import timezone
+
+from .conf import app_settings
+from .events import record_slot_deletions
+from .models import Booking, BookingArchive, Reservation
+from .sharding import current_db
+
+DEFAULT_CONFIG = {
+    'RETENTION_DAYS': 180, # Bookings that ended longer ago than this are archived
+    'BATCH_SIZE': 1000, # Rows moved per transaction
+}
+
+HISTORY_FIELDS = ('id', 'therapist_id', 'cabin_id', 'start_time', 'end_time', 'status', 'price')
+
+
+def get_config():
+    return app_settings('BOOKING_ARCHIVE', DEFAULT_CONFIG)
+
+
+def retention_cutoff(retention_days=None):
+    days = get_config()['RETENTION_DAYS'] if retention_days is None else retention_days
+    return timezone.now() - timedelta(days=days)
+
+
+def move_to_archive(bookings):
+    """
+    Copy the bookings of a (sliced) queryset to BookingArchive and delete
+    them, with their seat reservations. Call inside a transaction on the
+    current shard. Returns the moved ids.
+    """
+    rows = list(bookings.values_list(*HISTORY_FIELDS, 'updated_at', 'therapist__username', 'cabin__name'))
+    if not rows:
+        return []
+    BookingArchive.objects.bulk_create([
+        BookingArchive(
+            id=pk, therapist_id=therapist_id, cabin_id=cabin_id, start_time=start_time, end_time=end_time,
+            status=status, price=price, updated_at=updated_at,
+            therapist_username=therapist_username or '', cabin_name=cabin_name,
+        )
+        for pk, therapist_id, cabin_id, start_time, end_time, status, price, updated_at, therapist_username, cabin_name in rows
+    ], ignore_conflicts=True) # Already copied by an interrupted run
+    ids = [row[0] for row in rows]
+    Booking.objects.filter(pk__in=ids).delete()
+    return ids
+
+
+def archive_batch(cutoff, after_pk=0, batch_size=1000):
+    """
+    Move up to batch_size bookings with id > after_pk that ended before
+    cutoff, with a 'deleted' event each so delta sync and event streams
+    drop them. Returns the moved ids (empty when nothing is left).
+    """
+    with transaction.atomic(using=current_db()):
+        ids = list(
+            Booking.objects.filter(pk__gt=after_pk, end_time__lt=cutoff)
+            # Multi-seat slots with reservations stay put: the archive has no seat rows.
+            .exclude(Exists(Reservation.objects.filter(slot=OuterRef('pk'))))
+            .order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if ids:
+            record_slot_deletions(Booking.objects.filter(pk__in=ids))
+            move_to_archive(Booking.objects.filter(pk__in=ids))
+        return ids
+
+
+def archive_bookings(cutoff=None, batch_size=None, pause=0.0):
+    """
+    Archive every booking that ended before cutoff. Walks the table by id
+    so each batch starts where the previous one stopped. Returns the number
+    of rows moved.
+    """
+    config = get_config()
+    cutoff = cutoff or retention_cutoff()
+    batch_size = batch_size or config['BATCH_SIZE']
+    moved = 0
+    last_pk = 0
+    while True:
+        ids = archive_batch(cutoff, after_pk=last_pk, batch_size=batch_size)
+        if not ids:
+            return moved
+        moved += len(ids)
+        last_pk = ids[-1]
+        if pause:
+            time.sleep(pause) # Let other writers in between batches
+
+
+def booking_history(hot, archived):
+    """
+    One query over both tables: `hot` is a filtered Booking queryset and
+    `archived` the same filters on BookingArchive (the column names match).
+    Returns dicts ordered by start_time with an `archived` flag.
+    """
+    hot = hot.values(
+        *HISTORY_FIELDS, therapist_username=F('therapist__username'), cabin_name=F('cabin__name'), archived=Value(False)
+    )
+    archived = archived.values(*HISTORY_FIELDS, 'therapist_username', 'cabin_name', archived=Value(True))
+    return hot.union(archived, all=True).order_by('start_time', 'id')
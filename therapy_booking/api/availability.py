@@ -0,0 +1,257 @@
+"""
+In-process availability index.
+
+Every cabin has two bitmaps. Bit i stands for the i-th cell of
+GRANULARITY_MINUTES, counted in local time from the cabin's first day.
+`offered` marks cells fully covered by available or booked slots.
+`taken` marks cells that touch a booked slot. Free time is
+offered & ~taken, so "is cabin X free 10:00-12:00 on these 30 days?" and
+calendar rendering become a few big-integer operations instead of
+queries. Each bitmap is a single Python int, which keeps a year of one
+cabin at about 4.4 KB per bitmap.
+
+A cabin's bitmaps are built from Booking on first use. The index stays
+current through SlotChangeEvent, which every write path in api/views.py
+appends to. Before answering, refresh() compares the newest event id with
+the version the index was built at, and it recomputes only the
+cabin/time ranges the new events touch. Holds are short-lived and are not
+reflected. Event ids are per database, so each shard keeps its own
+version (api/sharding.py).
+"""
+import re
+import sys
+import threading
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .conf import app_settings
+from .models import Booking, SlotChangeEvent
+from .sharding import current_db
+
+DEFAULT_CONFIG = {
+    'GRANULARITY_MINUTES': 15, # Must divide 60
+    'MAX_EVENTS': 5000, # More pending events than this: drop everything and rebuild lazily
+}
+
+RUNS = re.compile('1+')
+
+
+def get_config():
+    return app_settings('AVAILABILITY_INDEX', DEFAULT_CONFIG)
+
+
+class CabinBitmap:
+    __slots__ = ('base_day', 'offered', 'taken')
+
+    def __init__(self, base_day):
+        self.base_day = base_day # date.toordinal() of bit 0's day
+        self.offered = 0
+        self.taken = 0
+
+    def rebase(self, day, cells_per_day):
+        """Move bit 0 back to an earlier day."""
+        if day < self.base_day:
+            shift = (self.base_day - day) * cells_per_day
+            self.offered <<= shift
+            self.taken <<= shift
+            self.base_day = day
+
+
+class ShardState:
+    """Bitmaps built from one database, and the SlotChangeEvent id they are current as of."""
+    __slots__ = ('cabins', 'version')
+
+    def __init__(self):
+        self.cabins = {}
+        self.version = None
+
+
+class AvailabilityIndex:
+
+    def __init__(self, granularity_minutes=None):
+        config = get_config()
+        self.granularity = granularity_minutes or config['GRANULARITY_MINUTES']
+        if 60 % self.granularity:
+            raise ValueError("GRANULARITY_MINUTES must divide 60.")
+        self.cells_per_day = 24 * 60 // self.granularity
+        self.max_events = config['MAX_EVENTS']
+        self.shards = {} # Database alias -> ShardState (see api/sharding.py)
+        self.lock = threading.RLock()
+
+    # Cells
+
+    def _cell(self, dt, base_day, round_up):
+        local = timezone.localtime(dt, timezone.get_default_timezone())
+        minutes = local.hour * 60 + local.minute
+        cell, remainder = divmod(minutes, self.granularity)
+        if round_up and (remainder or local.second or local.microsecond):
+            cell += 1
+        return (local.date().toordinal() - base_day) * self.cells_per_day + cell
+
+    def _cells_for(self, rows, base_day, first_cell, cell_count):
+        """(offered, taken) bits for rows, relative to first_cell and clipped to cell_count cells."""
+        offered = bytearray(b'0' * cell_count)
+        taken = bytearray(b'0' * cell_count)
+        for start_time, end_time, status in rows:
+            # Offered rounds inward and taken rounds outward, so partial cells never look free.
+            start = max(self._cell(start_time, base_day, True) - first_cell, 0)
+            end = min(self._cell(end_time, base_day, False) - first_cell, cell_count)
+            if end > start:
+                offered[start:end] = b'1' * (end - start)
+            if status == 'booked':
+                start = max(self._cell(start_time, base_day, False) - first_cell, 0)
+                end = min(self._cell(end_time, base_day, True) - first_cell, cell_count)
+                if end > start:
+                    taken[start:end] = b'1' * (end - start)
+        # Reversed so that character i becomes bit i.
+        return int(offered[::-1] or b'0', 2), int(taken[::-1] or b'0', 2)
+
+    @staticmethod
+    def _rows(cabin_id, start=None, end=None):
+        queryset = Booking.objects.filter(cabin_id=cabin_id, status__in=['available', 'booked'])
+        if start is not None:
+            queryset = queryset.filter(end_time__gt=start, start_time__lt=end)
+        return queryset.values_list('start_time', 'end_time', 'status')
+
+    # Building and refreshing
+
+    def _shard(self):
+        return self.shards.setdefault(current_db(), ShardState())
+
+    def _build(self, cabin_id):
+        rows = list(self._rows(cabin_id))
+        if not rows:
+            bitmap = CabinBitmap(timezone.localdate().toordinal())
+        else:
+            first_day = min(timezone.localtime(row[0], timezone.get_default_timezone()).date() for row in rows).toordinal()
+            last_day = max(timezone.localtime(row[1], timezone.get_default_timezone()).date() for row in rows).toordinal()
+            bitmap = CabinBitmap(first_day)
+            bitmap.offered, bitmap.taken = self._cells_for(
+                rows, first_day, 0, (last_day - first_day + 1) * self.cells_per_day
+            )
+        self._shard().cabins[cabin_id] = bitmap
+        return bitmap
+
+    def _recompute(self, cabin_id, start_time, end_time):
+        """Rebuild the cells of [start_time, end_time) (widened to whole days) from the database."""
+        bitmap = self._shard().cabins[cabin_id]
+        tz = timezone.get_default_timezone()
+        first_day = timezone.localtime(start_time, tz).date()
+        last_day = timezone.localtime(end_time, tz).date()
+        bitmap.rebase(first_day.toordinal(), self.cells_per_day)
+        first_cell = (first_day.toordinal() - bitmap.base_day) * self.cells_per_day
+        cell_count = (last_day.toordinal() - first_day.toordinal() + 1) * self.cells_per_day
+        window_start = timezone.make_aware(datetime.combine(first_day, time.min), tz)
+        window_end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min), tz)
+
+        offered, taken = self._cells_for(
+            self._rows(cabin_id, window_start, window_end), bitmap.base_day, first_cell, cell_count
+        )
+        keep = ~(((1 << cell_count) - 1) << first_cell)
+        bitmap.offered = (bitmap.offered & keep) | (offered << first_cell)
+        bitmap.taken = (bitmap.taken & keep) | (taken << first_cell)
+
+    def refresh(self):
+        """Apply slot changes recorded since the index was last current. One query when nothing changed."""
+        with self.lock:
+            shard = self._shard()
+            latest = SlotChangeEvent.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+            if shard.version is None or not shard.cabins or latest < shard.version:
+                # Nothing built yet, or the event log went backwards (pruned or rolled back).
+                shard.cabins.clear()
+                shard.version = latest
+                return
+            if latest <= shard.version:
+                return
+            if latest - shard.version > self.max_events:
+                shard.cabins.clear()
+                shard.version = latest
+                return
+            ranges = {}
+            events = SlotChangeEvent.objects.filter(
+                pk__gt=shard.version, pk__lte=latest, cabin_id__in=list(shard.cabins)
+            ).values_list('cabin_id', 'start_time', 'end_time', 'previous_start_time', 'previous_end_time')
+            for cabin_id, start_time, end_time, previous_start_time, previous_end_time in events:
+                if previous_start_time is not None:
+                    # The slot was moved: its old time range changes too.
+                    start_time = min(start_time, previous_start_time)
+                    end_time = max(end_time, previous_end_time)
+                if cabin_id in ranges:
+                    start_time = min(start_time, ranges[cabin_id][0])
+                    end_time = max(end_time, ranges[cabin_id][1])
+                ranges[cabin_id] = (start_time, end_time)
+            for cabin_id, (start_time, end_time) in ranges.items():
+                self._recompute(cabin_id, start_time, end_time)
+            shard.version = latest
+
+    def invalidate(self):
+        with self.lock:
+            self.shards.clear()
+
+    def bitmap(self, cabin_id):
+        """The cabin's bitmaps, current as of now."""
+        with self.lock:
+            self.refresh()
+            bitmap = self._shard().cabins.get(cabin_id)
+            if bitmap is None:
+                bitmap = self._build(cabin_id)
+            return bitmap
+
+    # Queries
+
+    def _days(self, bitmap, start_date, days):
+        """(offered, taken) ints covering `days` days from start_date; bit 0 is start_date 00:00."""
+        offset = (start_date.toordinal() - bitmap.base_day) * self.cells_per_day
+        mask = (1 << (days * self.cells_per_day)) - 1
+        if offset >= 0:
+            return (bitmap.offered >> offset) & mask, (bitmap.taken >> offset) & mask
+        return (bitmap.offered << -offset) & mask, (bitmap.taken << -offset) & mask
+
+    def window_mask(self, time_from, time_to):
+        first = (time_from.hour * 60 + time_from.minute) // self.granularity
+        last = -(-(time_to.hour * 60 + time_to.minute) // self.granularity) if time_to != time.min else self.cells_per_day
+        return ((1 << max(last - first, 0)) - 1) << first
+
+    def free_on(self, cabin_id, start_date, days, time_from, time_to):
+        """For each of `days` days from start_date, whether the cabin is free for the whole window."""
+        offered, taken = self._days(self.bitmap(cabin_id), start_date, days)
+        free = offered & ~taken
+        window = self.window_mask(time_from, time_to)
+        repeated = window * sum(1 << (day * self.cells_per_day) for day in range(days))
+        hits = free & repeated
+        return [((hits >> (day * self.cells_per_day)) & window) == window for day in range(days)]
+
+    def calendar(self, cabin_id, start_date, days):
+        """Per day: {'date', 'free': [(start, end), ...], 'booked': [...]} as 'HH:MM' strings."""
+        offered, taken = self._days(self.bitmap(cabin_id), start_date, days)
+        day_mask = (1 << self.cells_per_day) - 1
+        result = []
+        for day in range(days):
+            shift = day * self.cells_per_day
+            day_offered = (offered >> shift) & day_mask
+            day_taken = (taken >> shift) & day_mask
+            result.append({
+                'date': start_date + timedelta(days=day),
+                'free': self._runs(day_offered & ~day_taken),
+                'booked': self._runs(day_taken),
+            })
+        return result
+
+    def _runs(self, bits):
+        text = format(bits, f'0{self.cells_per_day}b')[::-1] # Character i is cell i
+        return [(self._clock(match.start()), self._clock(match.end())) for match in RUNS.finditer(text)]
+
+    def _clock(self, cell):
+        minutes = cell * self.granularity
+        return '24:00' if minutes == 24 * 60 else f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+    def memory_bytes(self):
+        with self.lock:
+            return sum(
+                sys.getsizeof(bitmap.offered) + sys.getsizeof(bitmap.taken)
+                for shard in self.shards.values() for bitmap in shard.cabins.values()
+            )
+
+
+availability_index = AvailabilityIndex()
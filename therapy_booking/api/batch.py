@@ -0,0 +1,136 @@
+"""
+Batched GET requests.
+
+POST /api/batch/ with
+    {"requests": [{"path": "/api/therapist/profile/"},
+                  {"path": "/api/therapist/bookings/mine/", "params": {"period": "upcoming"}}],
+     "parallel": true}
+runs each sub-request in-process against the URLconf and answers
+    {"responses": [{"path": ..., "status": 200, "body": {...}}, ...]}
+in request order. The batch request is authenticated once; sub-requests
+reuse its user and token (DRF's forced authentication), so they skip JWT
+decoding, the user lookup and the middleware stack.
+
+Limits (BATCH setting): at most MAX_REQUESTS sub-requests, only GETs to
+DRF views (not to views with `batchable = False`, such as the batch
+view itself), and TIME_LIMIT_SECONDS for the whole batch.
+Sub-requests not started by then are answered with 504. Ones already
+running are waited for, so none is still running (holding a connection,
+or writing) once the response is sent; a batch can overrun the limit by
+its slowest running sub-request. With "parallel": true, up to
+MAX_PARALLEL sub-requests run at once in threads, each on its own
+database connection; use it only for sub-requests that do not depend on
+each other. Their queries are counted for the batch request (see
+api/query_budget.py) and reach the slow query log, as sequential
+sub-requests' queries do.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import copy_context
+from urllib.parse import urlencode, urlsplit
+
+from django.db import connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import status
+
+from .conf import app_settings
+from .middleware import wrap_thread_connections
+from .sharding import is_sharded, resolve_request_shard, use_shard
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'MAX_REQUESTS': 10,
+    'TIME_LIMIT_SECONDS': 5.0,
+    'MAX_PARALLEL': 4, # Threads used with "parallel": true
+}
+
+# Request headers that belong to the batch request itself, not to its sub-requests.
+BATCH_ONLY_META = ('CONTENT_LENGTH', 'CONTENT_TYPE', 'HTTP_AUTHORIZATION', 'HTTP_IDEMPOTENCY_KEY')
+
+
+def get_config():
+    return app_settings('BATCH', DEFAULT_CONFIG)
+
+
+def error(sub_request, code, detail):
+    return {'path': sub_request['path'], 'status': code, 'body': {'detail': detail}}
+
+
+def build_request(request, path, query):
+    """A GET HttpRequest for `path` carrying the batch request's headers and authentication."""
+    parent = request._request
+    sub = HttpRequest()
+    sub.method = 'GET'
+    sub.path = sub.path_info = path
+    sub.META = {key: value for key, value in parent.META.items() if key not in BATCH_ONLY_META}
+    sub.META.update({'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query})
+    sub.GET = QueryDict(query)
+    sub.COOKIES = parent.COOKIES
+    # Picked up by rest_framework.request.Request in place of the view's authenticators.
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    return sub
+
+
+def run_one(request, sub_request):
+    """Resolve and run one GET sub-request. Returns {'path', 'status', 'body'}."""
+    parts = urlsplit(sub_request['path'])
+    query = '&'.join(filter(None, [parts.query, urlencode(sub_request['params'])]))
+    try:
+        match = resolve(parts.path)
+    except Resolver404:
+        return error(sub_request, status.HTTP_404_NOT_FOUND, "Not found.")
+    view_class = getattr(match.func, 'cls', None) # Set on DRF views only
+    actions = getattr(match.func, 'actions', None) # Set on viewsets: {'get': 'list', ...}
+    handles_get = 'get' in actions if actions is not None else hasattr(view_class, 'get')
+    if view_class is None or not handles_get or not getattr(view_class, 'batchable', True):
+        return error(sub_request, status.HTTP_400_BAD_REQUEST, "Only GET requests to API views can be batched.")
+
+    sub = build_request(request, parts.path, query)
+    sub.resolver_match = match
+    # What ShardMiddleware does for top-level requests.
+    shard = resolve_request_shard(sub, match.kwargs) if is_sharded() else None
+    try:
+        with use_shard(shard):
+            response = match.func(sub, *match.args, **match.kwargs)
+    except Exception:
+        logger.exception("Batched request to %s failed", parts.path)
+        return error(sub_request, status.HTTP_500_INTERNAL_SERVER_ERROR, "Internal server error.")
+    return {'path': sub_request['path'], 'status': response.status_code, 'body': getattr(response, 'data', None)}
+
+
+def run_batch(request, sub_requests, parallel):
+    """Responses in request order; sub-requests not started within TIME_LIMIT_SECONDS get a 504."""
+    config = get_config()
+    deadline = time.monotonic() + config['TIME_LIMIT_SECONDS']
+
+    def timed_out(sub_request):
+        return error(sub_request, status.HTTP_504_GATEWAY_TIMEOUT, "Batch time limit reached.")
+
+    if not parallel:
+        responses = []
+        for sub_request in sub_requests:
+            responses.append(run_one(request, sub_request) if time.monotonic() < deadline else timed_out(sub_request))
+        return responses
+
+    def run_in_thread(sub_request):
+        try:
+            with wrap_thread_connections():
+                return run_one(request, sub_request)
+        finally:
+            connections.close_all()
+
+    executor = ThreadPoolExecutor(max_workers=min(len(sub_requests), config['MAX_PARALLEL']))
+    # Each sub-request runs in a copy of this request's context, which carries its query wrappers.
+    futures = [executor.submit(copy_context().run, run_in_thread, sub_request) for sub_request in sub_requests]
+    wait(futures, timeout=max(deadline - time.monotonic(), 0))
+    # Drops the sub-requests still queued and waits for the running ones to end.
+    executor.shutdown(wait=True, cancel_futures=True)
+    return [
+        timed_out(sub_request) if future.cancelled() else future.result()
+        for future, sub_request in zip(futures, sub_requests)
+    ]
+
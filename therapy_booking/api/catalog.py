@@ -0,0 +1,111 @@
+"""
+In-process cabin catalog.
+
+Cabins change a few times a month, but every booking row shows its
+cabin's name. The catalog keeps id -> (name, description, capacity) for
+every cabin in memory, so booking lists render cabin_name without joining
+api_cabin, and the cabin list is served without reading the table. Hidden
+cabins (queued for deletion, see api/deletion.py) keep their entry, so
+their bookings still show a name, but are left out of entries().
+
+The catalog is current as of a version marker: the cabin count and the
+newest Cabin.updated_at (Cabin's queryset stamps updated_at on bulk
+updates too, see CabinQuerySet). Users refresh once per serializer
+(CabinNameField) or request (CabinViewSet.list). A refresh is always one
+query, which returns the marker and, only if the marker moved, every
+cabin, so writes from other processes are picked up on their next use and
+a view's query count does not depend on the catalog being warm.
+CabinViewSet also drops the local copy after its own writes. Ids are per
+shard, so each shard has its own catalog (api/sharding.py).
+"""
+import threading
+
+from django.db import connections
+
+from .models import Cabin
+from .sharding import current_db, shard_aliases, shard_for_pk, spans_shards
+
+
+class CatalogEntry:
+    __slots__ = ('id', 'name', 'description', 'capacity', 'hidden')
+
+    def __init__(self, id, name, description, capacity, hidden_at):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.capacity = capacity
+        self.hidden = hidden_at is not None
+
+
+class CabinCatalog:
+
+    def __init__(self):
+        self.shards = {} # Database alias -> (marker, {cabin id: CatalogEntry})
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _read(alias, known):
+        """
+        (marker, rows) in one statement: the current marker, and the cabin
+        rows unless the marker still equals `known`.
+        """
+        connection = connections[alias]
+        table = connection.ops.quote_name(Cabin._meta.db_table)
+        sql = (
+            f"SELECT 0, COUNT(*), MAX(updated_at), NULL, NULL, NULL, NULL, NULL FROM {table} "
+            f"UNION ALL SELECT 1, NULL, NULL, id, name, description, capacity, hidden_at FROM {table}"
+        )
+        params = []
+        if known is not None:
+            sql += f" WHERE (SELECT COUNT(*) FROM {table}) <> %s OR (SELECT MAX(updated_at) FROM {table}) <> %s"
+            params = list(known)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        marker = next((row[1], row[2]) for row in rows if row[0] == 0)
+        return marker, [row[3:] for row in rows if row[0] == 1]
+
+    def refresh(self, alias=None):
+        """Bring the shard's catalog up to date. Always exactly one query."""
+        alias = alias or current_db()
+        with self.lock:
+            known = self.shards[alias][0] if alias in self.shards else None
+        marker, rows = self._read(alias, known)
+        if marker == known:
+            return
+        with self.lock:
+            self.shards[alias] = (marker, {row[0]: CatalogEntry(*row) for row in rows})
+
+    def invalidate(self, alias=None):
+        with self.lock:
+            if alias is None:
+                self.shards.clear()
+            else:
+                self.shards.pop(alias, None)
+
+    def shard_of(self, cabin_id):
+        return shard_for_pk(cabin_id) or current_db()
+
+    def get(self, cabin_id):
+        """The cabin's entry as of the last refresh of its shard, or None."""
+        alias = self.shard_of(cabin_id)
+        with self.lock:
+            state = self.shards.get(alias)
+        if state is None:
+            self.refresh(alias)
+            with self.lock:
+                state = self.shards[alias]
+        return state[1].get(cabin_id)
+
+    def entries(self):
+        """Every visible cabin of the current shard (every shard, for a cross-location request), by id. Refreshes first."""
+        aliases = shard_aliases() if spans_shards() else [current_db()]
+        result = []
+        for alias in aliases:
+            self.refresh(alias)
+            with self.lock:
+                result.extend(entry for entry in self.shards[alias][1].values() if not entry.hidden)
+        return sorted(result, key=lambda entry: entry.id)
+
+
+cabin_catalog = CabinCatalog()
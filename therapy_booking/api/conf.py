@@ -0,0 +1,19 @@
+"""
+Settings of the api app's features.
+
+Each feature module keeps its defaults in DEFAULT_CONFIG, next to the code
+that uses them, and reads its settings through app_settings(). A
+deployment sets only what it changes: BATCH = {'MAX_PARALLEL': 8} keeps
+every other BATCH default.
+"""
+from django.conf import settings
+
+
+def app_settings(name, defaults):
+    """settings.<name> over `defaults`. A dict value (e.g. RATE_LIMITS['RATES']) is merged key by key too."""
+    overrides = getattr(settings, name, {})
+    config = {**defaults, **overrides}
+    for key, default in defaults.items():
+        if isinstance(default, dict) and isinstance(overrides.get(key), dict):
+            config[key] = {**default, **overrides[key]}
+    return config
@@ -0,0 +1,192 @@
+"""
+Background deletion of cabins and users.
+
+Booking.cabin and Booking.therapist cascade, and Django's collector
+cascades by loading every related row, so deleting a cabin or user with
+years of bookings inside a request times out. Instead, the request only
+queues a DeletionJob: queue_cabin_deletion() hides the cabin
+(Cabin.hidden_at, which takes it and its slots out of listings, search and
+booking at once) and queue_user_deletion() deactivates the user.
+`run_deletion_jobs` (cron) then works through the bookings, BATCH_SIZE
+rows per short transaction of set-based statements:
+
+- a cabin's bookings move to BookingArchive, which keeps the cabin's name,
+  with 'deleted' slot events for delta sync and live clients;
+- a user's seats on upcoming multi-seat slots are given back and their
+  upcoming booked slots reopened ('cancelled' events), their other
+  bookings move to BookingArchive and their holds are released.
+
+Slot events name the admin who asked for the deletion as their actor.
+
+Finally the cabin or user row, which nothing references any more, is
+deleted. Every batch can be repeated, so a failed or interrupted job is
+resumed by running it again. rows_done/rows_total on the job report
+progress.
+"""
+import logging
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .archive import move_to_archive
+from .catalog import cabin_catalog
+from .conf import app_settings
+from .events import record_slot_changes, record_slot_deletions
+from .models import Booking, Cabin, DeletionJob, Reservation, User
+from .sharding import shard_aliases, shard_for_pk, use_shard
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'BATCH_SIZE': 500, # Bookings or seats per transaction
+}
+
+
+def get_config():
+    return app_settings('DELETION_JOBS', DEFAULT_CONFIG)
+
+
+def queue_cabin_deletion(cabin, requested_by=None):
+    """Hide the cabin and queue the deletion of it and its bookings. Returns the job."""
+    cabin.hidden_at = timezone.now()
+    cabin.save(update_fields=['hidden_at'])
+    return DeletionJob.objects.create(kind='cabin', target_id=cabin.pk, target_name=cabin.name, requested_by=requested_by)
+
+
+def queue_user_deletion(user, requested_by=None):
+    """Deactivate the user (no more logins) and queue the deletion of them and their bookings. Returns the job."""
+    user.is_active = False
+    user.save(update_fields=['is_active'])
+    return DeletionJob.objects.create(kind='user', target_id=user.pk, target_name=user.username, requested_by=requested_by)
+
+
+def run_pending_jobs():
+    """Run every pending job, oldest first. Returns the jobs this call ran."""
+    jobs = []
+    for job_id in list(DeletionJob.objects.filter(status='pending').order_by('pk').values_list('pk', flat=True)):
+        job = run_deletion_job(job_id)
+        if job is not None:
+            jobs.append(job)
+    return jobs
+
+
+def run_deletion_job(job_id, resume=False):
+    """
+    Run a pending job to the end; with resume, also a failed or interrupted
+    one. Returns the job, or None if it is not in a runnable state (done, or
+    claimed by another runner). Failures are recorded on the job, not raised.
+    """
+    statuses = ('pending', 'running', 'failed') if resume else ('pending',)
+    claimed = DeletionJob.objects.filter(pk=job_id, status__in=statuses).update(
+        status='running', error='', started_at=timezone.now(), finished_at=None
+    )
+    if not claimed:
+        return None
+    job = DeletionJob.objects.get(pk=job_id)
+    try:
+        if job.kind == 'cabin':
+            delete_cabin(job)
+        else:
+            delete_user(job)
+    except Exception as e:
+        logger.exception("Deletion job %s failed", job.pk)
+        job.status, job.error = 'failed', str(e)
+    else:
+        job.status = 'done'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def _start(job, remaining):
+    # rows_done survives from an interrupted run, so resumed jobs keep their progress.
+    job.rows_total = job.rows_done + remaining
+    job.save(update_fields=['rows_total'])
+
+
+def _advance(job, count):
+    job.rows_done += count
+    DeletionJob.objects.filter(pk=job.pk).update(rows_done=F('rows_done') + count)
+
+
+def _run_batches(job, alias, step, *args):
+    """Call step(*args) in its own transaction until it reports nothing left."""
+    while True:
+        with transaction.atomic(using=alias):
+            count = step(*args)
+        if not count:
+            return
+        _advance(job, count)
+
+
+def _first_ids(queryset, batch_size):
+    return list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+
+
+def _archive_batch(bookings, batch_size, actor_id):
+    ids = _first_ids(bookings, batch_size)
+    if ids:
+        record_slot_deletions(Booking.objects.filter(pk__in=ids), actor_id)
+        move_to_archive(Booking.objects.filter(pk__in=ids))
+    return len(ids)
+
+
+def delete_cabin(job):
+    alias = shard_for_pk(job.target_id) or DEFAULT_DB_ALIAS
+    with use_shard(alias):
+        bookings = Booking.objects.filter(cabin_id=job.target_id)
+        _start(job, bookings.count())
+        _run_batches(job, alias, _archive_batch, bookings, get_config()['BATCH_SIZE'], job.requested_by_id)
+        Cabin.objects.filter(pk=job.target_id).delete()
+    cabin_catalog.invalidate(alias)
+
+
+def _drop_seats(user_id, now, batch_size, actor_id):
+    """Delete a batch of the user's reservations, giving back their seats on upcoming slots."""
+    rows = list(
+        Reservation.objects.filter(therapist_id=user_id).order_by('pk')
+        .values_list('pk', 'slot_id', 'status', 'slot__start_time')[:batch_size]
+    )
+    freed = [slot_id for _, slot_id, status, start_time in rows if status == 'booked' and start_time > now]
+    if freed:
+        previous = {
+            pk: (status, therapist_id)
+            for pk, status, therapist_id in Booking.objects.filter(pk__in=freed).values_list('pk', 'status', 'therapist_id')
+        }
+        # As give_back_seat(), for every slot at once: the user holds one live seat per slot.
+        Booking.objects.filter(pk__in=freed, seats_taken__gt=0).update(
+            seats_taken=F('seats_taken') - 1,
+            status=Case(When(status='booked', then=Value('available')), default=F('status')),
+        )
+        record_slot_changes(Booking.objects.filter(pk__in=freed), 'seat_released', actor_id, previous)
+    Reservation.objects.filter(pk__in=[row[0] for row in rows]).delete()
+    return len(rows)
+
+
+def _reopen_upcoming(user_id, now, batch_size, actor_id):
+    """Turn a batch of the user's upcoming booked slots back into open slots."""
+    ids = _first_ids(Booking.objects.filter(therapist_id=user_id, status='booked', start_time__gt=now), batch_size)
+    if ids:
+        Booking.objects.filter(pk__in=ids, therapist_id=user_id).update(therapist=None, status='available')
+        record_slot_changes(Booking.objects.filter(pk__in=ids), 'cancelled', actor_id, ('booked', user_id))
+    return len(ids)
+
+
+def delete_user(job):
+    user_id, batch_size, now, actor_id = job.target_id, get_config()['BATCH_SIZE'], timezone.now(), job.requested_by_id
+    remaining = 0
+    for alias in shard_aliases():
+        with use_shard(alias):
+            remaining += Booking.objects.filter(therapist_id=user_id).count()
+            remaining += Reservation.objects.filter(therapist_id=user_id).count()
+    _start(job, remaining)
+
+    for alias in shard_aliases():
+        with use_shard(alias):
+            Booking.objects.filter(held_by_id=user_id).update(held_by=None, hold_expires_at=None)
+            _run_batches(job, alias, _drop_seats, user_id, now, batch_size, actor_id)
+            _run_batches(job, alias, _reopen_upcoming, user_id, now, batch_size, actor_id)
+            # Whatever is left is past, under way or cancelled: keep it as history.
+            _run_batches(job, alias, _archive_batch, Booking.objects.filter(therapist_id=user_id), batch_size, actor_id)
+    User.objects.filter(pk=user_id).delete()
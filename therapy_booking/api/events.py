@@ -0,0 +1,269 @@
+"""
+Slot change log, and its feed for Server-Sent Events.
+
+Write paths call record_slot_change(), or record_slot_changes() for many
+bookings in one INSERT, inside their transaction, with the user who made
+the change and the slot's state before it. slot_history() reads one
+slot's events back for the admin history endpoint. Each
+process runs a single SlotChangePublisher that polls SlotChangeEvent once
+per interval (one query per process, however many clients are connected)
+and fans new events out to every subscribed stream, filtered by cabin.
+A ring buffer of recent events lets reconnecting clients resume from
+Last-Event-ID without touching the database.
+
+EventSource cannot send an Authorization header, so browsers first POST
+for a stream ticket and open the stream with ?ticket=. A ticket is random,
+lives TICKET_SECONDS in the shared cache and opens one stream, so the URL
+that ends up in access logs never carries a reusable credential.
+"""
+import asyncio
+import json
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from .conf import app_settings
+from .models import SlotChangeEvent
+from .stats import month_of
+
+DEFAULT_CONFIG = {
+    'POLL_INTERVAL': 1.0, # Seconds between polls while clients are connected
+    'HEARTBEAT': 15.0, # Seconds of silence before a keep-alive comment
+    'BUFFER_SIZE': 1000, # Recent events kept in memory for resuming
+    'QUEUE_SIZE': 500, # Pending events per client before it is disconnected
+    'BATCH_SIZE': 500, # Events fetched per poll
+    'CACHE_ALIAS': 'shared', # Stream tickets, redeemed by whichever process serves the stream
+    'TICKET_SECONDS': 30,
+}
+
+
+def get_config():
+    return app_settings('SLOT_EVENTS', DEFAULT_CONFIG)
+
+
+def record_slot_change(booking, kind, actor_id=None, previous=None, previous_times=None):
+    """
+    Append a change event for `booking`; call inside the transaction that
+    changed it. `previous` is the (status, therapist_id) the booking had
+    before the change; by default they are unchanged (e.g. a deletion).
+    previous_times is its (start_time, end_time) before a change of them.
+    """
+    previous_status, previous_therapist_id = previous or (booking.status, booking.therapist_id)
+    previous_start_time, previous_end_time = previous_times or (None, None)
+    return SlotChangeEvent.objects.create(
+        kind=kind,
+        booking_id=booking.pk,
+        cabin_id=booking.cabin_id,
+        therapist_id=booking.therapist_id,
+        status=booking.status,
+        previous_therapist_id=previous_therapist_id,
+        previous_status=previous_status,
+        actor_id=actor_id,
+        start_time=booking.start_time,
+        end_time=booking.end_time,
+        previous_start_time=previous_start_time,
+        previous_end_time=previous_end_time,
+        month=month_of(timezone.now()),
+    )
+
+
+def record_slot_changes(bookings, kind, actor_id=None, previous=None):
+    """
+    Change events for every booking in a queryset, in one INSERT; call
+    inside the transaction that changed them. `previous` is as for
+    record_slot_change(), for all of them, or a dict of it by booking id.
+    """
+    month = month_of(timezone.now())
+    events = []
+    for booking_id, cabin_id, therapist_id, status, start_time, end_time in bookings.values_list(
+        'pk', 'cabin_id', 'therapist_id', 'status', 'start_time', 'end_time'
+    ).iterator():
+        before = previous.get(booking_id) if isinstance(previous, dict) else previous
+        previous_status, previous_therapist_id = before or (status, therapist_id)
+        events.append(SlotChangeEvent(
+            kind=kind, booking_id=booking_id, cabin_id=cabin_id, therapist_id=therapist_id, status=status,
+            previous_therapist_id=previous_therapist_id, previous_status=previous_status, actor_id=actor_id,
+            start_time=start_time, end_time=end_time, month=month,
+        ))
+    return SlotChangeEvent.objects.bulk_create(events)
+
+
+def record_slot_deletions(bookings, actor_id=None):
+    """'deleted' events for every booking in a queryset about to be (cascade) deleted."""
+    return record_slot_changes(bookings, 'deleted', actor_id)
+
+
+def slot_history(booking_id, month=None):
+    """A slot's events, oldest first; only those of one month (any date in it) if given."""
+    queryset = SlotChangeEvent.objects.filter(booking_id=booking_id)
+    if month:
+        queryset = queryset.filter(month=month.replace(day=1))
+    return queryset.order_by('pk')
+
+
+def issue_stream_ticket(user):
+    """A single-use ticket that opens one event stream as `user` (see module docstring)."""
+    config = get_config()
+    ticket = get_random_string(32)
+    caches[config['CACHE_ALIAS']].set(f"stream_ticket:{ticket}", user.pk, timeout=config['TICKET_SECONDS'])
+    return ticket
+
+
+def redeem_stream_ticket(ticket):
+    """The id of the user a live ticket was issued to, or None. Only the first redeemer's delete() succeeds."""
+    cache = caches[get_config()['CACHE_ALIAS']]
+    key = f"stream_ticket:{ticket}"
+    user_id = cache.get(key)
+    return user_id if user_id is not None and cache.delete(key) else None
+
+
+def fetch_events_after(last_id, cabin_ids=None, limit=None):
+    queryset = SlotChangeEvent.objects.filter(pk__gt=last_id).order_by('pk')
+    if cabin_ids:
+        queryset = queryset.filter(cabin_id__in=cabin_ids)
+    if limit:
+        queryset = queryset[:limit]
+    return list(queryset)
+
+
+def latest_event_id():
+    return SlotChangeEvent.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def format_sse(event):
+    """Serialize an event as one SSE message."""
+    payload = {
+        'id': event.pk,
+        'type': event.kind,
+        'slot': event.booking_id,
+        'cabin': event.cabin_id,
+        'status': event.status,
+        'start': event.start_time.isoformat(),
+        'end': event.end_time.isoformat(),
+    }
+    return f"id: {event.pk}\nevent: {event.kind}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    def __init__(self, cabin_ids, queue_size):
+        self.cabin_ids = set(cabin_ids or ())
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    def offer(self, event):
+        if self.cabin_ids and event.cabin_id not in self.cabin_ids:
+            return True
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            # Too slow to keep up: end the stream; the client resumes with Last-Event-ID.
+            self.dropped = True
+            return False
+
+
+class SlotChangePublisher:
+    """
+    One per process (see `publisher`). The polling task runs only while
+    there are subscribers and is bound to the running event loop.
+    """
+
+    def __init__(self):
+        self._reset(None)
+
+    def _reset(self, loop):
+        self.subscribers = set()
+        self.buffer = deque()
+        self.buffer_floor = None # Every event with id > buffer_floor is in the buffer
+        self.last_id = None
+        self._task = None
+        self._loop = loop
+
+    async def subscribe(self, cabin_ids=None):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or a new event loop (e.g. in tests): start from scratch.
+            self._reset(loop)
+        config = get_config()
+        subscription = Subscription(cabin_ids, config['QUEUE_SIZE'])
+        self.subscribers.add(subscription)
+        if self.last_id is None:
+            self.last_id = await sync_to_async(latest_event_id)()
+            self.buffer_floor = self.last_id
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers.discard(subscription)
+
+    def buffered_since(self, last_event_id, cabin_ids=None):
+        """Buffered events after last_event_id, or None if the buffer does not reach back that far."""
+        if self.buffer_floor is None or last_event_id < self.buffer_floor:
+            return None
+        cabin_ids = set(cabin_ids or ())
+        return [
+            event for event in self.buffer
+            if event.pk > last_event_id and (not cabin_ids or event.cabin_id in cabin_ids)
+        ]
+
+    async def poll(self):
+        """Fetch new events once and fan them out. Returns the number of events."""
+        config = get_config()
+        events = await sync_to_async(fetch_events_after)(self.last_id, limit=config['BATCH_SIZE'])
+        for event in events:
+            self.last_id = event.pk
+            self.buffer.append(event)
+            if len(self.buffer) > config['BUFFER_SIZE']:
+                self.buffer_floor = self.buffer.popleft().pk
+            for subscription in list(self.subscribers):
+                if not subscription.offer(event):
+                    self.subscribers.discard(subscription)
+        return len(events)
+
+    async def _run(self):
+        config = get_config()
+        while self.subscribers:
+            fetched = await self.poll()
+            if fetched < config['BATCH_SIZE']:
+                await asyncio.sleep(config['POLL_INTERVAL'])
+
+
+publisher = SlotChangePublisher()
+
+
+async def stream_slot_changes(cabin_ids=None, last_event_id=None):
+    """Async generator of SSE messages for one client connection."""
+    config = get_config()
+    subscription = await publisher.subscribe(cabin_ids)
+    try:
+        yield f"retry: {int(config['POLL_INTERVAL'] * 1000) + 1000}\n\n"
+        last_sent = last_event_id or 0
+        if last_event_id is not None:
+            backlog = publisher.buffered_since(last_event_id, cabin_ids)
+            if backlog is None:
+                backlog = await sync_to_async(fetch_events_after)(last_event_id, cabin_ids, config['BUFFER_SIZE'] + 1)
+            if len(backlog) > config['BUFFER_SIZE']:
+                # Too far behind to replay: tell the client to reload its lists.
+                last_sent = publisher.last_id
+                yield "event: reset\ndata: {}\n\n"
+            else:
+                for event in backlog:
+                    if event.pk > last_sent:
+                        last_sent = event.pk
+                        yield format_sse(event)
+
+        while not subscription.dropped or not subscription.queue.empty():
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=config['HEARTBEAT'])
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event.pk > last_sent:
+                last_sent = event.pk
+                yield format_sse(event)
+    finally:
+        publisher.unsubscribe(subscription)
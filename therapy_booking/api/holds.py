@@ -0,0 +1,68 @@
+"""
+Short-lived holds on available slots.
+
+A therapist holds a slot while looking at it and then confirms the hold into
+a booking. Each step is a single guarded UPDATE, so two concurrent requests
+cannot both succeed and no row locks are kept between requests. A hold is
+live while hold_expires_at is in the future. Every read and write path
+treats an expired hold as released (BookingQuerySet.unheld), and
+release_expired_holds() clears the stale columns in batches; run it
+periodically (`manage.py release_expired_holds`, or the scheduler job).
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .conf import app_settings
+from .models import Booking
+
+DEFAULT_CONFIG = {
+    'TTL_SECONDS': 300, # How long a hold lasts
+    'SWEEP_BATCH_SIZE': 500, # Rows cleared per UPDATE by release_expired_holds()
+}
+
+
+def get_config():
+    return app_settings('SLOT_HOLDS', DEFAULT_CONFIG)
+
+
+def _open_slot(slot_id):
+    # Holds apply to single-seat slots; multi-seat slots are booked seat by seat (api/seats.py).
+    return Booking.objects.filter(pk=slot_id, status='available', therapist__isnull=True, seats_total=1).visible()
+
+
+def place_hold(slot_id, user):
+    """Hold (or extend the user's hold on) an open slot. Returns the expiry, or None if it cannot be held."""
+    expires_at = timezone.now() + timedelta(seconds=get_config()['TTL_SECONDS'])
+    updated = _open_slot(slot_id).unheld(user).update(held_by=user, hold_expires_at=expires_at)
+    return expires_at if updated else None
+
+
+def release_hold(slot_id, user):
+    return bool(Booking.objects.filter(pk=slot_id, held_by=user).update(held_by=None, hold_expires_at=None))
+
+
+def claim_slot(slot_id, user, require_hold=False):
+    """
+    Book an open slot for `user`. Fails if someone else holds it, or, with
+    require_hold, unless `user` holds it. Returns whether the slot was booked.
+    """
+    slots = _open_slot(slot_id)
+    if require_hold:
+        slots = slots.filter(held_by=user, hold_expires_at__gt=timezone.now())
+    else:
+        slots = slots.unheld(user)
+    return bool(slots.update(therapist=user, status='booked', held_by=None, hold_expires_at=None))
+
+
+def release_expired_holds(batch_size=None):
+    """Clear expired holds, batch_size rows per UPDATE. Returns the number released."""
+    batch_size = batch_size or get_config()['SWEEP_BATCH_SIZE']
+    now = timezone.now()
+    released = 0
+    while True:
+        ids = list(Booking.objects.filter(hold_expires_at__lte=now).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return released
+        # Re-checked in the UPDATE in case the slot was held again meanwhile.
+        released += Booking.objects.filter(pk__in=ids, hold_expires_at__lte=now).update(held_by=None, hold_expires_at=None)
@@ -0,0 +1,118 @@
+"""
+Idempotency-Key support for mutating endpoints.
+
+Clients on flaky networks retry writes. When a request carries an
+`Idempotency-Key` header, the first response (anything below 500), headers
+such as Location and ETag included, is kept in the cache for TTL_SECONDS.
+A retry with the same key, user, method and path gets that response back
+with `Idempotent-Replayed: true`. Like any request, the retry is first
+authenticated, permission-checked and throttled, so a replay uses up
+throttle quota (BookingThrottle's on the booking views); it never reaches
+the view's row fetches, writes or emails. A duplicate that arrives while
+the first request is still running waits up to WAIT_SECONDS for its
+result instead of running in parallel (cache.add acts as the lock).
+Reusing a key with a different body is rejected.
+
+Keys live in CACHE_ALIAS, the 'shared' database cache, so a retry that
+lands on another worker process is replayed too, and the lock holds across
+processes: its add() is an insert guarded by the cache table's primary key.
+"""
+import hashlib
+import time
+
+from django.core.cache import caches
+from rest_framework import permissions, status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from .conf import app_settings
+
+DEFAULT_CONFIG = {
+    'CACHE_ALIAS': 'shared',
+    'TTL_SECONDS': 24 * 60 * 60, # How long a response is replayed
+    'LOCK_SECONDS': 30, # Upper bound on one execution; the lock expires after this if a worker dies
+    'WAIT_SECONDS': 5, # How long a concurrent duplicate waits for the first result
+    'POLL_INTERVAL': 0.05,
+    'MAX_KEY_LENGTH': 255,
+}
+
+HEADER = 'Idempotency-Key'
+
+# Set again when the replayed response is rendered, so not stored.
+RENDERED_HEADERS = {'content-type', 'content-length'}
+
+
+def get_config():
+    return app_settings('IDEMPOTENCY', DEFAULT_CONFIG)
+
+
+class IdempotencyKeyInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still being processed."
+    default_code = 'idempotency_in_progress'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used for a different request."
+    default_code = 'idempotency_key_reused'
+
+
+class _Replay(Exception):
+    def __init__(self, stored):
+        self.stored = stored
+
+
+class IdempotentMixin:
+    """Honours the Idempotency-Key header on a view's unsafe methods (see module docstring)."""
+
+    def initial(self, request, *args, **kwargs):
+        self._idempotency = None
+        super().initial(request, *args, **kwargs)
+        key = request.headers.get(HEADER)
+        if not key or request.method in permissions.SAFE_METHODS:
+            return
+
+        config = get_config()
+        if len(key) > config['MAX_KEY_LENGTH']:
+            raise ValidationError({HEADER: f"Must be at most {config['MAX_KEY_LENGTH']} characters."})
+        cache = caches[config['CACHE_ALIAS']]
+        user_id = request.user.pk if request.user and request.user.is_authenticated else 'anonymous'
+        scope = f"idempotency:{user_id}:{request.method}:{request.path}:{key}"
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+
+        deadline = time.monotonic() + config['WAIT_SECONDS']
+        while True:
+            stored = cache.get(scope)
+            if stored is not None:
+                if stored['fingerprint'] != fingerprint:
+                    raise IdempotencyKeyReused()
+                raise _Replay(stored)
+            if cache.add(f"{scope}:lock", fingerprint, timeout=config['LOCK_SECONDS']):
+                self._idempotency = (cache, scope, fingerprint, config['TTL_SECONDS'])
+                return
+            if time.monotonic() >= deadline:
+                raise IdempotencyKeyInProgress()
+            time.sleep(config['POLL_INTERVAL'])
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _Replay):
+            response = Response(exc.stored['data'], status=exc.stored['status'])
+            for name, value in exc.stored['headers']:
+                response[name] = value
+            response['Idempotent-Replayed'] = 'true'
+            return response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, '_idempotency', None):
+            cache, scope, fingerprint, ttl = self._idempotency
+            self._idempotency = None
+            # Server errors are not stored, so a retry runs again.
+            if response.status_code < 500:
+                headers = [(name, value) for name, value in response.items() if name.lower() not in RENDERED_HEADERS]
+                stored = {'fingerprint': fingerprint, 'status': response.status_code, 'data': response.data, 'headers': headers}
+                cache.set(scope, stored, timeout=ttl)
+            cache.delete(f"{scope}:lock")
+        return response
@@ -0,0 +1,157 @@
+"""
+Housekeeping jobs for the scheduler (api/scheduler.py). Each returns the
+rows it affected, summed over every shard; batch sizes and retention are
+in SCHEDULER.
+
+- expire_past_slots: open slots whose start time has passed become
+  'expired', so listings stop walking them and they can no longer be booked.
+- release_expired_holds, run_deletion_jobs, archive_bookings: the work of
+  the management commands of the same names.
+- purge_expired: expired sessions, expired entries of database caches
+  (rate-limit counters, idempotency keys) and old JobRuns.
+- optimize_database / analyze_database: keep the query planner's
+  statistics fresh (PRAGMA optimize hourly, a full ANALYZE nightly) and,
+  on SQLite databases with auto_vacuum=INCREMENTAL, hand free pages back
+  to the file system. Switching a database to incremental vacuum takes one
+  `PRAGMA auto_vacuum = INCREMENTAL; VACUUM;` while the app is stopped.
+"""
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from .archive import archive_bookings as archive_old_bookings
+from .deletion import run_pending_jobs
+from .events import record_slot_changes
+from .holds import release_expired_holds as release_holds
+from .models import Booking, JobRun
+from .query_budget import cache_tables
+from .scheduler import get_config, job
+from .sharding import current_db, shard_aliases, use_shard
+
+
+def per_shard(func, *args):
+    """Sum of func(*args) run with each shard pinned in turn."""
+    total = 0
+    for alias in shard_aliases():
+        with use_shard(alias):
+            total += func(*args)
+    return total
+
+
+def _expire_slots(now, batch_size):
+    expired = 0
+    while True:
+        with transaction.atomic(using=current_db()):
+            ids = list(
+                Booking.objects.filter(status='available', therapist__isnull=True, seats_taken=0, start_time__lt=now)
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                return expired
+            # Re-checked in the UPDATE in case a seat was taken meanwhile.
+            count = Booking.objects.filter(pk__in=ids, status='available', seats_taken=0).update(
+                status='expired', held_by=None, hold_expires_at=None
+            )
+            record_slot_changes(Booking.objects.filter(pk__in=ids, status='expired'), 'expired', previous=('available', None))
+        expired += count
+
+
+@job('expire_past_slots', every=5 * 60)
+def expire_past_slots(now=None, batch_size=None):
+    """
+    Mark open slots that started without being booked as 'expired', in
+    batches (booking_status_start_idx finds them). Multi-seat slots with
+    seats taken keep their status: those sessions take place.
+    """
+    return per_shard(_expire_slots, now or timezone.now(), batch_size or get_config()['BATCH_SIZE'])
+
+
+@job('release_expired_holds', every=60)
+def release_expired_holds():
+    return per_shard(release_holds, get_config()['BATCH_SIZE'])
+
+
+@job('run_deletion_jobs', every=60)
+def run_deletion_jobs():
+    return sum(deletion.rows_done for deletion in run_pending_jobs())
+
+
+@job('archive_bookings', cron='0 3 * * *')
+def archive_bookings():
+    return per_shard(archive_old_bookings)
+
+
+def purge_expired_cache_entries():
+    """
+    Delete expired entries from every database cache (see CACHES). Other
+    backends evict expired keys themselves or on access.
+    """
+    purged = 0
+    connection = connections[DEFAULT_DB_ALIAS] # Where ShardRouter sends database caches
+    now = connection.ops.adapt_datetimefield_value(timezone.now().replace(microsecond=0))
+    with connection.cursor() as cursor:
+        for table in cache_tables():
+            cursor.execute(f"DELETE FROM {connection.ops.quote_name(table)} WHERE expires < %s", [now])
+            purged += cursor.rowcount
+    return purged
+
+
+@job('purge_expired', every=60 * 60)
+def purge_expired():
+    purged = 0
+    session_store = import_module(settings.SESSION_ENGINE).SessionStore
+    if hasattr(session_store, 'get_model_class'): # Database-backed sessions
+        purged += session_store.get_model_class().objects.filter(expire_date__lt=timezone.now()).delete()[0]
+    else:
+        session_store.clear_expired()
+    purged += purge_expired_cache_entries()
+    cutoff = timezone.now() - timedelta(days=get_config()['RUN_RETENTION_DAYS'])
+    purged += JobRun.objects.filter(started_at__lt=cutoff).delete()[0]
+    return purged
+
+
+def _execute_everywhere(statements_for):
+    """Run statements_for(connection) on every shard's database."""
+    for alias in shard_aliases():
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            for sql in statements_for(connection):
+                cursor.execute(sql)
+
+
+@job('optimize_database', every=60 * 60)
+def optimize_database():
+    """Re-analyze the tables whose statistics have gone stale (SQLite; PostgreSQL's autovacuum does this)."""
+    _execute_everywhere(lambda connection: ["PRAGMA optimize"] if connection.vendor == 'sqlite' else [])
+    return 0
+
+
+def _free_pages(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA auto_vacuum")
+        if cursor.fetchone()[0] != 2: # Not INCREMENTAL
+            return None
+        cursor.execute("PRAGMA freelist_count")
+        return cursor.fetchone()[0]
+
+
+@job('analyze_database', cron='30 3 * * *')
+def analyze_database():
+    """Full ANALYZE, then on SQLite an incremental vacuum of up to VACUUM_PAGES pages. Returns the pages freed."""
+    _execute_everywhere(lambda connection: ["ANALYZE"] if connection.vendor in ('sqlite', 'postgresql') else [])
+    freed = 0
+    for alias in shard_aliases():
+        connection = connections[alias]
+        if connection.vendor != 'sqlite':
+            continue
+        before = _free_pages(connection)
+        if before is None:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA incremental_vacuum({int(get_config()['VACUUM_PAGES'])})")
+            cursor.fetchall()
+        freed += before - _free_pages(connection)
+    return freed
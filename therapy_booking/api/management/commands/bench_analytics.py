@@ -0,0 +1,66 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.analytics import booking_analytics
+from api.models import Booking, Cabin
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the admin booking analytics end to end (fetch + aggregate) "
+        "on synthetic data. The data is created inside a transaction that is "
+        "rolled back, so the database is left unchanged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cabins', type=int, default=50)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--slots-per-day', type=int, default=8, help="Slots per cabin per day.")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        rng = random.Random(42)
+        with transaction.atomic(using=using):
+            rows = self.populate(using, options['cabins'], options['days'], options['slots_per_day'], rng)
+            start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            end = start + timedelta(days=options['days'])
+
+            timings = []
+            for _ in range(options['repeat']):
+                began = time.perf_counter()
+                result = booking_analytics(start, end, using=using)
+                timings.append(time.perf_counter() - began)
+            transaction.set_rollback(True, using=using)
+
+        self.stdout.write(
+            f"{rows} bookings, {options['cabins']} cabins, {options['days']} days: "
+            f"best {min(timings) * 1000:.1f} ms, median {sorted(timings)[len(timings) // 2] * 1000:.1f} ms "
+            f"(utilization {result['totals']['utilization']:.2%})"
+        )
+
+    def populate(self, using, cabin_count, days, slots_per_day, rng):
+        cabins = Cabin.objects.using(using).bulk_create(
+            [Cabin(name=f"Benchmark Cabin {i}") for i in range(cabin_count)]
+        )
+        day_start = timezone.now().replace(hour=8, minute=0, second=0, microsecond=0)
+        bookings = []
+        for day in range(days):
+            for cabin in cabins:
+                for slot in range(slots_per_day):
+                    start = day_start + timedelta(days=day, hours=slot * 1.5)
+                    booked = rng.random() < 0.6
+                    bookings.append(Booking(
+                        cabin=cabin, start_time=start, end_time=start + timedelta(hours=1, minutes=30),
+                        status='booked' if booked else rng.choice(['available', 'available', 'cancelled']),
+                        price=Decimal(rng.choice(['60.00', '80.00', '120.00'])),
+                    ))
+        Booking.objects.using(using).bulk_create(bookings, batch_size=5000)
+        return len(bookings)
@@ -0,0 +1,117 @@
+import random
+import time
+from datetime import datetime, time as clock, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.availability import AvailabilityIndex
+from api.models import Booking, Cabin
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the in-process availability index against the ORM for "
+        "'is cabin X free 10:00-12:00 on each of the next N days' and report "
+        "the index's memory footprint. The data is created inside a "
+        "transaction that is rolled back, so the database is left unchanged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cabins', type=int, default=100)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--slots-per-day', type=int, default=8, help="Slots per cabin per day.")
+        parser.add_argument('--window-days', type=int, default=30)
+        parser.add_argument('--queries', type=int, default=200)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        with transaction.atomic():
+            cabins, rows = self.populate(options['cabins'], options['days'], options['slots_per_day'], rng)
+            index = AvailabilityIndex()
+
+            began = time.perf_counter()
+            for cabin in cabins:
+                index.bitmap(cabin.id)
+            build = time.perf_counter() - began
+
+            today = timezone.localdate()
+            questions = [
+                (rng.choice(cabins).id, today + timedelta(days=rng.randrange(options['days'] - options['window_days'])))
+                for _ in range(options['queries'])
+            ]
+            window = (clock(10), clock(12))
+            index_answers, index_time = self.run(
+                questions, lambda cabin_id, day: index.free_on(cabin_id, day, options['window_days'], *window)
+            )
+            orm_answers, orm_time = self.run(
+                questions, lambda cabin_id, day: self.orm_free_on(cabin_id, day, options['window_days'], *window)
+            )
+            transaction.set_rollback(True)
+
+        if index_answers != orm_answers:
+            self.stderr.write("Index and ORM answers differ.")
+        self.stdout.write(
+            f"{rows} slots, {options['cabins']} cabins, {options['days']} days: "
+            f"index built in {build * 1000:.0f} ms, {index.memory_bytes() / 1024:.0f} KiB "
+            f"({index.cells_per_day}-bit days, two bitmaps per cabin)"
+        )
+        self.stdout.write(
+            f"{options['queries']} x free 10:00-12:00 on {options['window_days']} days: "
+            f"index {index_time / options['queries'] * 1000:.3f} ms/query, "
+            f"ORM {orm_time / options['queries'] * 1000:.3f} ms/query"
+        )
+
+    @staticmethod
+    def run(questions, answer):
+        began = time.perf_counter()
+        answers = [answer(cabin_id, day) for cabin_id, day in questions]
+        return answers, time.perf_counter() - began
+
+    @staticmethod
+    def orm_free_on(cabin_id, start_date, days, time_from, time_to):
+        """The same question answered from Booking rows: one range query, then a sweep per day."""
+        tz = timezone.get_default_timezone()
+        first = timezone.make_aware(datetime.combine(start_date, clock.min), tz)
+        rows = list(Booking.objects.filter(
+            cabin_id=cabin_id, status__in=['available', 'booked'],
+            start_time__lt=first + timedelta(days=days), end_time__gt=first,
+        ).order_by('start_time').values_list('start_time', 'end_time', 'status'))
+        answers = []
+        for day in range(days):
+            date = start_date + timedelta(days=day)
+            window_start = timezone.make_aware(datetime.combine(date, time_from), tz)
+            window_end = timezone.make_aware(datetime.combine(date, time_to), tz)
+            covered_until = window_start
+            free = True
+            for start_time, end_time, status in rows:
+                if end_time <= window_start or start_time >= window_end:
+                    continue
+                if status == 'booked':
+                    free = False
+                    break
+                if start_time <= covered_until:
+                    covered_until = max(covered_until, end_time)
+            answers.append(free and covered_until >= window_end)
+        return answers
+
+    def populate(self, cabin_count, days, slots_per_day, rng):
+        cabins = Cabin.objects.bulk_create([Cabin(name=f"Benchmark Cabin {i}") for i in range(cabin_count)])
+        day_start = timezone.make_aware(
+            datetime.combine(timezone.localdate(), clock(8)), timezone.get_default_timezone()
+        )
+        bookings = []
+        for day in range(days):
+            for cabin in cabins:
+                for slot in range(slots_per_day):
+                    start = day_start + timedelta(days=day, hours=slot)
+                    booked = rng.random() < 0.3
+                    bookings.append(Booking(
+                        cabin=cabin, start_time=start, end_time=start + timedelta(hours=1),
+                        status='booked' if booked else rng.choice(['available', 'available', 'cancelled']),
+                        price=Decimal(rng.choice(['60.00', '80.00', '120.00'])),
+                    ))
+        Booking.objects.bulk_create(bookings, batch_size=5000)
+        return cabins, len(bookings)
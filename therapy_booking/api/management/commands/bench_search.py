@@ -0,0 +1,75 @@
+import random
+import string
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from api.search import search_therapists
+
+User = get_user_model()
+
+FIRST_NAMES = ['Anna', 'Ben', 'Chloe', 'David', 'Eva', 'Felix', 'Grace', 'Hugo', 'Iris', 'Jonas', 'Lena', 'Marco']
+LAST_NAMES = ['Bauer', 'Costa', 'Dubois', 'Evans', 'Fischer', 'Garcia', 'Hansen', 'Ivanov', 'Jensen', 'Keller']
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the admin therapist search (FTS5) against a LIKE '%q%' "
+        "scan as the user table grows. The users are created inside a "
+        "transaction that is rolled back, so the database is left unchanged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000', help="Comma-separated user counts to measure at.")
+        parser.add_argument('--queries', type=int, default=100)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        with transaction.atomic():
+            created = 0
+            for size in sizes:
+                created += self.populate(created, size - created, rng)
+                queries = [self.query(rng) for _ in range(options['queries'])]
+                fts = self.run(queries, search_therapists)
+                like = self.run(queries, self.like_search)
+                self.stdout.write(f"{size:>7} users: fts {fts:.2f} ms/query, LIKE scan {like:.2f} ms/query")
+            transaction.set_rollback(True)
+
+    def populate(self, offset, count, rng):
+        users = []
+        for number in range(offset, offset + count):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            users.append(User(
+                username=f"{first.lower()}{number}", first_name=first, last_name=last,
+                email=f"{first.lower()}.{last.lower()}{number}@example.com",
+                phone_number=f"555-{number:07d}", is_therapist=True, password='!',
+            ))
+        User.objects.bulk_create(users, batch_size=2000)
+        return count
+
+    @staticmethod
+    def query(rng):
+        kind = rng.randrange(3)
+        if kind == 0:
+            return rng.choice(LAST_NAMES)[:4]
+        if kind == 1:
+            return f"{rng.choice(FIRST_NAMES).lower()}{rng.randrange(1000)}"
+        return ''.join(rng.choice(string.digits) for _ in range(4))
+
+    @staticmethod
+    def like_search(query):
+        columns = ('username', 'first_name', 'last_name', 'email', 'phone_number')
+        return list(User.objects.filter(
+            Q.create([(f'{column}__icontains', query) for column in columns], connector=Q.OR), is_therapist=True
+        )[:20])
+
+    @staticmethod
+    def run(queries, search):
+        began = time.perf_counter()
+        for query in queries:
+            search(query)
+        return (time.perf_counter() - began) * 1000 / len(queries)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.holds import release_expired_holds
+from api.sharding import shard_aliases, use_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Clear expired slot holds in batches. Expired holds are already ignored "
+        "by listings and booking, so this only tidies the columns; schedule it "
+        "every few minutes (e.g. from cron)."
+    )
+    # Cron entry point: skip system checks, which import every view through the URLconf.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help="Rows per UPDATE (default: SLOT_HOLDS['SWEEP_BATCH_SIZE']).")
+
+    def handle(self, *args, **options):
+        released = 0
+        for alias in shard_aliases():
+            with use_shard(alias):
+                released += release_expired_holds(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired holds."))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.deletion import run_deletion_job, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued cabin and user deletions (api/deletion.py), archiving or "
+        "reopening their bookings in batches. Schedule it every few minutes "
+        "(e.g. from cron). Safe to interrupt; resume a job with --job."
+    )
+    # Cron entry point: skip system checks, which import every view through the URLconf.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', type=int, default=None, help="Run only this job, resuming it if it failed or was interrupted.")
+
+    def handle(self, *args, **options):
+        if options['job'] is not None:
+            job = run_deletion_job(options['job'], resume=True)
+            if job is None:
+                raise CommandError(f"Deletion job {options['job']} does not exist or is already done.")
+            jobs = [job]
+        else:
+            jobs = run_pending_jobs()
+        for job in jobs:
+            line = f"Job {job.pk} ({job.kind} {job.target_name!r}): {job.status}, {job.rows_done}/{job.rows_total} rows."
+            self.stdout.write(self.style.SUCCESS(line) if job.status == 'done' else self.style.ERROR(f"{line} {job.error}"))
+        if not jobs:
+            self.stdout.write("No deletion jobs to run.")
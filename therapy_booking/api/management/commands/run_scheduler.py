@@ -0,0 +1,59 @@
+import signal
+from threading import Event
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.scheduler import Scheduler, load_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the periodic maintenance jobs (api/maintenance.py) on their "
+        "schedules until stopped, recording each run as a JobRun. With --once, "
+        "run the jobs that are due and exit (to drive it from cron instead)."
+    )
+    # Long-running entry point: skip system checks, which import every view through the URLconf.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the jobs that are due, then exit.")
+        parser.add_argument('--run', action='append', metavar='JOB', default=[], help="Run this job now, due or not, then exit. Repeatable.")
+        parser.add_argument('--list', action='store_true', help="List the jobs with their schedules and next run.")
+
+    def handle(self, *args, **options):
+        if options['run']:
+            jobs = load_jobs()
+            unknown = [name for name in options['run'] if name not in jobs]
+            if unknown:
+                raise CommandError(f"Unknown or disabled jobs: {', '.join(unknown)}. Known: {', '.join(sorted(jobs))}.")
+            for name in options['run']:
+                self.report(name, run_job(jobs[name]))
+            return
+
+        scheduler = Scheduler()
+        if options['list']:
+            for name, job in sorted(scheduler.jobs.items()):
+                next_due = timezone.localtime(scheduler.next_due[name])
+                self.stdout.write(f"{name:<24} {job.schedule!s:<20} next {next_due:%Y-%m-%d %H:%M}")
+            return
+        if options['once']:
+            for run in scheduler.run_due():
+                self.report(run.name, run)
+            return
+
+        stop = Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        self.stdout.write(f"Scheduler running {len(scheduler.jobs)} jobs; stop with Ctrl-C or SIGTERM.")
+        try:
+            scheduler.run_forever(stop)
+        except KeyboardInterrupt:
+            pass
+
+    def report(self, name, run):
+        if run is None:
+            self.stdout.write(f"{name}: skipped, already running elsewhere.")
+        elif run.status == 'ok':
+            self.stdout.write(self.style.SUCCESS(f"{name}: {run.rows} rows in {run.duration_ms:.0f} ms."))
+        else:
+            self.stdout.write(self.style.ERROR(f"{name}: failed after {run.duration_ms:.0f} ms: {run.error}"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from api.models import Location, User
+from api.sharding import is_sharded, replicate_reference_row, set_id_ranges, shard_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy every user and location from the default database to the other "
+        "shards in SHARDING['SHARDS'] and set their id ranges. Run once after "
+        "adding (and migrating) a shard; later changes are copied as they are saved."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows read per query.")
+
+    def handle(self, *args, **options):
+        if not is_sharded():
+            raise CommandError("SHARDING['SHARDS'] lists a single shard; nothing to copy.")
+        for alias in shard_aliases()[1:]:
+            set_id_ranges(alias)
+        copied = 0
+        for model in (Location, User):
+            for instance in model.objects.using(DEFAULT_DB_ALIAS).order_by('pk').iterator(chunk_size=options['batch_size']):
+                replicate_reference_row(instance)
+                copied += 1
+        self.stdout.write(self.style.SUCCESS(f"Copied {copied} reference rows to {len(shard_aliases()) - 1} shards."))
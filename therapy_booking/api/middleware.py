@@ -0,0 +1,132 @@
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+import logging
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .query_budget import QueryBudgetExceeded, QueryCounter, get_mode as get_query_budget_mode, get_query_budget
+from .query_log import QueryInstrumentation, current_view, get_config
+from .sharding import current_shard, is_sharded, resolve_request_shard
+
+budget_logger = logging.getLogger('api.query_budget')
+
+# Factories (alias -> execute_wrapper callable) of the wrappers installed on
+# the request's connections, for threads doing part of its work.
+request_wrappers = ContextVar('request_wrappers', default=())
+
+
+@contextmanager
+def wrap_connections(factory):
+    """Wrap every connection with factory(alias) until the block exits."""
+    token = request_wrappers.set(request_wrappers.get() + (factory,))
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(factory(alias)))
+            yield
+    finally:
+        request_wrappers.reset(token)
+
+
+@contextmanager
+def wrap_thread_connections():
+    """
+    Wrap this thread's connections as the request's are. For a thread doing
+    part of a request's work, run in a copy of the request's context
+    (contextvars.copy_context()), so its queries are counted and logged too.
+    """
+    with ExitStack() as stack:
+        for factory in request_wrappers.get():
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(factory(alias)))
+        yield
+
+
+def view_name(view_func):
+    """Dotted name of the view class (or function) behind a resolved URL."""
+    view = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None) or view_func
+    return f"{view.__module__}.{view.__qualname__}"
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Wraps every database connection with QueryInstrumentation for the
+    duration of the request. Disabled unless SLOW_QUERY_LOG['ENABLED'] is set.
+    """
+
+    def __init__(self, get_response):
+        if not get_config()['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_view.set(None)
+        try:
+            with wrap_connections(lambda alias: QueryInstrumentation(using=alias)):
+                return self.get_response(request)
+        finally:
+            current_view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        current_view.set(view_name(view_func))
+        return None
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the queries run while handling a request and compares them with
+    the resolved view's query_budget. Depending on QUERY_BUDGET_MODE an
+    overrun is logged as an alert ('log') or fails the request ('raise').
+    """
+
+    def __init__(self, get_response):
+        self.mode = get_query_budget_mode()
+        if self.mode == 'off':
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        with wrap_connections(lambda alias: counter):
+            response = self.get_response(request)
+
+        budget = getattr(request, '_query_budget', None)
+        if budget is not None and counter.count > budget:
+            message = "Query budget exceeded: %s ran %d queries (budget %d) for %s %s"
+            args = (request._query_budget_view, counter.count, budget, request.method, request.path)
+            if self.mode == 'raise':
+                raise QueryBudgetExceeded(message % args)
+            budget_logger.error(
+                message, *args,
+                extra={'view': request._query_budget_view, 'queries': counter.count, 'budget': budget},
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = get_query_budget(view_func)
+        request._query_budget_view = view_name(view_func)
+        return None
+
+
+class ShardMiddleware:
+    """
+    Pins the shard a request is about (see api/sharding.py) for the
+    duration of the view. Disabled unless SHARDING lists more than one shard.
+    """
+
+    def __init__(self, get_response):
+        if not is_sharded():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_shard.set(None)
+        try:
+            return self.get_response(request)
+        finally:
+            current_shard.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        current_shard.set(resolve_request_shard(request, view_kwargs))
+        return None
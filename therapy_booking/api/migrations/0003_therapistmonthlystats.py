@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_alter_booking_therapist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TherapistMonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('booked_count', models.IntegerField(default=0)),
+                ('booked_seconds', models.BigIntegerField(default=0)),
+                ('booked_spend', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cancelled_count', models.IntegerField(default=0)),
+                ('therapist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('therapist', 'month'), name='unique_therapist_month_stats')],
+            },
+        ),
+    ]
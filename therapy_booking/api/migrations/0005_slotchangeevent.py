@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_booking_status_start_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('booked', 'Booked'), ('cancelled', 'Cancelled'), ('deleted', 'Deleted')], max_length=20)),
+                ('booking_id', models.BigIntegerField()),
+                ('cabin_id', models.BigIntegerField()),
+                ('therapist_id', models.BigIntegerField(blank=True, null=True)),
+                ('status', models.CharField(max_length=20)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
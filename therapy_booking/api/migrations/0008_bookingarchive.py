@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_booking_holds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('therapist_id', models.BigIntegerField(blank=True, null=True)),
+                ('therapist_username', models.CharField(blank=True, max_length=150)),
+                ('cabin_id', models.BigIntegerField()),
+                ('cabin_name', models.CharField(max_length=100)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('status', models.CharField(choices=[('available', 'Available'), ('booked', 'Booked'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['start_time'], name='archive_start_idx'), models.Index(fields=['therapist_id', 'start_time'], name='archive_therapist_start_idx')],
+            },
+        ),
+    ]
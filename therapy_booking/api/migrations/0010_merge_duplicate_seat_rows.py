@@ -0,0 +1,56 @@
+from collections import Counter, defaultdict
+
+from django.db import migrations
+
+
+def merge_duplicate_seat_rows(apps, schema_editor):
+    """
+    Cabins with capacity > 1 used one Booking row per seat and time slot.
+    Collapse each group of identical rows (cabin, start, end, price) into its
+    lowest-id row: non-cancelled rows become seats, and each booked or
+    cancelled row becomes a Reservation for its therapist.
+    """
+    Booking = apps.get_model('api', 'Booking')
+    Reservation = apps.get_model('api', 'Reservation')
+
+    groups = defaultdict(list)
+    rows = (
+        Booking.objects.filter(cabin__capacity__gt=1)
+        .order_by('pk')
+        .values_list('pk', 'cabin_id', 'start_time', 'end_time', 'price', 'status', 'therapist_id')
+    )
+    for pk, cabin_id, start_time, end_time, price, status, therapist_id in rows.iterator():
+        groups[(cabin_id, start_time, end_time, price)].append((pk, status, therapist_id))
+
+    for members in groups.values():
+        seats = [member for member in members if member[1] != 'cancelled']
+        if len(seats) < 2:
+            continue
+        slot_id = members[0][0]
+        taken = Counter(therapist_id for _, status, therapist_id in seats if status == 'booked' and therapist_id)
+        # One live seat per therapist; a therapist's extra seats become cancelled reservations.
+        live = list(taken)
+        cancelled = [therapist_id for _, status, therapist_id in members if status == 'cancelled' and therapist_id]
+        cancelled += [therapist_id for therapist_id, count in taken.items() for _ in range(count - 1)]
+
+        Reservation.objects.bulk_create(
+            [Reservation(slot_id=slot_id, therapist_id=therapist_id, status='booked') for therapist_id in live]
+            + [Reservation(slot_id=slot_id, therapist_id=therapist_id, status='cancelled') for therapist_id in cancelled]
+        )
+        Booking.objects.filter(pk__in=[member[0] for member in members[1:]]).delete()
+        Booking.objects.filter(pk=slot_id).update(
+            therapist=None, held_by=None, hold_expires_at=None,
+            seats_total=len(seats), seats_taken=len(live),
+            status='booked' if len(live) >= len(seats) else 'available',
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_multi_seat_slots'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_seat_rows, migrations.RunPython.noop),
+    ]
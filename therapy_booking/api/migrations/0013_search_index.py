@@ -0,0 +1,57 @@
+from django.db import migrations
+
+# External-content FTS5 tables (see api/search.py): the index stores only
+# tokens and reads column values from the base table. Triggers keep it in
+# sync; updates that touch no indexed column (last_login, ...) skip it.
+# A later migration that makes SQLite rebuild api_user or api_cabin drops
+# their triggers with the old table, and must create them again.
+TABLES = {
+    'api_user': ('api_user_fts', ['username', 'first_name', 'last_name', 'email', 'phone_number']),
+    'api_cabin': ('api_cabin_fts', ['name', 'description']),
+}
+
+
+def create_sql(base, table, columns):
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {table} USING fts5({names}, content='{base}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER {table}_ai AFTER INSERT ON {base} BEGIN "
+        f"INSERT INTO {table} (rowid, {names}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER {table}_ad AFTER DELETE ON {base} BEGIN "
+        f"INSERT INTO {table} ({table}, rowid, {names}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER {table}_au AFTER UPDATE OF {names} ON {base} BEGIN "
+        f"INSERT INTO {table} ({table}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {table} (rowid, {names}) VALUES (new.id, {new}); END",
+        f"INSERT INTO {table} ({table}) VALUES ('rebuild')",
+    ]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return # Other databases use the icontains fallback in api/search.py
+    for base, (table, columns) in TABLES.items():
+        for statement in create_sql(base, table, columns):
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, _ in TABLES.values():
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_locations'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:20
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def stamp_existing_cabins(apps, schema_editor):
+    Cabin = apps.get_model('api', 'Cabin')
+    Cabin.objects.using(schema_editor.connection.alias).filter(updated_at__isnull=True).update(updated_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cabin',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(stamp_existing_cabins, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_deletion_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('available', 'Available'), ('booked', 'Booked'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], default='available', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='bookingarchive',
+            name='status',
+            field=models.CharField(choices=[('available', 'Available'), ('booked', 'Booked'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='slotchangeevent',
+            name='kind',
+            field=models.CharField(choices=[('created', 'Created'), ('booked', 'Booked'), ('cancelled', 'Cancelled'), ('deleted', 'Deleted'), ('expired', 'Expired')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('started_at', models.DateTimeField()),
+                ('duration_ms', models.FloatField()),
+                ('rows', models.BigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('ok', 'OK'), ('failed', 'Failed')], max_length=20)),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'started_at'], name='jobrun_name_started_idx'), models.Index(fields=['started_at'], name='jobrun_started_idx')],
+            },
+        ),
+    ]
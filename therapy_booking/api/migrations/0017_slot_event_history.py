@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:35
+
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth
+
+
+def fill_month(apps, schema_editor):
+    SlotChangeEvent = apps.get_model('api', 'SlotChangeEvent')
+    SlotChangeEvent.objects.using(schema_editor.connection.alias).update(
+        month=TruncMonth('created_at', output_field=models.DateField())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_scheduler_job_runs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slotchangeevent',
+            name='actor_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='slotchangeevent',
+            name='previous_status',
+            field=models.CharField(blank=True, default='', max_length=20),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='slotchangeevent',
+            name='previous_therapist_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='slotchangeevent',
+            name='month',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(fill_month, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='slotchangeevent',
+            name='month',
+            field=models.DateField(),
+        ),
+        migrations.AddIndex(
+            model_name='slotchangeevent',
+            index=models.Index(fields=['booking_id', 'month'], name='slotevent_booking_month_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_slot_event_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='slotchangeevent',
+            name='previous_end_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='slotchangeevent',
+            name='previous_start_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='slotchangeevent',
+            name='kind',
+            field=models.CharField(choices=[('created', 'Created'), ('booked', 'Booked'), ('cancelled', 'Cancelled'), ('deleted', 'Deleted'), ('expired', 'Expired'), ('updated', 'Updated')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_slot_versions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobrun',
+            name='status',
+            field=models.CharField(choices=[('running', 'Running'), ('ok', 'OK'), ('failed', 'Failed')], max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name='jobrun',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'running')), fields=('name',), name='unique_running_job'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:40
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_tables(apps, schema_editor):
+    # The 'shared' database cache (rate limits, idempotency keys); does nothing for tables that exist.
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_scheduler_run_lock'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_shared_cache_table'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='slotchangeevent',
+            name='kind',
+            field=models.CharField(choices=[('created', 'Created'), ('booked', 'Booked'), ('cancelled', 'Cancelled'), ('seat_taken', 'Seat taken'), ('seat_released', 'Seat released'), ('deleted', 'Deleted'), ('expired', 'Expired'), ('updated', 'Updated')], max_length=20),
+        ),
+    ]
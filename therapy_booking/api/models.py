@@ -1,5 +1,9 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from .sharding import ShardedQuerySet
 
 class User(AbstractUser):
     is_therapist = models.BooleanField(default=False)
@@ -9,19 +13,77 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+class Location(models.Model):
+    """A clinic. Its cabins and their bookings live on its `database` shard (see api/sharding.py)."""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(unique=True)
+    database = models.CharField(max_length=100, default='default') # An alias in SHARDING['SHARDS']
+
+    def __str__(self):
+        return self.name
+
+class CabinQuerySet(ShardedQuerySet):
+    """Keeps Cabin.updated_at current on bulk writes too, so the cabin catalog (api/catalog.py) sees every change."""
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
 class Cabin(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     capacity = models.IntegerField(default=1)
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name='cabins', null=True, blank=True) # None: default shard
+    # Cabin catalog version marker, stamped by save() and CabinQuerySet. Not auto_now and
+    # nullable so that adding it did not make SQLite rebuild the table (and drop its search triggers).
+    updated_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+    # Set when the cabin is queued for deletion (api/deletion.py): it leaves listings and booking at once.
+    hidden_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+
+    objects = CabinQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.updated_at = timezone.now()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'updated_at'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
+class BookingQuerySet(ShardedQuerySet):
+    """
+    Keeps Booking.updated_at current on bulk writes too (save() is covered
+    by auto_now), so delta sync (api/sync.py) sees every change.
+    """
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+    def unheld(self, user=None):
+        """Slots without a live hold, or held by `user`. Expired holds count as released (see api/holds.py)."""
+        free = Q(hold_expires_at__isnull=True) | Q(hold_expires_at__lte=timezone.now())
+        if user is not None:
+            free |= Q(held_by=user)
+        return self.filter(free)
+
+    def visible(self):
+        """Slots whose cabin is not hidden (queued for deletion, see api/deletion.py)."""
+        return self.exclude(cabin_id__in=Cabin.objects.filter(hidden_at__isnull=False).values('pk'))
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        return super().bulk_update(objs, list(dict.fromkeys([*fields, 'updated_at'])), batch_size=batch_size)
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('available', 'Available'),
         ('booked', 'Booked'),
         ('cancelled', 'Cancelled'),
+        ('expired', 'Expired'), # Started without being booked, see api/maintenance.py
     ]
     therapist = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings', null=True, blank=True) # Allow null and blank
     cabin = models.ForeignKey(Cabin, on_delete=models.CASCADE, related_name='bookings')
@@ -29,8 +91,231 @@ class Booking(models.Model):
     end_time = models.DateTimeField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True) # Reverted to nullable for now
+    updated_at = models.DateTimeField(auto_now=True) # Delta sync cursor, see BookingQuerySet
+    held_by = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='held_slots', null=True, blank=True)
+    hold_expires_at = models.DateTimeField(null=True, blank=True, db_index=True) # Hold is live while in the future
+    # Multi-seat slots (seats_total > 1) track each seat as a Reservation, see api/seats.py
+    seats_total = models.PositiveIntegerField(default=1)
+    seats_taken = models.PositiveIntegerField(default=0)
+    version = models.PositiveIntegerField(default=1) # Bumped by every edit of time or price, see api/slot_updates.py
+
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Lets "open slots (status, therapist IS NULL) ordered by start_time"
+            # walk the index in order and stop at LIMIT instead of sorting.
+            models.Index(fields=['status', 'therapist', 'start_time'], name='booking_status_start_idx'),
+            # Delta sync walks (updated_at, id) > cursor in order.
+            models.Index(fields=['updated_at', 'id'], name='booking_updated_idx'),
+            # Admin changelist: ordering by -start_time, -id and the start_time date hierarchy.
+            models.Index(fields=['start_time', 'id'], name='booking_start_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=Q(seats_taken__lte=models.F('seats_total')), name='booking_seats_not_oversold'),
+        ]
 
     def __str__(self):
         if self.therapist:
             return f"{self.therapist.username} - {self.cabin.name} ({self.start_time} - {self.end_time})"
         return f"Available Slot - {self.cabin.name} ({self.start_time} - {self.end_time})"
+
+class Reservation(models.Model):
+    """
+    One therapist's seat on a multi-seat slot (Booking with seats_total > 1).
+    Created and cancelled together with the slot's seats_taken counter.
+    """
+    STATUS_CHOICES = [
+        ('booked', 'Booked'),
+        ('cancelled', 'Cancelled'),
+    ]
+    slot = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='reservations')
+    therapist = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reservations')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='booked')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['therapist', 'status'], name='reservation_therapist_idx'),
+        ]
+        constraints = [
+            # One live seat per therapist and slot.
+            models.UniqueConstraint(
+                fields=['slot', 'therapist'], condition=Q(status='booked'), name='unique_live_reservation'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.therapist_id} - slot {self.slot_id} ({self.status})"
+
+class TherapistMonthlyStats(models.Model):
+    """
+    Per-therapist booking totals for the month of each booking's start_time.
+    Maintained in the same transaction as every booking transition (see api/stats.py).
+    """
+    therapist = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_stats')
+    month = models.DateField() # First day of the month
+    booked_count = models.IntegerField(default=0)
+    booked_seconds = models.BigIntegerField(default=0)
+    booked_spend = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cancelled_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['therapist', 'month'], name='unique_therapist_month_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.therapist_id} - {self.month:%Y-%m}"
+
+class SlotChangeEvent(models.Model):
+    """
+    Append-only log of slot changes, written in the same transaction as the
+    change. Its id is the SSE event id, so clients resume with Last-Event-ID.
+    Each event records who made the change (actor_id, None for background
+    jobs) and the slot's status and therapist before and after it, which is
+    a slot's history. booking_id/cabin_id/actor_id are plain columns so
+    events outlive deleted rows. `month` partitions the log: history is read
+    per slot and month, and a month can be pruned or moved out as a whole.
+    """
+    KIND_CHOICES = [
+        ('created', 'Created'),
+        ('booked', 'Booked'),
+        ('cancelled', 'Cancelled'),
+        # A seat on a multi-seat slot; the slot's status says whether seats remain.
+        ('seat_taken', 'Seat taken'),
+        ('seat_released', 'Seat released'),
+        ('deleted', 'Deleted'),
+        ('expired', 'Expired'),
+        ('updated', 'Updated'),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    booking_id = models.BigIntegerField()
+    cabin_id = models.BigIntegerField()
+    therapist_id = models.BigIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=20)
+    previous_therapist_id = models.BigIntegerField(null=True, blank=True)
+    previous_status = models.CharField(max_length=20, blank=True) # Empty for 'created'
+    actor_id = models.BigIntegerField(null=True, blank=True)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    # Set when the change moved the slot ('updated'), so the old time range can be recomputed too.
+    previous_start_time = models.DateTimeField(null=True, blank=True)
+    previous_end_time = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    month = models.DateField() # First day of the month of created_at
+
+    class Meta:
+        indexes = [
+            # A slot's history, whole or for one month.
+            models.Index(fields=['booking_id', 'month'], name='slotevent_booking_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} slot {self.booking_id}"
+
+class BookingArchive(models.Model):
+    """
+    Cold copy of bookings moved out of api_booking by `archive_bookings`
+    (see api/archive.py), keeping the original booking id. Therapist and
+    cabin are plain columns plus their names at archival time, so archived
+    rows outlive deleted users and cabins.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    therapist_id = models.BigIntegerField(null=True, blank=True)
+    therapist_username = models.CharField(max_length=150, blank=True)
+    cabin_id = models.BigIntegerField()
+    cabin_name = models.CharField(max_length=100)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_time'], name='archive_start_idx'),
+            models.Index(fields=['therapist_id', 'start_time'], name='archive_therapist_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived booking {self.pk} - {self.cabin_name} ({self.start_time} - {self.end_time})"
+
+class DeletionJob(models.Model):
+    """
+    A cabin or user being deleted in the background (see api/deletion.py).
+    The cabin is hidden, or the user deactivated, when the job is queued;
+    rows_done/rows_total report progress through its bookings and seats.
+    Stored on the default database whatever the target's shard.
+    """
+    KIND_CHOICES = [
+        ('cabin', 'Cabin'),
+        ('user', 'User'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    target_id = models.BigIntegerField()
+    target_name = models.CharField(max_length=150) # Kept for progress reports once the target is gone
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='+', null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    rows_total = models.IntegerField(default=0) # Bookings and seats to process, counted when a run starts
+    rows_done = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='deletion_job_status_idx'),
+        ]
+
+    @property
+    def progress(self):
+        """Fraction of rows processed, 1.0 once done."""
+        if self.status == 'done':
+            return 1.0
+        return min(self.rows_done / self.rows_total, 1.0) if self.rows_total else 0.0
+
+    def __str__(self):
+        return f"Delete {self.kind} {self.target_id} ({self.status})"
+
+class JobRun(models.Model):
+    """
+    One run of a scheduled maintenance job (see api/scheduler.py): when it
+    started, how long it took and how many rows it affected. A job has at
+    most one 'running' row at a time, which is what stops two schedulers
+    from running it together.
+    """
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('ok', 'OK'),
+        ('failed', 'Failed'),
+    ]
+    name = models.CharField(max_length=100)
+    started_at = models.DateTimeField()
+    duration_ms = models.FloatField()
+    rows = models.BigIntegerField(default=0) # Rows affected, summed over every shard
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # The scheduler's "last run of each job" and the admin changelist.
+            models.Index(fields=['name', 'started_at'], name='jobrun_name_started_idx'),
+            models.Index(fields=['started_at'], name='jobrun_started_idx'),
+        ]
+        constraints = [
+            # The per-job run lock: inserting a second running row fails.
+            models.UniqueConstraint(fields=['name'], condition=Q(status='running'), name='unique_running_job'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} at {self.started_at:%Y-%m-%d %H:%M} ({self.status})"
@@ -29,6 +29,10 @@ class IsOwnerOrAdmin(permissions.BasePermission):
         # Instance must have an attribute named `therapist`.
         if obj.therapist == request.user:
             return True
+
+        # A live seat on a multi-seat slot (see api/seats.py) also counts as ownership.
+        if getattr(obj, 'seats_total', 1) > 1 and obj.reservations.filter(therapist=request.user, status='booked').exists():
+            return True
         
         # Admin users can also perform the action.
         return bool(request.user and request.user.is_authenticated and (request.user.is_admin or request.user.is_superuser))
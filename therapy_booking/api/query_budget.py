@@ -0,0 +1,89 @@
+"""
+Per-view query budgets.
+
+Views declare ``query_budget = <max queries per request>``. The budget is
+checked at runtime by QueryBudgetMiddleware (see QUERY_BUDGET_MODE in
+settings) and in tests with QueryBudgetTestMixin.assertWithinQueryBudget.
+"""
+import logging
+import threading
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'log', 'raise')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def get_mode():
+    mode = getattr(settings, 'QUERY_BUDGET_MODE', 'log')
+    return mode if mode in MODES else 'log'
+
+
+def get_query_budget(view_func):
+    """Budget declared by the view class (or function) behind a resolved URL, if any."""
+    view = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None) or view_func
+    return getattr(view, 'query_budget', None)
+
+
+def cache_tables():
+    """Tables of database caches (see CACHES); their statements are cache round trips, not the view's queries."""
+    return tuple(
+        cache['LOCATION'] for cache in settings.CACHES.values()
+        if cache['BACKEND'] == 'django.core.cache.backends.db.DatabaseCache'
+    )
+
+
+class QueryCounter:
+    """
+    execute_wrapper callable counting statements across connections, and
+    threads (see wrap_thread_connections()), except those on database caches.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.ignored_tables = cache_tables()
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        if not any(table in sql for table in self.ignored_tables):
+            with self.lock:
+                self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetTestMixin:
+    """
+    Mixin for APITestCase. assertWithinQueryBudget() requests a list URL with
+    a small and a large number of rows and fails if either request exceeds
+    the view's budget or if the query count changes with the row count.
+    """
+
+    def assertWithinQueryBudget(self, url, populate, sizes=(1, 500), budget=None, using='default'):
+        if budget is None:
+            budget = get_query_budget(resolve(urlsplit(url).path).func)
+        self.assertIsNotNone(budget, f"No query_budget declared for the view serving {url}")
+
+        counts = {}
+        populated = 0
+        for size in sizes:
+            populate(size - populated) # populate(n) adds n more rows
+            populated = size
+            with CaptureQueriesContext(connections[using]) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, f"GET {url} returned {response.status_code}")
+            counts[size] = len(context)
+
+        over_budget = {size: count for size, count in counts.items() if count > budget}
+        if over_budget:
+            self.fail(f"GET {url} exceeded its budget of {budget} queries: {over_budget} (rows: queries)")
+        if len(set(counts.values())) > 1:
+            self.fail(f"GET {url} query count grows with row count: {counts} (rows: queries)")
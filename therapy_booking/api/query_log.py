@@ -0,0 +1,186 @@
+"""
+Opt-in database instrumentation: slow query logging with EXPLAIN capture and
+an in-memory table of the most expensive normalized queries.
+
+Installed per request by QueryInstrumentationMiddleware through
+connection.execute_wrapper() when SLOW_QUERY_LOG['ENABLED'] is set.
+Statements slower than THRESHOLD_MS are logged with normalized SQL,
+redacted params, the calling view and an EXPLAIN plan. The top TOP_N
+normalized queries by total time are served at
+/api/admin/diagnostics/queries/ (per process).
+"""
+import contextvars
+import logging
+import re
+import threading
+import time
+
+from django.db import connections
+
+from .conf import app_settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'ENABLED': False,
+    'THRESHOLD_MS': 200,
+    'EXPLAIN': True,
+    'TOP_N': 50,
+    'MAX_ENTRIES': 500,
+}
+
+# Name of the view handling the current request, set by the middleware.
+current_view = contextvars.ContextVar('current_view', default=None)
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%s|\?")
+_IN_LIST_RE = re.compile(r"\bIN \(\?(?:, \?)*\)", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def get_config():
+    return app_settings('SLOW_QUERY_LOG', DEFAULT_CONFIG)
+
+
+def normalize_sql(sql):
+    """
+    Collapse a statement to its shape so that executions differing only in
+    literal values or IN-list length are grouped together.
+    """
+    sql = _WHITESPACE_RE.sub(' ', sql).strip()
+    sql = _STRING_LITERAL_RE.sub('?', sql)
+    sql = _NUMBER_LITERAL_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    return _IN_LIST_RE.sub('IN (...)', sql)
+
+
+def redact_params(params, many=False):
+    """Replace parameter values with their type names so no user data reaches the log."""
+    if params is None:
+        return None
+    if many:
+        return f"<{len(params)} parameter sets>"
+    if isinstance(params, dict):
+        return {key: _redact_value(value) for key, value in params.items()}
+    return [_redact_value(value) for value in params]
+
+
+def _redact_value(value):
+    if value is None:
+        return None
+    return f"<{type(value).__name__}>"
+
+
+def explain_query(sql, params, using='default'):
+    """
+    Capture the plan for a SELECT on a side connection, so the instrumented
+    connection's cursor and transaction are left untouched.
+    Returns a list of plan lines, or None if the plan could not be captured.
+    """
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    side_connection = connections[using].copy()
+    try:
+        prefix = 'EXPLAIN QUERY PLAN ' if side_connection.vendor == 'sqlite' else 'EXPLAIN '
+        with side_connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+    except Exception as e:
+        logger.debug("Could not capture query plan: %s", e)
+        return None
+    finally:
+        side_connection.close()
+
+
+class QueryStats:
+    """
+    Thread-safe aggregate of execution time per normalized statement.
+    Bounded to max_entries; when full, the cheapest entry is evicted.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CONFIG['MAX_ENTRIES']):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def record(self, normalized_sql, duration_ms):
+        with self._lock:
+            entry = self._entries.get(normalized_sql)
+            if entry is None:
+                if len(self._entries) >= self.max_entries:
+                    cheapest = min(self._entries, key=lambda sql: self._entries[sql][1])
+                    del self._entries[cheapest]
+                entry = self._entries[normalized_sql] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += duration_ms
+            entry[2] = max(entry[2], duration_ms)
+
+    def top(self, limit=None):
+        with self._lock:
+            items = sorted(self._entries.items(), key=lambda item: item[1][1], reverse=True)
+        if limit is not None:
+            items = items[:limit]
+        return [
+            {
+                'sql': sql,
+                'calls': calls,
+                'total_ms': round(total, 3),
+                'mean_ms': round(total / calls, 3),
+                'max_ms': round(maximum, 3),
+            }
+            for sql, (calls, total, maximum) in items
+        ]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide table dumped by the admin diagnostics endpoint.
+query_stats = QueryStats()
+
+
+class QueryInstrumentation:
+    """
+    execute_wrapper callable: times every statement, feeds query_stats and
+    logs statements slower than threshold_ms together with their plan.
+    """
+
+    def __init__(self, using='default', threshold_ms=None, explain=None, stats=None):
+        config = get_config()
+        self.using = using
+        self.threshold_ms = config['THRESHOLD_MS'] if threshold_ms is None else threshold_ms
+        self.explain = config['EXPLAIN'] if explain is None else explain
+        self.stats = query_stats if stats is None else stats
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            normalized = normalize_sql(sql)
+            self.stats.record(normalized, duration_ms)
+            if duration_ms >= self.threshold_ms:
+                self.log_slow_query(sql, normalized, params, many, duration_ms)
+
+    def log_slow_query(self, sql, normalized, params, many, duration_ms):
+        plan = None
+        if self.explain and not many:
+            plan = explain_query(sql, params, using=self.using)
+        logger.warning(
+            "Slow query (%.1f ms) on %s in view %s: %s | params=%s | plan=%s",
+            duration_ms,
+            self.using,
+            current_view.get() or '-',
+            normalized,
+            redact_params(params, many),
+            ' / '.join(plan) if plan else '-',
+            extra={
+                'duration_ms': duration_ms,
+                'sql': normalized,
+                'view': current_view.get(),
+                'plan': plan,
+            },
+        )
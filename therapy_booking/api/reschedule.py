@@ -0,0 +1,80 @@
+"""
+Moving a booking to another slot.
+
+reschedule() books the new slot and cancels the old booking in one
+transaction. Each step is the same guarded single-statement UPDATE the
+book and cancel views use (claim_slot() or take_seat(), and a cancel
+that only matches a live booking), so if the new slot was taken or
+deleted, or the old booking cancelled, since the therapist looked, the
+transaction rolls back and they keep the booking they had. Both slots
+must be at the same location (shard).
+"""
+from django.db import transaction
+
+from .events import record_slot_change
+from .holds import claim_slot
+from .models import Booking
+from .seats import SeatUnavailable, give_back_seat, take_seat
+from .sharding import current_db, shard_for_pk
+from .stats import record_booking_transition, record_reservation_transition
+
+
+class RescheduleFailed(Exception):
+    pass
+
+
+def _claim(target, user):
+    """Book the target slot, or a seat on it. Returns the seat's Reservation, or None."""
+    if target.seats_total > 1:
+        try:
+            return take_seat(target, user)
+        except SeatUnavailable as e:
+            raise RescheduleFailed(str(e))
+    if not claim_slot(target.pk, user):
+        raise RescheduleFailed("The new slot is no longer available.")
+    return None
+
+
+def _release(booking, user):
+    if booking.seats_total > 1:
+        released = give_back_seat(booking.reservation)
+    else:
+        released = Booking.objects.filter(pk=booking.pk, therapist=user, status='booked').update(status='cancelled')
+    if not released:
+        raise RescheduleFailed("Booking is no longer in a cancellable state.")
+
+
+def reschedule(booking, target_id, user):
+    """
+    Move `user`'s booking (their slot, or with booking.reservation set their
+    seat on a multi-seat slot) to the slot target_id. Returns the new slot,
+    with `reservation` set to the new seat on a multi-seat slot. Raises
+    RescheduleFailed, with nothing changed, if the move cannot be made.
+    """
+    alias = current_db()
+    if shard_for_pk(target_id) != alias:
+        raise RescheduleFailed("Bookings can only be moved to a slot at the same location.")
+    previous = (booking.status, booking.therapist_id)
+    with transaction.atomic(using=alias):
+        target = Booking.objects.filter(pk=target_id).visible().select_related('cabin').first()
+        if target is None:
+            raise RescheduleFailed("The new slot no longer exists.")
+        reservation = _claim(target, user)
+        _release(booking, user)
+
+        target.refresh_from_db()
+        booking.refresh_from_db()
+        if reservation is None:
+            record_booking_transition(target, 'available', None)
+            record_slot_change(target, 'booked', user.pk, previous=('available', None))
+        else:
+            record_reservation_transition(reservation, None)
+            record_slot_change(target, 'seat_taken', user.pk, previous=('available', None))
+        if booking.seats_total > 1:
+            record_reservation_transition(booking.reservation, 'booked')
+            record_slot_change(booking, 'seat_released', user.pk, previous=previous)
+        else:
+            record_booking_transition(booking, *previous)
+            record_slot_change(booking, 'cancelled', user.pk, previous=previous)
+    target.reservation = reservation
+    return target
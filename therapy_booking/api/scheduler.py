@@ -0,0 +1,244 @@
+"""
+In-project scheduler for periodic maintenance.
+
+`manage.py run_scheduler` is a long-running process that runs registered
+jobs when they are due, one at a time, and records every run (start,
+duration, rows affected, error) as a JobRun. A job is a function that
+returns the number of rows it affected, registered with
+@job(name, every=seconds) or @job(name, cron='minute hour day month weekday').
+SCHEDULER['MODULES'] lists the modules that register jobs (the housekeeping
+jobs are in api/maintenance.py), and SCHEDULER['JOBS'] can give a job
+another schedule ({'every': ...} or {'cron': ...}) or disable it (None).
+
+When a job is next due follows from its last JobRun, so restarting the
+scheduler neither reruns nor skips jobs: an interval job that never ran
+is due at once, a cron job at its next time. Run one scheduler per
+deployment. Should two run anyway, they do not run the same job at once:
+a run starts by inserting its JobRun as 'running', and a partial unique
+constraint allows one running row per job, so the second insert fails and
+that scheduler skips the job. A running row older than LOCK_SECONDS is
+taken to be from a crashed scheduler and marked failed.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+from importlib import import_module
+from threading import Event
+
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .conf import app_settings
+from .models import JobRun
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'MODULES': ['api.maintenance'], # Imported to register their jobs
+    'JOBS': {}, # name -> {'every': seconds} or {'cron': '...'} to reschedule a job, None to disable it
+    'MAX_SLEEP_SECONDS': 60, # Longest wait between checks for due jobs
+    'LOCK_SECONDS': 3600, # A run still 'running' after this is taken to be from a crashed scheduler
+    # Housekeeping job settings (api/maintenance.py)
+    'BATCH_SIZE': 1000, # Rows per UPDATE or DELETE
+    'RUN_RETENTION_DAYS': 30, # JobRun rows older than this are purged
+    'VACUUM_PAGES': 10000, # SQLite free pages reclaimed per incremental vacuum
+}
+
+
+def get_config():
+    return app_settings('SCHEDULER', DEFAULT_CONFIG)
+
+
+class Every:
+    """Run every `seconds`, counted from the start of the previous run."""
+
+    def __init__(self, seconds):
+        if seconds <= 0:
+            raise ValueError("The interval must be positive.")
+        self.seconds = seconds
+
+    def next_after(self, moment):
+        return moment + timedelta(seconds=self.seconds)
+
+    def __str__(self):
+        return f"every {self.seconds}s"
+
+
+class Cron:
+    """
+    A five-field cron expression: minute, hour, day of month, month and day
+    of week (0 = Sunday), in the current time zone. Fields take `*`, numbers,
+    ranges `a-b`, lists `a,b` and steps `*/n`, `a-b/n`. As in cron, when both
+    day fields are restricted a day matching either one fires.
+    """
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression {expression!r} must have 5 fields.")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self.RANGES)
+        )
+        self.either_day = fields[2] != '*' and fields[4] != '*'
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.split(','):
+            part, _, step = part.partition('/')
+            try:
+                if part == '*':
+                    start, end = low, high
+                elif '-' in part:
+                    start, end = (int(value) for value in part.split('-', 1))
+                else:
+                    start = end = int(part)
+                    if step:
+                        end = high # "5/15": from 5 every 15
+                step = int(step or 1)
+            except ValueError:
+                raise ValueError(f"Invalid cron field {field!r}.")
+            if not low <= start <= end <= high or step < 1:
+                raise ValueError(f"Cron field {field!r} is out of range {low}-{high}.")
+            values.update(range(start, end + 1, step))
+        return sorted(values)
+
+    def _day_matches(self, day):
+        day_of_month = day.day in self.days
+        day_of_week = (day.weekday() + 1) % 7 in self.weekdays
+        return day_of_month or day_of_week if self.either_day else day_of_month and day_of_week
+
+    def next_after(self, moment):
+        start = timezone.localtime(moment).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.date()
+        for _ in range(5 * 366): # Every expression fires within 4 years (Feb 29)
+            if day.month in self.months and self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = timezone.make_aware(datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute))
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"Cron expression {self.expression!r} never fires.")
+
+    def __str__(self):
+        return f"cron {self.expression}"
+
+
+class Job:
+    def __init__(self, name, func, schedule):
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+
+    def __repr__(self):
+        return f"<Job {self.name} ({self.schedule})>"
+
+
+# name -> Job, filled by @job as the MODULES are imported.
+registry = {}
+
+
+def job(name, every=None, cron=None):
+    """Register the decorated function as a scheduled job."""
+    if (every is None) == (cron is None):
+        raise ValueError("Give a job either `every` or `cron`.")
+
+    def register(func):
+        registry[name] = Job(name, func, Every(every) if every is not None else Cron(cron))
+        return func
+    return register
+
+
+def schedule_from(override):
+    return Every(override['every']) if 'every' in override else Cron(override['cron'])
+
+
+def load_jobs():
+    """The enabled jobs, with SCHEDULER['JOBS'] overrides applied, by name."""
+    config = get_config()
+    for module in config['MODULES']:
+        import_module(module)
+    jobs = {}
+    for name, registered in registry.items():
+        override = config['JOBS'].get(name, {})
+        if override is None:
+            continue
+        jobs[name] = Job(name, registered.func, schedule_from(override)) if override else registered
+    unknown = set(config['JOBS']) - set(registry)
+    if unknown:
+        logger.warning("SCHEDULER['JOBS'] names unknown jobs: %s", ', '.join(sorted(unknown)))
+    return jobs
+
+
+def run_job(job):
+    """Run a job now and record the run. Returns the JobRun, or None if another scheduler is running the job."""
+    config = get_config()
+    abandoned = timezone.now() - timedelta(seconds=config['LOCK_SECONDS'])
+    JobRun.objects.filter(name=job.name, status='running', started_at__lt=abandoned).update(
+        status='failed', error="Abandoned: the scheduler running it stopped."
+    )
+    try:
+        with transaction.atomic():
+            run = JobRun.objects.create(name=job.name, started_at=timezone.now(), duration_ms=0, status='running')
+    except IntegrityError: # unique_running_job
+        logger.info("Skipping %s: already running elsewhere", job.name)
+        return None
+    started = time.perf_counter()
+    run.status = 'ok'
+    try:
+        run.rows = job.func() or 0
+    except Exception as e:
+        logger.exception("Scheduled job %s failed", job.name)
+        run.status, run.error = 'failed', str(e)
+    run.duration_ms = (time.perf_counter() - started) * 1000
+    logger.info("Scheduled job %s: %s, %d rows in %.0f ms", job.name, run.status, run.rows, run.duration_ms)
+    run.save(update_fields=['status', 'rows', 'error', 'duration_ms'])
+    return run
+
+
+class Scheduler:
+    """Runs the due jobs of `jobs` (name -> Job, default load_jobs()) in a loop or one pass at a time."""
+
+    def __init__(self, jobs=None):
+        self.jobs = load_jobs() if jobs is None else jobs
+        now = timezone.now()
+        last_runs = dict(
+            JobRun.objects.filter(name__in=list(self.jobs)).values('name').annotate(last=Max('started_at'))
+            .values_list('name', 'last')
+        )
+        self.next_due = {}
+        for name, job in self.jobs.items():
+            if name in last_runs:
+                self.next_due[name] = job.schedule.next_after(last_runs[name])
+            else:
+                self.next_due[name] = now if isinstance(job.schedule, Every) else job.schedule.next_after(now)
+
+    def run_due(self, now=None):
+        """Run every job that is due, in due order. Returns the JobRuns."""
+        now = now or timezone.now()
+        runs = []
+        for name in sorted((name for name, due in self.next_due.items() if due <= now), key=self.next_due.get):
+            job = self.jobs[name]
+            run = run_job(job)
+            self.next_due[name] = job.schedule.next_after(run.started_at if run else now)
+            if run:
+                runs.append(run)
+        return runs
+
+    def seconds_until_due(self, now=None):
+        now = now or timezone.now()
+        wait = get_config()['MAX_SLEEP_SECONDS']
+        if self.next_due:
+            wait = min(wait, (min(self.next_due.values()) - now).total_seconds())
+        return max(wait, 0)
+
+    def run_forever(self, stop=None):
+        """Run due jobs until `stop` (a threading.Event) is set."""
+        stop = stop or Event()
+        while not stop.is_set():
+            self.run_due()
+            stop.wait(self.seconds_until_due())
@@ -0,0 +1,110 @@
+"""
+Admin search over therapists and cabins.
+
+On SQLite each table has an FTS5 index (api_user_fts, api_cabin_fts, see
+migration 0013) kept in sync by triggers, so every write path, bulk
+updates included, updates it in the same transaction. A query is split
+into words and each word becomes a prefix term ("jo" matches "John" and
+"jo@example.com"); all words must match. Results are ranked with bm25,
+weighting names over email, phone and description, and capped at LIMIT.
+FTS5 ranks the matches itself (ORDER BY rank, with the weights set through
+`rank MATCH`) and keeps the best CANDIDATES; only those are joined to the
+table, filtered and sorted, so a very common prefix ("an") does not drag
+thousands of rows through the join.
+
+Other databases have no FTS5 table and fall back to icontains filters
+with the same limit.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connections, router
+from django.db.models import Q
+
+from .conf import app_settings
+from .models import Cabin
+from .sharding import fan_out, merge_sorted, spans_shards
+
+DEFAULT_CONFIG = {
+    'LIMIT': 20, # Results per search
+    'MIN_QUERY_LENGTH': 2, # Characters, ignoring punctuation
+    'MAX_TERMS': 6, # Words beyond this are ignored
+    'CANDIDATES': 1000, # Best-ranked matches filtered per search
+}
+
+# FTS5 table, indexed columns and their bm25 weights, per model.
+INDEXES = {
+    'user': ('api_user_fts', {'username': 10.0, 'first_name': 5.0, 'last_name': 5.0, 'email': 3.0, 'phone_number': 2.0}),
+    'cabin': ('api_cabin_fts', {'name': 10.0, 'description': 1.0}),
+}
+
+WORDS = re.compile(r'\w+')
+
+
+def get_config():
+    return app_settings('ADMIN_SEARCH', DEFAULT_CONFIG)
+
+
+def search_terms(query):
+    """The words of a query, or [] when it is too short to search for."""
+    config = get_config()
+    words = WORDS.findall(query or '')[:config['MAX_TERMS']]
+    return words if sum(len(word) for word in words) >= config['MIN_QUERY_LENGTH'] else []
+
+
+def match_expression(words):
+    """FTS5 MATCH string: every word as a quoted prefix term, all required."""
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def _ranked_ids(model, words, limit, where=''):
+    """[(score, pk), ...] best first (bm25 scores are negative; lower is better)."""
+    table, columns = INDEXES[model._meta.model_name]
+    weights = ', '.join(str(weight) for weight in columns.values())
+    base = model._meta.db_table
+    # The subquery keeps the CANDIDATES best-ranked matches; `where` filters those.
+    sql = (
+        f"SELECT candidates.score, candidates.id FROM ("
+        f"SELECT rank AS score, rowid AS id FROM {table} WHERE {table} MATCH %s AND rank MATCH %s ORDER BY rank LIMIT %s"
+        f") AS candidates JOIN {base} ON {base}.id = candidates.id {where} ORDER BY 1, 2 LIMIT %s"
+    )
+    with connections[router.db_for_read(model)].cursor() as cursor:
+        cursor.execute(sql, [match_expression(words), f"bm25({weights})", get_config()['CANDIDATES'], limit])
+        return cursor.fetchall()
+
+
+def _search(queryset, words, limit, where=''):
+    """[(score, instance), ...] for one database, best first."""
+    model = queryset.model
+    if connections[router.db_for_read(model)].vendor != 'sqlite':
+        columns = INDEXES[model._meta.model_name][1]
+        for word in words:
+            queryset = queryset.filter(Q.create([(f'{column}__icontains', word) for column in columns], connector=Q.OR))
+        return [(0, instance) for instance in queryset.order_by('pk')[:limit]]
+    ranked = _ranked_ids(model, words, limit, where)
+    instances = queryset.in_bulk([pk for _, pk in ranked])
+    return [(score, instances[pk]) for score, pk in ranked if pk in instances]
+
+
+def search_therapists(query, limit=None):
+    words = search_terms(query)
+    if not words:
+        return []
+    limit = limit or get_config()['LIMIT']
+    therapists = get_user_model().objects.filter(is_therapist=True, is_active=True)
+    return [user for _, user in _search(therapists, words, limit, where='AND api_user.is_therapist AND api_user.is_active')]
+
+
+def search_cabins(query, limit=None):
+    """Cabins of the pinned shard, or of every shard (merged by score) for a cross-location request."""
+    words = search_terms(query)
+    if not words:
+        return []
+    limit = limit or get_config()['LIMIT']
+    cabins = Cabin.objects.filter(hidden_at__isnull=True) # Hidden cabins are being deleted (api/deletion.py)
+    where = 'AND api_cabin.hidden_at IS NULL'
+    if spans_shards():
+        results = merge_sorted(fan_out(lambda: _search(cabins, words, limit, where)), key=lambda row: row[0])
+    else:
+        results = _search(cabins, words, limit, where)
+    return [cabin for _, cabin in results[:limit]]
@@ -0,0 +1,70 @@
+"""
+Multi-seat slots.
+
+A slot with seats_total > 1 (defaulting to its cabin's capacity) is shared.
+It is a single Booking row, and each therapist's seat is a Reservation
+row; before, every seat needed its own Booking row. The slot stays
+'available', with no therapist, until its last seat is taken, and then it
+becomes 'booked'. Taking a seat or giving one back is a single guarded
+UPDATE of seats_taken, so a slot can never be oversold. Single-seat slots
+work as before: one Booking row, booked by setting its therapist. Seat
+changes are logged as 'seat_taken' and 'seat_released' slot events, not
+'booked' and 'cancelled', since the slot itself usually stays available.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+
+from .models import Booking, Reservation
+from .sharding import current_db
+
+
+class SeatUnavailable(Exception):
+    pass
+
+
+def take_seat(slot, user):
+    """Reserve one seat on a multi-seat slot. Raises SeatUnavailable if full or already reserved by `user`."""
+    try:
+        with transaction.atomic(using=current_db()):
+            updated = Booking.objects.filter(
+                pk=slot.pk, status='available', seats_total__gt=1, seats_taken__lt=F('seats_total')
+            ).visible().update(
+                seats_taken=F('seats_taken') + 1,
+                # Conditions see the row before the update: the last free seat fills the slot.
+                status=Case(When(seats_taken__gte=F('seats_total') - 1, then=Value('booked')), default=Value('available')),
+            )
+            if not updated:
+                raise SeatUnavailable("Slot is no longer available.")
+            return Reservation.objects.create(slot=slot, therapist=user, status='booked')
+    except IntegrityError:
+        raise SeatUnavailable("You already have a seat on this slot.")
+
+
+def give_back_seat(reservation):
+    """Cancel a live reservation and free its seat. Returns False if it was not live."""
+    with transaction.atomic(using=current_db()):
+        if not Reservation.objects.filter(pk=reservation.pk, status='booked').update(status='cancelled'):
+            return False
+        Booking.objects.filter(pk=reservation.slot_id, seats_taken__gt=0).update(
+            seats_taken=F('seats_taken') - 1,
+            status=Case(When(status='booked', then=Value('available')), default=F('status')),
+        )
+    reservation.status = 'cancelled'
+    return True
+
+
+def cancel_all_seats(slot):
+    """
+    Cancel every live reservation on a slot whose own status the caller has
+    already saved as 'cancelled'. Returns the cancelled reservations.
+    """
+    reservations = list(slot.reservations.filter(status='booked').select_related('therapist'))
+    Reservation.objects.filter(pk__in=[reservation.pk for reservation in reservations]).update(status='cancelled')
+    Booking.objects.filter(pk=slot.pk).update(seats_taken=0)
+    for reservation in reservations:
+        reservation.status = 'cancelled'
+    return reservations
+
+
+def live_reservation(slot, user):
+    return Reservation.objects.filter(slot=slot, therapist=user, status='booked').first()
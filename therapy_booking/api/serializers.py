@@ -2,7 +2,9 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from .models import Cabin, Booking # Import Cabin and Booking
+from .models import Cabin, Booking, DeletionJob, SlotChangeEvent # Import Cabin and Booking
+from .batch import get_config as get_batch_config
+from .catalog import cabin_catalog
 import uuid # For password reset token generation
 
 User = get_user_model()
@@ -122,10 +124,26 @@ class CabinSerializer(serializers.ModelSerializer):
         model = Cabin
         fields = ('id', 'name', 'description', 'capacity')
 
+# A booking's cabin name from the in-process cabin catalog (see api/catalog.py), so
+# booking lists need no cabin join. The catalog's marker is checked once per
+# serializer: a list checks it once for all of its rows.
+class CabinNameField(serializers.ReadOnlyField):
+    def __init__(self, **kwargs):
+        super().__init__(source='cabin_id', **kwargs)
+        self.checked_shards = set()
+
+    def to_representation(self, cabin_id):
+        alias = cabin_catalog.shard_of(cabin_id)
+        if alias not in self.checked_shards:
+            cabin_catalog.refresh(alias)
+            self.checked_shards.add(alias)
+        entry = cabin_catalog.get(cabin_id)
+        return entry.name if entry else None
+
 # Booking Serializer (General Purpose)
 class BookingSerializer(serializers.ModelSerializer):
     therapist_username = serializers.CharField(source='therapist.username', read_only=True)
-    cabin_name = serializers.CharField(source='cabin.name', read_only=True)
+    cabin_name = CabinNameField()
 
     class Meta:
         model = Booking
@@ -138,27 +156,65 @@ class BookingSerializer(serializers.ModelSerializer):
             'start_time', 
             'end_time', 
             'status', 
-            'price'
+            'price',
+            'seats_total',
+            'seats_taken',
+            'version',
         )
-        read_only_fields = ('status',) # Status is managed by specific actions/views typically
+        read_only_fields = ('status', 'seats_taken', 'version') # Status is managed by specific actions/views typically
+
+# A booking as its therapist sees it: on a multi-seat slot, status and therapist
+# come from the therapist's own reservation (`booking_status`, set by the view).
+class TherapistBookingSerializer(BookingSerializer):
+    load_always = ('seats_total',) # Read below even when ?fields= leaves it out (see api/sparse_fields.py)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        booking_status = getattr(instance, 'booking_status', None)
+        request = self.context.get('request')
+        if instance.seats_total > 1 and booking_status and request is not None:
+            overrides = {'status': booking_status, 'therapist': request.user.pk, 'therapist_username': request.user.username}
+            data.update({name: value for name, value in overrides.items() if name in data})
+        return data
+
+# Body of a therapist's request to move their booking (see api/reschedule.py)
+class RescheduleSerializer(serializers.Serializer):
+    slot = serializers.IntegerField(help_text="Id of the slot to move the booking to")
+
+# Read-only rows from api.archive.booking_history(): live and archived bookings with an `archived` flag
+class BookingHistorySerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    therapist = serializers.IntegerField(source='therapist_id', allow_null=True)
+    therapist_username = serializers.CharField(allow_null=True)
+    cabin = serializers.IntegerField(source='cabin_id')
+    cabin_name = serializers.CharField()
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+    status = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True)
+    archived = serializers.BooleanField()
 
 # Serializer for Admin creating an "available" slot
 class AvailableSlotCreateSerializer(serializers.ModelSerializer):
-    cabin = serializers.PrimaryKeyRelatedField(queryset=Cabin.objects.all(), write_only=True, help_text="ID of the Cabin")
+    cabin = serializers.PrimaryKeyRelatedField(queryset=Cabin.objects.filter(hidden_at__isnull=True), write_only=True, help_text="ID of the Cabin")
     
     class Meta:
         model = Booking
-        fields = ('id', 'cabin', 'start_time', 'end_time', 'price') # Therapist is excluded, status defaults to 'available'
+        fields = ('id', 'cabin', 'start_time', 'end_time', 'price', 'seats_total') # Therapist is excluded, status defaults to 'available'
         extra_kwargs = {
             'price': {'required': True, 'allow_null': False}, # Ensure price is provided
             'start_time': {'required': True},
             'end_time': {'required': True},
+            'seats_total': {'required': False, 'min_value': 1, 'help_text': "Seats in this slot (default: the cabin's capacity)"},
         }
 
     def validate(self, attrs):
         # Ensure start_time is before end_time
         if attrs['start_time'] >= attrs['end_time']:
             raise serializers.ValidationError("End time must be after start time.")
+        attrs.setdefault('seats_total', max(attrs['cabin'].capacity, 1))
+        if attrs['seats_total'] > max(attrs['cabin'].capacity, 1):
+            raise serializers.ValidationError({"seats_total": "Cannot exceed the cabin's capacity."})
         # Add any other validation, e.g., check for overlapping available slots for the same cabin
         # For simplicity, overlap check is omitted here but crucial for a real app.
         return attrs
@@ -169,6 +225,119 @@ class AvailableSlotCreateSerializer(serializers.ModelSerializer):
         booking = Booking.objects.create(**validated_data, status='available')
         return booking
 
+# Body of an admin's slot edit (see api/slot_updates.py)
+class SlotUpdateSerializer(serializers.Serializer):
+    start_time = serializers.DateTimeField(required=False)
+    end_time = serializers.DateTimeField(required=False)
+    price = serializers.DecimalField(required=False, max_digits=10, decimal_places=2, min_value=0)
+    version = serializers.IntegerField(required=False, min_value=1, help_text="The version read, if not sent as If-Match")
+
+    def validate(self, attrs):
+        if not set(attrs) - {'version'}:
+            raise serializers.ValidationError("Give start_time, end_time or price to change.")
+        if 'start_time' in attrs and 'end_time' in attrs and attrs['start_time'] >= attrs['end_time']:
+            raise serializers.ValidationError("End time must be after start time.")
+        return attrs
+
+# Query parameters for the "find next free slot" search
+class SlotSearchSerializer(serializers.Serializer):
+    min_duration = serializers.IntegerField(required=False, min_value=1, help_text="Minimum slot length in minutes")
+    time_from = serializers.TimeField(required=False, help_text="Slot must start at or after this time of day")
+    time_to = serializers.TimeField(required=False, help_text="Slot must end at or before this time of day")
+    weekdays = serializers.CharField(required=False, help_text="Comma-separated weekdays, 0=Monday .. 6=Sunday")
+    cabin_ids = serializers.CharField(required=False, help_text="Comma-separated cabin IDs")
+    max_price = serializers.DecimalField(required=False, max_digits=10, decimal_places=2)
+    start = serializers.DateTimeField(required=False, help_text="Search from (default: now)")
+    end = serializers.DateTimeField(required=False, help_text="Search until (exclusive)")
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=50, default=5)
+
+    def _parse_int_list(self, value, field_name):
+        try:
+            return sorted({int(item) for item in value.split(',') if item.strip()})
+        except ValueError:
+            raise serializers.ValidationError(f"{field_name} must be a comma-separated list of integers.")
+
+    def validate_weekdays(self, value):
+        weekdays = self._parse_int_list(value, 'weekdays')
+        if any(day < 0 or day > 6 for day in weekdays):
+            raise serializers.ValidationError("Weekdays must be between 0 (Monday) and 6 (Sunday).")
+        return weekdays
+
+    def validate_cabin_ids(self, value):
+        return self._parse_int_list(value, 'cabin_ids')
+
+    def validate(self, attrs):
+        if 'time_from' in attrs and 'time_to' in attrs and attrs['time_from'] >= attrs['time_to']:
+            raise serializers.ValidationError("time_to must be after time_from.")
+        if 'start' in attrs and 'end' in attrs and attrs['start'] >= attrs['end']:
+            raise serializers.ValidationError("end must be after start.")
+        return attrs
+
+# Query parameters for a cabin's availability calendar (see api/availability.py)
+class CabinAvailabilitySerializer(serializers.Serializer):
+    start_date = serializers.DateField(required=False, help_text="First day (default: today)")
+    days = serializers.IntegerField(required=False, min_value=1, max_value=366, default=7)
+    time_from = serializers.TimeField(required=False, help_text="With time_to: report whether this window is free each day")
+    time_to = serializers.TimeField(required=False)
+
+    def validate(self, attrs):
+        if ('time_from' in attrs) != ('time_to' in attrs):
+            raise serializers.ValidationError("time_from and time_to must be given together.")
+        if 'time_from' in attrs and attrs['time_from'] >= attrs['time_to']:
+            raise serializers.ValidationError("time_to must be after time_from.")
+        return attrs
+
+# Query parameters for the admin therapist and cabin search (see api/search.py)
+class AdminSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(help_text="Words to match; each is a prefix of a name, email, phone or description word")
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=50)
+
+# Body of POST /api/batch/ (see api/batch.py)
+class BatchSubRequestSerializer(serializers.Serializer):
+    path = serializers.CharField(help_text="Absolute path, e.g. /api/therapist/profile/ (may carry a query string)")
+    params = serializers.DictField(child=serializers.CharField(), required=False, default=dict)
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchSubRequestSerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(required=False, default=False)
+
+    def validate_requests(self, value):
+        limit = get_batch_config()['MAX_REQUESTS']
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} sub-requests per batch.")
+        return value
+
+# Progress of a background cabin or user deletion (see api/deletion.py)
+class DeletionJobSerializer(serializers.ModelSerializer):
+    progress = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = DeletionJob
+        fields = (
+            'id', 'kind', 'target_id', 'target_name', 'requested_by', 'status', 'rows_total', 'rows_done', 'progress',
+            'error', 'created_at', 'started_at', 'finished_at',
+        )
+        read_only_fields = fields
+
+# One entry of a slot's change history (see api/events.py)
+class SlotEventSerializer(serializers.ModelSerializer):
+    actor_username = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SlotChangeEvent
+        fields = (
+            'id', 'kind', 'created_at', 'actor_id', 'actor_username', 'previous_status', 'status',
+            'previous_therapist_id', 'therapist_id', 'previous_start_time', 'previous_end_time', 'start_time', 'end_time',
+        )
+        read_only_fields = fields
+
+    def get_actor_username(self, obj):
+        # Looked up in one query by the view; None for background jobs and deleted users.
+        return self.context.get('actor_names', {}).get(obj.actor_id)
+
+class SlotHistoryParamsSerializer(serializers.Serializer):
+    month = serializers.DateField(required=False, input_formats=['%Y-%m'], help_text="Only this month's events (YYYY-MM)")
+
 # Serializer for listing available slots (can reuse BookingSerializer or be more specific)
 class AvailableSlotListSerializer(BookingSerializer): # Inherits from BookingSerializer
     class Meta(BookingSerializer.Meta):
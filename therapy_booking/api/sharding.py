@@ -0,0 +1,295 @@
+"""
+Location-based sharding.
+
+Each Location names a database alias (a shard). Its cabins and everything
+hanging off them (bookings, reservations, slot events, archived bookings
+and the therapist stats those bookings feed) live on that shard. Users and
+locations are reference data: they are written to the default database
+and copied to every other shard (see replicate_reference_row()), so
+foreign keys and joins such as select_related('therapist') keep working
+inside a shard.
+
+Cabin and booking ids are globally unique. Shard i hands out ids starting
+at i * ID_SPAN (set_id_ranges() runs after migrate), so shard_for_pk()
+maps any id in a URL to its shard without a lookup.
+
+Which shard a query goes to:
+- Saving or creating an instance: the shard of its location, cabin or
+  slot, else the shard it came from (ShardRouter, ShardedQuerySet).
+- Everything else: the shard pinned for the current context with
+  use_shard(). ShardMiddleware pins one per request from the URL pk, a
+  `location`, `cabin` or `cabin_id` parameter, or a `cabin`/`location` in
+  the body. Code that writes must open its transaction on that shard,
+  which is why write paths use transaction.atomic(using=current_db()).
+- A request that pins nothing, on a sharded deployment, is a
+  cross-location request. List views fan out to every shard in parallel
+  (fan_out()) and merge the results by start_time.
+
+SHARDING['SHARDS'] lists the shards, and shard 0 must be 'default'. With
+only 'default' listed, every function here is a no-op and the app
+behaves as a single database.
+"""
+import heapq
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections, models, router
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .conf import app_settings
+
+DEFAULT_CONFIG = {
+    'SHARDS': [DEFAULT_DB_ALIAS],
+    'ID_SPAN': 10 ** 12, # Ids per shard
+    'MAX_PARALLEL': 8, # Threads used by fan_out()
+}
+
+# Models stored on the shard of their location (model_name values).
+SHARDED_MODELS = {'cabin', 'booking', 'reservation', 'slotchangeevent', 'bookingarchive', 'therapistmonthlystats'}
+# Reference data copied to every shard.
+REPLICATED_MODELS = {'user', 'location'}
+# Sharded tables with their own id sequence, moved into the shard's id range.
+ID_RANGE_MODELS = ('cabin', 'booking', 'reservation', 'slotchangeevent', 'therapistmonthlystats')
+
+current_shard = ContextVar('current_shard', default=None)
+
+
+def get_config():
+    return app_settings('SHARDING', DEFAULT_CONFIG)
+
+
+def shard_aliases():
+    return list(get_config()['SHARDS'])
+
+
+def is_sharded():
+    return len(shard_aliases()) > 1
+
+
+def spans_shards():
+    """True for a cross-location request: several shards and none pinned."""
+    return is_sharded() and current_shard.get() is None
+
+
+def current_db():
+    """The shard pinned for this context, or the default database."""
+    return current_shard.get() or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_shard(alias):
+    token = current_shard.set(alias)
+    try:
+        yield alias
+    finally:
+        current_shard.reset(token)
+
+
+def shard_for_pk(pk):
+    """The shard that issued a cabin or booking id, or None for an id outside every range."""
+    try:
+        index = int(pk) // get_config()['ID_SPAN']
+    except (TypeError, ValueError):
+        return None
+    shards = shard_aliases()
+    return shards[index] if 0 <= index < len(shards) else None
+
+
+def shard_for_location(location):
+    return location.database if location is not None and location.database in shard_aliases() else DEFAULT_DB_ALIAS
+
+
+def shard_for_location_param(value):
+    """Shard of a location given by id or slug, from the default database."""
+    from .models import Location
+
+    lookup = {'pk': value} if str(value).isdigit() else {'slug': value}
+    location = Location.objects.using(DEFAULT_DB_ALIAS).filter(**lookup).first()
+    return shard_for_location(location) if location else None
+
+
+def resolve_request_shard(request, view_kwargs):
+    """The shard a request is about, or None when it spans locations."""
+    if not is_sharded():
+        return None
+    if 'pk' in view_kwargs:
+        return shard_for_pk(view_kwargs['pk'])
+    params = request.GET
+    if params.get('location'):
+        return shard_for_location_param(params['location'])
+    for name in ('cabin', 'cabin_id'):
+        if params.get(name):
+            return shard_for_pk(params[name])
+    if params.get('cabin_ids'):
+        shards = {shard_for_pk(cabin_id) for cabin_id in params['cabin_ids'].split(',') if cabin_id.strip()}
+        if len(shards) == 1:
+            return shards.pop()
+    if request.method == 'POST':
+        body = _body(request)
+        if body.get('cabin'):
+            return shard_for_pk(body['cabin'])
+        if body.get('location'):
+            return shard_for_location_param(body['location'])
+    return None
+
+
+def _body(request):
+    if request.content_type == 'application/json':
+        try:
+            body = json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+        return body if isinstance(body, dict) else {}
+    return request.POST
+
+
+def fan_out(function, aliases=None):
+    """
+    Call function() once per shard, in parallel, with that shard pinned.
+    Returns the results in shard order. Each call runs in its own thread,
+    and so on its own connection, which is closed afterwards.
+    """
+    aliases = aliases or shard_aliases()
+
+    def run(alias):
+        try:
+            with use_shard(alias):
+                return function()
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=min(len(aliases), get_config()['MAX_PARALLEL'])) as executor:
+        return list(executor.map(run, aliases))
+
+
+def merge_sorted(lists, key):
+    """Merge per-shard lists that are each sorted by key."""
+    return list(heapq.merge(*lists, key=key))
+
+
+def start_time_of(row):
+    """Merge key for model instances and .values() dicts alike."""
+    return row['start_time'] if isinstance(row, dict) else row.start_time
+
+
+class FanOutListMixin:
+    """
+    Makes a ListAPIView whose queryset is ordered by start_time answer
+    cross-location requests from every shard. Delta sync cursors are per
+    shard, so `since` then needs a `location`.
+    """
+    load_always = ('start_time',) # The merge key, loaded even when ?fields= leaves it out (see api/sparse_fields.py)
+
+    def across_shards(self, function):
+        """function()'s rows, from every shard if the request spans several."""
+        if not spans_shards():
+            return list(function())
+        return merge_sorted(fan_out(lambda: list(function())), key=start_time_of)
+
+    def list(self, request, *args, **kwargs):
+        if not spans_shards():
+            return super().list(request, *args, **kwargs)
+        if 'since' in request.query_params:
+            raise ValidationError({"location": "Required with since when locations are sharded."})
+        rows = self.across_shards(lambda: self.filter_queryset(self.get_queryset()))
+        return Response(self.get_serializer(rows, many=True).data)
+
+
+def set_id_ranges(using):
+    """Start the shard's id sequences at its range (idempotent; never moves a sequence backwards)."""
+    from django.apps import apps
+
+    shards = shard_aliases()
+    if using not in shards or shards.index(using) == 0:
+        return
+    start = shards.index(using) * get_config()['ID_SPAN']
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for model_name in ID_RANGE_MODELS:
+            table = apps.get_model('api', model_name)._meta.db_table
+            if connection.vendor == 'sqlite':
+                cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", [table, start - 1])
+                elif row[0] < start - 1:
+                    cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", [start - 1, table])
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM {connection.ops.quote_name(table)})))",
+                    [table, start - 1],
+                )
+
+
+def replicate_reference_row(instance, deleted=False):
+    """Copy a saved (or deleted) user/location from the default database to every other shard."""
+    model = type(instance)
+    for alias in shard_aliases()[1:]:
+        manager = model._base_manager.using(alias)
+        if deleted:
+            manager.filter(pk=instance.pk).delete()
+            continue
+        fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        values = {field.attname: getattr(instance, field.attname) for field in fields}
+        if not manager.filter(pk=instance.pk).update(**values):
+            manager.bulk_create([model(pk=instance.pk, **values)])
+
+
+class ShardedQuerySet(models.QuerySet):
+    """
+    QuerySet.create() picks its database before the instance exists, so
+    without a pinned shard it would land on default. Route by the new
+    instance (its location or cabin) instead, the way save() does.
+    """
+
+    def create(self, **kwargs):
+        if self._db is None and is_sharded():
+            return self.using(router.db_for_write(self.model, instance=self.model(**kwargs))).create(**kwargs)
+        return super().create(**kwargs)
+
+
+class ShardRouter:
+    """Routes sharded models to the current (or the instance's) shard and reference data to default."""
+
+    @staticmethod
+    def _shard_of_instance(instance):
+        """
+        The shard an instance (or the instance being related to) belongs to.
+        Keys win over _state.db, which assigning a foreign key fills in from
+        whatever object was assigned first.
+        """
+        name = instance._meta.model_name
+        if name == 'location':
+            return shard_for_location(instance)
+        if name == 'cabin' and instance.location_id:
+            return shard_for_location(instance.location)
+        if name in ('cabin', 'booking') and instance.pk is not None:
+            return shard_for_pk(instance.pk)
+        for attname in ('cabin_id', 'slot_id'):
+            if getattr(instance, attname, None) is not None:
+                return shard_for_pk(getattr(instance, attname))
+        return instance._state.db if name in SHARDED_MODELS else None
+
+    def _shard_of(self, model, hints):
+        instance = hints.get('instance')
+        return (instance is not None and self._shard_of_instance(instance)) or current_db()
+
+    def db_for_read(self, model, **hints):
+        if model._meta.model_name in SHARDED_MODELS:
+            return self._shard_of(model, hints)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.model_name in SHARDED_MODELS:
+            return self._shard_of(model, hints)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Reference rows exist on every shard, so relations across aliases are fine.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None # Every shard carries the full schema
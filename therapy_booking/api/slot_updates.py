@@ -0,0 +1,76 @@
+"""
+Editing an open slot's time and price, with optimistic concurrency.
+
+Every slot has a version, bumped by each edit. A client sends back the
+version it read (If-Match: "<version>", or `version` in the body), and
+update_slot() applies the edit as one guarded UPDATE that only matches
+while the version is unchanged, the slot is still open (available, no
+therapist, no seats taken, no live hold) and no other available or
+booked slot of the cabin overlaps the new time range (a NOT EXISTS
+subquery in the same statement). Nothing is locked between a client's
+read and its write; when the UPDATE matches nothing, the row is read
+again to say why. Editing keeps the slot's id, so clients update their
+copy instead of dropping it.
+"""
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+
+from .events import record_slot_change
+from .models import Booking
+from .sharding import current_db
+
+# Slots that occupy their cabin's time; cancelled and expired ones do not.
+OCCUPYING_STATUSES = ('available', 'booked')
+
+
+class SlotUpdateFailed(Exception):
+    """`reason` is 'missing', 'version' (stale version), 'state' (no longer open), 'overlap' or 'invalid'."""
+
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason
+
+
+def _open(slots):
+    return slots.filter(status='available', therapist__isnull=True, seats_taken=0).unheld()
+
+
+def _why_not_updated(slot_id, version):
+    slot = Booking.objects.filter(pk=slot_id).visible().first()
+    if slot is None:
+        return SlotUpdateFailed("Slot not found.", 'missing')
+    if slot.version != version:
+        return SlotUpdateFailed(f"The slot was changed since version {version}; it is now at version {slot.version}.", 'version')
+    if not _open(Booking.objects.filter(pk=slot_id)).exists():
+        return SlotUpdateFailed("Only open slots (available, not held, no seats taken) can be edited.", 'state')
+    return SlotUpdateFailed("The new time range overlaps another slot of this cabin.", 'overlap')
+
+
+def update_slot(slot_id, version, changes, actor_id=None):
+    """
+    Apply `changes` (start_time, end_time and/or price) to an open slot at
+    `version`. Returns the updated slot. Raises SlotUpdateFailed, with
+    nothing changed, if the update does not apply.
+    """
+    with transaction.atomic(using=current_db()):
+        before = Booking.objects.filter(pk=slot_id, version=version).values_list('start_time', 'end_time').first()
+        if before is None:
+            raise _why_not_updated(slot_id, version)
+        slots = _open(Booking.objects.filter(pk=slot_id, version=version).visible())
+        if 'start_time' in changes or 'end_time' in changes:
+            # Times only change with the version, so at `version` the stored half of a range is `before`'s.
+            start, end = changes.get('start_time', before[0]), changes.get('end_time', before[1])
+            if start >= end:
+                raise SlotUpdateFailed("End time must be after start time.", 'invalid')
+            overlapping = Booking.objects.filter(
+                ~Q(pk=OuterRef('pk')), cabin_id=OuterRef('cabin_id'), status__in=OCCUPYING_STATUSES,
+                start_time__lt=end, end_time__gt=start,
+            )
+            slots = slots.filter(~Exists(overlapping))
+        if not slots.update(**changes, version=F('version') + 1):
+            raise _why_not_updated(slot_id, version)
+
+        slot = Booking.objects.select_related('cabin').get(pk=slot_id)
+        moved = (slot.start_time, slot.end_time) != before
+        record_slot_change(slot, 'updated', actor_id, previous_times=before if moved else None)
+    return slot
@@ -0,0 +1,96 @@
+"""
+Sparse fieldsets for read endpoints.
+
+``?fields=id,start_time,cabin_name`` trims each serialized row to those
+fields, and the same projection is pushed into the query: only the
+columns behind the requested fields are loaded (``.only()``), and
+select_related() joins are kept only for relations a requested field
+reads through (``therapist_username`` keeps the therapist join;
+``therapist`` is the therapist_id column and needs none). A field whose source is not a plain
+column or a column one relation away (a method or annotation) still
+works, but disables the projection for that request.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import ListSerializer
+
+FIELDS_PARAM = 'fields'
+
+
+@lru_cache(maxsize=None)
+def serializer_sources(serializer_class):
+    """{field name: source path} for a serializer class, e.g. {'therapist_username': ('therapist', 'username')}."""
+    return {name: tuple(field.source_attrs) for name, field in serializer_class().fields.items()}
+
+
+def projection(model, sources):
+    """(only() paths, select_related() relations) for source paths, or None if a source is not a column."""
+    columns, relations = set(), set()
+    for path in sources:
+        try:
+            field = model._meta.get_field(path[0])
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete:
+            return None
+        if len(path) == 1:
+            columns.add(field.name)
+        elif len(path) == 2 and field.many_to_one:
+            try:
+                if not field.related_model._meta.get_field(path[1]).concrete:
+                    return None
+            except FieldDoesNotExist:
+                return None
+            columns.add(f'{field.name}__{path[1]}')
+            relations.add(field.name)
+        else:
+            return None
+    return columns, relations
+
+
+class SparseFieldsMixin:
+    """Adds ``?fields=`` to a GenericAPIView (see module docstring)."""
+
+    def get_requested_fields(self, serializer_class=None):
+        """The requested field names, or None when the full representation is wanted."""
+        value = self.request.query_params.get(FIELDS_PARAM) if self.request.method == 'GET' else None
+        if not value:
+            return None
+        fields = {name.strip() for name in value.split(',') if name.strip()}
+        unknown = fields - set(serializer_sources(serializer_class or self.get_serializer_class()))
+        if unknown:
+            raise ValidationError({FIELDS_PARAM: f"Unknown fields: {', '.join(sorted(unknown))}."})
+        return fields
+
+    def trim_fields(self, serializer):
+        target = serializer.child if isinstance(serializer, ListSerializer) else serializer
+        fields = self.get_requested_fields(type(target))
+        if fields is not None:
+            for name in set(target.fields) - fields:
+                target.fields.pop(name)
+        return serializer
+
+    def get_serializer(self, *args, **kwargs):
+        return self.trim_fields(super().get_serializer(*args, **kwargs))
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_requested_fields()
+        if fields is None:
+            return queryset
+        serializer_class = self.get_serializer_class()
+        sources = serializer_sources(serializer_class)
+        # Columns the serializer (see TherapistBookingSerializer) or the view (see FanOutListMixin)
+        # reads whatever fields are shown.
+        load_always = (*getattr(serializer_class, 'load_always', ()), *getattr(self, 'load_always', ()))
+        paths = [sources[name] for name in fields] + [(column,) for column in load_always]
+        projected = projection(queryset.model, paths)
+        if projected is None:
+            return queryset
+        columns, relations = projected
+        queryset = queryset.select_related(None)
+        if relations: # select_related() with no arguments would follow every foreign key
+            queryset = queryset.select_related(*relations)
+        return queryset.only(*columns)
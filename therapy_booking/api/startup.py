@@ -0,0 +1,84 @@
+"""
+Worker start-up.
+
+Modules that only some paths need (NumPy for analytics) are imported
+inside those paths, so `import api.urls` stays cheap for management
+commands and tests. A worker that is about to take traffic should pay for
+them once, up front, instead of on its first unlucky request:
+prepare_worker() (called from wsgi.py and asgi.py) imports the PRELOAD
+modules, compiles every URL pattern, populates the resolver's reverse
+caches and builds each serializer's fields.
+
+With a pre-forking server that loads the application in the master
+(`gunicorn --preload`), all of this happens once before the fork.
+gc.freeze() then moves the resulting objects to the permanent generation,
+so collections in the workers never touch, and copy, those pages.
+"""
+import gc
+import inspect
+import logging
+import time
+from importlib import import_module
+
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+
+from .conf import app_settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'WARM_UP': True,
+    'GC_FREEZE': True,
+    'PRELOAD': ['api.analytics'], # Imported lazily by the views that need them
+    'URLS_IMPORT_BUDGET_MS': 300, # Enforced by api/tests/test_startup.py
+}
+
+
+def get_config():
+    return app_settings('STARTUP', DEFAULT_CONFIG)
+
+
+def _warm_resolver(resolver):
+    resolver.reverse_dict # Populates reverse lookups (and compiles patterns) for this namespace
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            _warm_resolver(pattern)
+
+
+def _warm_serializers():
+    from rest_framework import serializers
+    from . import serializers as api_serializers
+
+    for _, cls in inspect.getmembers(api_serializers, inspect.isclass):
+        if issubclass(cls, serializers.Serializer) and cls.__module__ == api_serializers.__name__:
+            try:
+                cls().fields
+            except Exception: # A serializer that needs context to build is simply left cold
+                logger.debug("Could not warm %s", cls.__name__, exc_info=True)
+
+
+def warm_up():
+    """Import deferred modules and prime URL and serializer caches. Returns the time taken in ms."""
+    began = time.perf_counter()
+    for module in get_config()['PRELOAD']:
+        try:
+            import_module(module)
+        except ImportError: # Optional dependency missing; its path reports that itself
+            logger.info("Skipping preload of %s", module)
+    _warm_resolver(get_resolver())
+    _warm_serializers()
+    return (time.perf_counter() - began) * 1000
+
+
+def prepare_worker():
+    """Warm up and, before a fork, freeze the heap. No-op for the parts disabled in STARTUP."""
+    config = get_config()
+    if config['WARM_UP']:
+        logger.info("Warm-up took %.0f ms", warm_up())
+    # Connections must not be shared with forked children.
+    connections.close_all()
+    if config['GC_FREEZE']:
+        gc.collect()
+        gc.freeze()
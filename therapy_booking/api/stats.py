@@ -0,0 +1,201 @@
+"""
+Incrementally maintained per-therapist booking statistics.
+
+Every booking transition (book, cancel, admin cancel) calls
+record_booking_transition(), or record_reservation_transition() for a seat
+on a multi-seat slot, inside the transaction that saves it. The
+booking's contribution under its previous state is subtracted and its
+contribution under the new state is added, so TherapistMonthlyStats always
+equals a full aggregate over Booking. rebuild_stats() and
+find_inconsistencies() recompute that aggregate from scratch.
+"""
+from collections import defaultdict
+from datetime import datetime
+from itertools import chain
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Booking, BookingArchive, Reservation, TherapistMonthlyStats, User
+from .sharding import current_db, fan_out, spans_shards
+
+STAT_FIELDS = ('booked_count', 'booked_seconds', 'booked_spend', 'cancelled_count')
+
+
+def month_of(dt):
+    return timezone.localtime(dt).date().replace(day=1)
+
+
+def contribution(status, start_time, end_time, price):
+    """Deltas a booking in the given state adds to its therapist's month."""
+    if status == 'booked':
+        return {
+            'booked_count': 1,
+            'booked_seconds': int((end_time - start_time).total_seconds()),
+            'booked_spend': price or Decimal('0'),
+        }
+    if status == 'cancelled':
+        return {'cancelled_count': 1}
+    return {}
+
+
+def record_booking_transition(booking, previous_status, previous_therapist_id):
+    """
+    Apply a transition to the stats table. `booking` carries the new state;
+    call inside the transaction that saved it.
+    """
+    month = month_of(booking.start_time)
+    deltas = defaultdict(lambda: defaultdict(int))
+    if previous_therapist_id:
+        for field, value in contribution(previous_status, booking.start_time, booking.end_time, booking.price).items():
+            deltas[previous_therapist_id][field] -= value
+    if booking.therapist_id:
+        for field, value in contribution(booking.status, booking.start_time, booking.end_time, booking.price).items():
+            deltas[booking.therapist_id][field] += value
+
+    for therapist_id, fields in deltas.items():
+        fields = {field: value for field, value in fields.items() if value}
+        if fields:
+            _apply_deltas(therapist_id, month, fields)
+
+
+def record_reservation_transition(reservation, previous_status):
+    """Like record_booking_transition() for a seat; previous_status is None for a new reservation."""
+    slot = reservation.slot
+    deltas = defaultdict(int)
+    for field, value in contribution(previous_status, slot.start_time, slot.end_time, slot.price).items():
+        deltas[field] -= value
+    for field, value in contribution(reservation.status, slot.start_time, slot.end_time, slot.price).items():
+        deltas[field] += value
+    fields = {field: value for field, value in deltas.items() if value}
+    if fields:
+        _apply_deltas(reservation.therapist_id, month_of(slot.start_time), fields)
+
+
+def _apply_deltas(therapist_id, month, fields):
+    rows = TherapistMonthlyStats.objects.filter(therapist_id=therapist_id, month=month)
+    if rows.update(**{field: F(field) + value for field, value in fields.items()}):
+        return
+    try:
+        with transaction.atomic(using=current_db()):
+            TherapistMonthlyStats.objects.create(therapist_id=therapist_id, month=month, **fields)
+    except IntegrityError:
+        # Created concurrently by another transition for the same month.
+        rows.update(**{field: F(field) + value for field, value in fields.items()})
+
+
+def compute_stats(therapist_ids):
+    """
+    Full aggregate for the given therapists over live and archived bookings
+    and seat reservations, computed with the same contribution() rules as
+    the incremental path: {(therapist_id, month): {field: value}}.
+    """
+    totals = defaultdict(lambda: dict.fromkeys(STAT_FIELDS, 0))
+    rows = chain(
+        *(
+            model.objects.filter(therapist_id__in=therapist_ids, status__in=['booked', 'cancelled'])
+            .values_list('therapist_id', 'status', 'start_time', 'end_time', 'price')
+            .iterator(chunk_size=2000)
+            for model in (Booking, BookingArchive)
+        ),
+        Reservation.objects.filter(therapist_id__in=therapist_ids)
+        .values_list('therapist_id', 'status', 'slot__start_time', 'slot__end_time', 'slot__price')
+        .iterator(chunk_size=2000),
+    )
+    for therapist_id, status, start_time, end_time, price in rows:
+        row = totals[(therapist_id, month_of(start_time))]
+        for field, value in contribution(status, start_time, end_time, price).items():
+            row[field] += value
+    return totals
+
+
+def _user_id_batches(batch_size):
+    last_id = 0
+    while True:
+        ids = list(
+            User.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def rebuild_stats(batch_size=500):
+    """Recompute the stats table from Booking, one batch of users per transaction."""
+    rebuilt = 0
+    for therapist_ids in _user_id_batches(batch_size):
+        totals = compute_stats(therapist_ids)
+        with transaction.atomic(using=current_db()):
+            TherapistMonthlyStats.objects.filter(therapist_id__in=therapist_ids).delete()
+            TherapistMonthlyStats.objects.bulk_create([
+                TherapistMonthlyStats(therapist_id=therapist_id, month=month, **values)
+                for (therapist_id, month), values in totals.items()
+            ])
+        rebuilt += len(therapist_ids)
+    return rebuilt
+
+
+def find_inconsistencies(batch_size=500):
+    """
+    Compare the stats table with a full aggregate. Returns a list of
+    (therapist_id, month, field, stored, expected) tuples.
+    """
+    mismatches = []
+    for therapist_ids in _user_id_batches(batch_size):
+        expected = compute_stats(therapist_ids)
+        stored = {
+            (row['therapist_id'], row['month']): row
+            for row in TherapistMonthlyStats.objects.filter(therapist_id__in=therapist_ids).values('therapist_id', 'month', *STAT_FIELDS)
+        }
+        for key in sorted(set(expected) | set(stored)):
+            expected_row = expected.get(key, {})
+            stored_row = stored.get(key, {})
+            for field in STAT_FIELDS:
+                if expected_row.get(field, 0) != stored_row.get(field, 0):
+                    mismatches.append((key[0], key[1], field, stored_row.get(field, 0), expected_row.get(field, 0)))
+    return mismatches
+
+
+def _dashboard_totals(therapist):
+    """Raw dashboard numbers for one therapist on the current shard."""
+    now = timezone.now()
+    current_month = month_of(now)
+    totals = dict.fromkeys(STAT_FIELDS, 0)
+    this_month_seconds = 0
+    later_months_booked = 0
+    for row in TherapistMonthlyStats.objects.filter(therapist=therapist).values('month', *STAT_FIELDS):
+        for field in STAT_FIELDS:
+            totals[field] += row[field]
+        if row['month'] == current_month:
+            this_month_seconds = row['booked_seconds']
+        elif row['month'] > current_month:
+            later_months_booked += row['booked_count']
+
+    # Upcoming bookings in later months come from the table; only the rest of
+    # the current month needs (bounded, indexed) counts of slots and seats.
+    next_month = timezone.make_aware(
+        datetime(current_month.year + current_month.month // 12, current_month.month % 12 + 1, 1)
+    )
+    upcoming_this_month = Booking.objects.filter(
+        therapist=therapist, status='booked', start_time__gte=now, start_time__lt=next_month
+    ).count() + Reservation.objects.filter(
+        therapist=therapist, status='booked', slot__start_time__gte=now, slot__start_time__lt=next_month
+    ).count()
+    return {**totals, 'this_month_seconds': this_month_seconds, 'upcoming': upcoming_this_month + later_months_booked}
+
+
+def therapist_dashboard_stats(therapist):
+    """Dashboard totals for one therapist, read from the stats table (of every shard, unless one is pinned)."""
+    parts = fan_out(lambda: _dashboard_totals(therapist)) if spans_shards() else [_dashboard_totals(therapist)]
+    totals = {key: sum(part[key] for part in parts) for key in parts[0]}
+    return {
+        'upcoming_bookings': totals['upcoming'],
+        'hours_booked_this_month': round(totals['this_month_seconds'] / 3600, 2),
+        'total_bookings': totals['booked_count'],
+        'total_hours_booked': round(totals['booked_seconds'] / 3600, 2),
+        'spend_to_date': totals['booked_spend'],
+        'cancellations': totals['cancelled_count'],
+    }
@@ -0,0 +1,117 @@
+"""
+Delta sync for booking lists.
+
+List views using DeltaSyncMixin accept ``?since=<cursor>``: instead of the
+full list they return the bookings changed after the cursor, ordered by
+(updated_at, id), plus the ids that left the list (deleted, or no longer
+matching its filters) and a new cursor. Pass an empty ``since`` for the
+initial sync and keep requesting while ``has_more`` is true. The cost of a
+sync is proportional to the number of changes, not the size of the table.
+"""
+import base64
+import binascii
+from datetime import datetime, timedelta
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .conf import app_settings
+from .models import Booking, SlotChangeEvent
+
+DEFAULT_CONFIG = {
+    'PAGE_SIZE': 500, # Changed rows per response
+    'SETTLE_SECONDS': 5, # The cursor never advances past now - SETTLE_SECONDS
+}
+
+
+def get_config():
+    return app_settings('DELTA_SYNC', DEFAULT_CONFIG)
+
+
+def encode_cursor(position):
+    updated_at, pk = position
+    raw = f"{updated_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(updated_at, id) position for a cursor, or None for an empty one."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        stamp, pk = raw.split('|')
+        updated_at = datetime.fromisoformat(stamp)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError({"since": "Invalid cursor."})
+    if timezone.is_naive(updated_at):
+        raise ValidationError({"since": "Invalid cursor."})
+    return updated_at, pk
+
+
+def changes_since(sync_queryset, list_queryset, tombstone_scope, position, page_size, settle_seconds):
+    """
+    One page of changes. `sync_queryset` holds every booking the user may
+    see, `list_queryset` is the view's filtered list (used to decide whether
+    a changed row is still in it) and `tombstone_scope` filters the deletion
+    events the user may see.
+    """
+    rows = sync_queryset.annotate(
+        in_list=Exists(list_queryset.filter(pk=OuterRef('pk')))
+    ).select_related('therapist')
+    tombstones = SlotChangeEvent.objects.filter(tombstone_scope, kind='deleted')
+    if position:
+        updated_at, pk = position
+        rows = rows.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, pk__gt=pk))
+        tombstones = tombstones.filter(created_at__gt=updated_at)
+
+    rows = list(rows.order_by('updated_at', 'pk')[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if has_more:
+        end = (rows[-1].updated_at, rows[-1].pk)
+        tombstones = tombstones.filter(created_at__lte=end[0])
+    else:
+        # A transaction that stamped its rows earlier may commit after this
+        # read; holding the cursor back lets the next sync pick those up
+        # (clients upsert, so re-sent rows are harmless).
+        settled = (timezone.now() - timedelta(seconds=settle_seconds), 0)
+        end = min((rows[-1].updated_at, rows[-1].pk), settled) if rows else settled
+        if position and end < position:
+            end = position
+
+    removed = {row.pk for row in rows if not row.in_list}
+    removed.update(tombstones.values_list('booking_id', flat=True))
+    return [row for row in rows if row.in_list], sorted(removed), end, has_more
+
+
+class DeltaSyncMixin:
+    """Adds ``?since=<cursor>`` to a Booking ListAPIView (see module docstring)."""
+
+    def get_sync_scope(self):
+        """Filter (valid on Booking and SlotChangeEvent columns) for what the user may see."""
+        return Q()
+
+    def get_sync_queryset(self):
+        """Every booking the user may see, before the list's own filters."""
+        return Booking.objects.filter(self.get_sync_scope())
+
+    def list(self, request, *args, **kwargs):
+        if 'since' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        config = get_config()
+        position = decode_cursor(request.query_params['since'])
+        rows, removed, end, has_more = changes_since(
+            self.get_sync_queryset(), self.filter_queryset(self.get_queryset()), self.get_sync_scope(), position,
+            config['PAGE_SIZE'], config['SETTLE_SECONDS'],
+        )
+        return Response({
+            'results': self.get_serializer(rows, many=True).data,
+            'removed': removed,
+            'cursor': encode_cursor(end),
+            'has_more': has_more,
+        })
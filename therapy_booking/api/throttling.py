@@ -0,0 +1,148 @@
+"""
+Rate limits shared across processes.
+
+Each limit is a sliding-window counter in the cache. A check does one
+cache.incr on the current window's counter and one read of the previous
+window's counter. The previous count is weighted by how much of that
+window still overlaps the last PERIOD seconds. Throttled requests get
+a 429 with Retry-After (DRF sets it from wait()). Like any DRF throttle,
+they are counted before the view runs, so a flood never reaches password
+hashing.
+
+Limits are per client IP (DRF's get_ident: REMOTE_ADDR, with
+X-Forwarded-For only trusted as far as REST_FRAMEWORK['NUM_PROXIES']
+allows) and, where the request names an account, per account too.
+RATE_LIMITS['RATES'] maps each scope to 'count/period'. A scope set to
+None is not limited. Counters live in CACHE_ALIAS, the 'shared' database
+cache, so every worker process counts against the same limit. Its incr is
+a read followed by a write, so a burst of concurrent requests can be
+slightly undercounted; a Redis or Memcached cache counts exactly.
+"""
+import hashlib
+import time
+
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+from .conf import app_settings
+
+DEFAULT_CONFIG = {
+    'CACHE_ALIAS': 'shared',
+    'RATES': {
+        'login_ip': '30/min',
+        'login_account': '10/min',
+        'password_reset_ip': '10/hour',
+        'password_reset_account': '5/hour',
+        'registration_ip': '20/hour',
+        'booking': '60/min', # Per therapist, across book/cancel/hold endpoints
+    },
+}
+
+PERIODS = {'s': 1, 'sec': 1, 'min': 60, 'm': 60, 'hour': 3600, 'h': 3600, 'day': 86400, 'd': 86400}
+
+
+def get_config():
+    return app_settings('RATE_LIMITS', DEFAULT_CONFIG)
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60)."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period]
+
+
+def hit(cache, key, period, now=None):
+    """
+    Count one request against `key`. Returns (estimate, previous window
+    count, current window count, seconds into the current window).
+    """
+    now = time.time() if now is None else now
+    window, elapsed = divmod(now, period)
+    current = f"{key}:{int(window)}"
+    try:
+        count = cache.incr(current)
+    except ValueError:
+        # First request of the window. If another process created the key meanwhile, add() fails and incr wins.
+        count = 1 if cache.add(current, 1, timeout=2 * period) else cache.incr(current)
+    previous = cache.get(f"{key}:{int(window) - 1}", 0)
+    return previous * (1 - elapsed / period) + count, previous, count, elapsed
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """Base class: subclasses set `scope` and return the identity to count in get_key()."""
+    scope = None
+
+    def get_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        config = get_config()
+        rate = config['RATES'].get(self.scope)
+        if rate is None:
+            return True
+        ident = self.get_key(request, view)
+        if ident is None:
+            return True
+        limit, period = parse_rate(rate)
+        estimate, previous, count, elapsed = hit(caches[config['CACHE_ALIAS']], f"throttle:{self.scope}:{ident}", period)
+        if estimate <= limit:
+            return True
+        if count > limit or not previous:
+            self.wait_seconds = period - elapsed
+        else:
+            # previous * (1 - t / period) + count <= limit once t reaches this point of the window.
+            self.wait_seconds = max(period * (1 - (limit - count) / previous) - elapsed, 1)
+        return False
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class IPThrottle(SlidingWindowThrottle):
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class AccountThrottle(SlidingWindowThrottle):
+    """Per account named in the request body (`field`), case-insensitively."""
+    field = None
+
+    def get_key(self, request, view):
+        if request.method != 'POST':
+            return None
+        value = request.data.get(self.field) if hasattr(request.data, 'get') else None
+        account = str(value or '').strip().lower()
+        # Hashed: the body is client-controlled and cache keys must stay short and plain.
+        return hashlib.sha1(account.encode()).hexdigest() if account else None
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login_ip'
+
+
+class LoginAccountThrottle(AccountThrottle):
+    scope = 'login_account'
+    field = 'username'
+
+
+class PasswordResetIPThrottle(IPThrottle):
+    scope = 'password_reset_ip'
+
+
+class PasswordResetAccountThrottle(AccountThrottle):
+    scope = 'password_reset_account'
+    field = 'email'
+
+
+class RegistrationIPThrottle(IPThrottle):
+    scope = 'registration_ip'
+
+
+class BookingThrottle(SlidingWindowThrottle):
+    """Per authenticated user on booking mutations; reads are not counted."""
+    scope = 'booking'
+
+    def get_key(self, request, view):
+        if request.method in ('GET', 'HEAD', 'OPTIONS') or not request.user.is_authenticated:
+            return None
+        return request.user.pk
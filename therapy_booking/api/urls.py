@@ -11,14 +11,37 @@ from .views import (
     AvailableSlotCreateView, 
     AvailableSlotListView,
     AvailableSlotDeleteView,
+    AdminSlotDetailView,
+    AdminSlotHistoryView,
     # Therapist Booking Flow Views
     TherapistAvailableSlotsListView,
+    TherapistSlotSearchView,
+    CabinAvailabilityView,
     TherapistBookSlotView,
+    TherapistSlotHoldView,
+    TherapistConfirmHoldView,
     TherapistMyBookingsListView,
     TherapistCancelBookingView,
+    TherapistRescheduleBookingView,
+    TherapistStatsView,
     # Admin Booking Management Views
     AdminListAllBookingsView,
     AdminCancelBookingView,
+    AdminBookingAnalyticsView,
+    # Live Updates
+    SlotEventTicketView,
+    SlotEventStreamView,
+    # Admin Deletions
+    AdminUserDeleteView,
+    AdminDeletionJobListView,
+    AdminDeletionJobDetailView,
+    # Admin Search
+    AdminTherapistSearchView,
+    AdminCabinSearchView,
+    # Admin Diagnostics
+    AdminQueryStatsView,
+    # Batching
+    BatchView,
 )
 
 app_name = 'api'
@@ -46,14 +69,42 @@ urlpatterns = [
     path('admin/slots/create/', AvailableSlotCreateView.as_view(), name='admin_slot_create'),
     path('admin/slots/available/', AvailableSlotListView.as_view(), name='admin_slot_list_available'),
     path('admin/slots/<int:pk>/delete/', AvailableSlotDeleteView.as_view(), name='admin_slot_delete'),
+    path('admin/slots/<int:pk>/', AdminSlotDetailView.as_view(), name='admin_slot_detail'),
+    path('admin/slots/<int:pk>/history/', AdminSlotHistoryView.as_view(), name='admin_slot_history'),
 
     # Therapist Booking Flow
     path('therapist/slots/available/', TherapistAvailableSlotsListView.as_view(), name='therapist_slots_available'),
+    path('therapist/slots/search/', TherapistSlotSearchView.as_view(), name='therapist_slots_search'),
+    path('therapist/cabins/<int:pk>/availability/', CabinAvailabilityView.as_view(), name='cabin_availability'),
     path('therapist/slots/<int:pk>/book/', TherapistBookSlotView.as_view(), name='therapist_slot_book'),
+    path('therapist/slots/<int:pk>/hold/', TherapistSlotHoldView.as_view(), name='therapist_slot_hold'),
+    path('therapist/slots/<int:pk>/hold/confirm/', TherapistConfirmHoldView.as_view(), name='therapist_slot_hold_confirm'),
     path('therapist/bookings/mine/', TherapistMyBookingsListView.as_view(), name='therapist_bookings_mine'),
     path('therapist/bookings/<int:pk>/cancel/', TherapistCancelBookingView.as_view(), name='therapist_booking_cancel'),
+    path('therapist/bookings/<int:pk>/reschedule/', TherapistRescheduleBookingView.as_view(), name='therapist_booking_reschedule'),
+    path('therapist/stats/', TherapistStatsView.as_view(), name='therapist_stats'),
 
     # Admin Booking Management
     path('admin/bookings/all/', AdminListAllBookingsView.as_view(), name='admin_bookings_all'),
     path('admin/bookings/<int:pk>/cancel/', AdminCancelBookingView.as_view(), name='admin_booking_cancel'),
+    path('admin/analytics/bookings/', AdminBookingAnalyticsView.as_view(), name='admin_booking_analytics'),
+
+    # Live Updates (Server-Sent Events, ASGI)
+    path('slots/events/', SlotEventStreamView.as_view(), name='slot_events'),
+    path('slots/events/ticket/', SlotEventTicketView.as_view(), name='slot_events_ticket'),
+
+    # Admin Deletions (background jobs, see api/deletion.py)
+    path('admin/users/<int:pk>/', AdminUserDeleteView.as_view(), name='admin_user_delete'),
+    path('admin/deletion-jobs/', AdminDeletionJobListView.as_view(), name='admin_deletion_jobs'),
+    path('admin/deletion-jobs/<int:pk>/', AdminDeletionJobDetailView.as_view(), name='admin_deletion_job'),
+
+    # Admin Search
+    path('admin/search/therapists/', AdminTherapistSearchView.as_view(), name='admin_search_therapists'),
+    path('admin/search/cabins/', AdminCabinSearchView.as_view(), name='admin_search_cabins'),
+
+    # Admin Diagnostics
+    path('admin/diagnostics/queries/', AdminQueryStatsView.as_view(), name='admin_query_stats'),
+
+    # Batching
+    path('batch/', BatchView.as_view(), name='batch'),
 ]
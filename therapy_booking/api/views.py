@@ -1,16 +1,22 @@
 from django.contrib.auth import get_user_model, authenticate
 from django.core.cache import cache # Using cache for password reset tokens
 from django.utils.crypto import get_random_string # More secure token generation
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from asgiref.sync import sync_to_async
 from django.utils.dateparse import parse_date
 from django.utils import timezone
-from rest_framework import generics, status, permissions, viewsets
-from rest_framework.exceptions import PermissionDenied, NotFound
+from rest_framework import generics, status, permissions, viewsets, serializers
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied, NotFound
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
-import uuid # For generating reset tokens
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 
-from .models import Cabin, Booking # Import Cabin and Booking
+from .models import Cabin, Booking, BookingArchive, DeletionJob, Reservation # Import Cabin and Booking
 from .serializers import (
     TherapistRegistrationSerializer,
     UserLoginSerializer,
@@ -21,11 +27,46 @@ from .serializers import (
     CabinSerializer, # Import new serializers
     AvailableSlotCreateSerializer,
     BookingSerializer, # For listing available slots (or a more specific one if created)
+    BookingHistorySerializer,
+    TherapistBookingSerializer,
+    SlotSearchSerializer,
+    CabinAvailabilitySerializer,
+    AdminSearchSerializer,
+    BatchSerializer,
+    DeletionJobSerializer,
+    SlotEventSerializer,
+    SlotHistoryParamsSerializer,
+    RescheduleSerializer,
+    SlotUpdateSerializer,
     # AvailableSlotListSerializer, # Using BookingSerializer for now
 )
 # Import custom permissions
 from .permissions import IsAdminOrSuperUser, IsTherapistUser, IsOwnerOrAdmin
 from .utils import send_app_email # Import the email utility
+from .query_log import query_stats, get_config as get_query_log_config
+from .stats import record_booking_transition, record_reservation_transition, therapist_dashboard_stats
+from .events import (
+    get_config as get_slot_events_config, issue_stream_ticket, record_slot_change, redeem_stream_ticket, slot_history,
+    stream_slot_changes,
+)
+from .sync import DeltaSyncMixin
+from .sparse_fields import SparseFieldsMixin
+from .idempotency import IdempotentMixin
+from .throttling import (
+    BookingThrottle, LoginAccountThrottle, LoginIPThrottle, PasswordResetAccountThrottle, PasswordResetIPThrottle,
+    RegistrationIPThrottle,
+)
+from .holds import claim_slot, place_hold, release_hold
+from .reschedule import RescheduleFailed, reschedule
+from .slot_updates import SlotUpdateFailed, update_slot
+from .archive import booking_history
+from .availability import availability_index
+from .catalog import cabin_catalog
+from .search import search_cabins, search_therapists
+from .batch import run_batch
+from .deletion import queue_cabin_deletion, queue_user_deletion
+from .sharding import FanOutListMixin, current_db, shard_aliases, spans_shards
+from .seats import SeatUnavailable, cancel_all_seats, give_back_seat, live_reservation, take_seat
 from django.conf import settings # To get ADMIN_EMAIL_LIST
 
 
@@ -39,6 +80,7 @@ User = get_user_model()
 class TherapistRegistrationView(generics.CreateAPIView):
     serializer_class = TherapistRegistrationSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [RegistrationIPThrottle]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -64,6 +106,8 @@ class TherapistRegistrationView(generics.CreateAPIView):
 
 class UserLoginView(TokenObtainPairView):
     # Uses SimpleJWT's TokenObtainPairSerializer by default
+    throttle_classes = [LoginIPThrottle, LoginAccountThrottle] # Checked before the password hash
+
     def post(self, request, *args, **kwargs):
         response = super().post(request, *args, **kwargs)
         if response.status_code == status.HTTP_200_OK:
@@ -77,6 +121,7 @@ class UserLoginView(TokenObtainPairView):
 class TherapistProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = TherapistProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 3
 
     def get_object(self):
         # Ensure that only therapists can access this view
@@ -113,6 +158,7 @@ class TherapistProfileView(generics.RetrieveUpdateAPIView):
 class PasswordResetRequestView(generics.GenericAPIView):
     serializer_class = PasswordResetRequestSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [PasswordResetIPThrottle, PasswordResetAccountThrottle]
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -190,15 +236,35 @@ class PasswordResetConfirmView(generics.GenericAPIView):
 
 # Admin Views
 
-class CabinViewSet(viewsets.ModelViewSet):
+class CabinViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     """
-    Admin CRUD for Cabins.
+    Admin CRUD for Cabins. GETs accept ?fields= sparse fieldsets.
+    DELETE hides the cabin and answers 202 with a deletion job that archives
+    its bookings in the background (see api/deletion.py).
     """
-    queryset = Cabin.objects.all()
+    queryset = Cabin.objects.filter(hidden_at__isnull=True) # Hidden cabins are being deleted
     serializer_class = CabinSerializer
     permission_classes = [IsAdminOrSuperUser] # Using custom admin permission
+    query_budget = 3 # destroy: lookup, hiding the cabin and queueing the job
+
+    def list(self, request, *args, **kwargs):
+        # Served from the cabin catalog (api/catalog.py): one version check unless a cabin changed.
+        return Response(self.get_serializer(cabin_catalog.entries(), many=True).data)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        cabin_catalog.invalidate(current_db())
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        cabin_catalog.invalidate(current_db())
 
-class AvailableSlotCreateView(generics.CreateAPIView):
+    def destroy(self, request, *args, **kwargs):
+        job = queue_cabin_deletion(self.get_object(), requested_by=request.user)
+        cabin_catalog.invalidate(current_db())
+        return Response(DeletionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+class AvailableSlotCreateView(IdempotentMixin, generics.CreateAPIView):
     """
     Admin creates an available slot (Booking with status='available').
     """
@@ -210,21 +276,25 @@ class AvailableSlotCreateView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         # The serializer's create method handles setting status to 'available'
         # and ensuring therapist is null.
-        slot = serializer.save() 
+        with transaction.atomic(using=current_db()):
+            slot = serializer.save()
+            record_slot_change(slot, 'created', request.user.pk, previous=('', None))
         # Return full booking details using BookingSerializer for the response
         response_serializer = BookingSerializer(slot)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
-class AvailableSlotListView(generics.ListAPIView):
+class AvailableSlotListView(FanOutListMixin, SparseFieldsMixin, DeltaSyncMixin, generics.ListAPIView):
     """
     Admin views available slots.
-    Supports filtering by cabin_id and date.
+    Supports filtering by cabin_id and date, ?since=<cursor> delta sync and ?fields= sparse fieldsets.
     """
     serializer_class = BookingSerializer # Use BookingSerializer to display full slot details
     permission_classes = [IsAdminOrSuperUser]
+    query_budget = 3 # Constant regardless of row count (see api/query_budget.py)
 
     def get_queryset(self):
-        queryset = Booking.objects.filter(status='available', therapist__isnull=True)
+        # select_related avoids a query per row for therapist_username; cabin_name comes from the cabin catalog
+        queryset = Booking.objects.filter(status='available', therapist__isnull=True).visible().select_related('therapist')
         
         cabin_id = self.request.query_params.get('cabin_id')
         if cabin_id:
@@ -243,7 +313,7 @@ class AvailableSlotListView(generics.ListAPIView):
                 
         return queryset.order_by('start_time')
 
-class AvailableSlotDeleteView(generics.DestroyAPIView):
+class AvailableSlotDeleteView(IdempotentMixin, generics.DestroyAPIView):
     """
     Admin deletes an available slot.
     """
@@ -254,27 +324,105 @@ class AvailableSlotDeleteView(generics.DestroyAPIView):
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         # Additional check: ensure it's truly an 'available' slot not yet picked up
-        if instance.status != 'available' or instance.therapist is not None:
+        if instance.status != 'available' or instance.therapist is not None or instance.reservations.exists():
             return Response(
                 {"error": "This slot is not available or has been assigned, and cannot be deleted via this endpoint."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        self.perform_destroy(instance)
+        with transaction.atomic(using=current_db()):
+            record_slot_change(instance, 'deleted', request.user.pk)
+            self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class AdminSlotDetailView(IdempotentMixin, generics.GenericAPIView):
+    """
+    Admin reads (GET) or edits (PATCH) a slot's start_time, end_time and
+    price, keeping its id. Responses carry the slot's version as ETag; a
+    PATCH must send the version it read back as If-Match (or `version` in
+    the body) and gets 412 if the slot changed since, 409 if it is no
+    longer open or the new time overlaps another slot of the cabin (see
+    api/slot_updates.py).
+    """
+    queryset = Booking.objects.select_related('therapist')
+    serializer_class = BookingSerializer
+    permission_classes = [IsAdminOrSuperUser]
+    failure_statuses = {
+        'missing': status.HTTP_404_NOT_FOUND,
+        'version': status.HTTP_412_PRECONDITION_FAILED,
+        'state': status.HTTP_409_CONFLICT,
+        'overlap': status.HTTP_409_CONFLICT,
+    }
+
+    def tagged(self, slot):
+        response = Response(self.get_serializer(slot).data)
+        response['ETag'] = f'"{slot.version}"'
+        return response
+
+    def requested_version(self, request, params):
+        if_match = request.headers.get('If-Match')
+        if if_match is None:
+            return params.validated_data.get('version')
+        try:
+            return int(if_match.strip().removeprefix('W/').strip('"'))
+        except ValueError:
+            raise serializers.ValidationError({"If-Match": "Must be the slot's ETag, e.g. \"3\"."})
+
+    def get(self, request, *args, **kwargs):
+        return self.tagged(self.get_object())
+
+    def patch(self, request, *args, **kwargs):
+        params = SlotUpdateSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        version = self.requested_version(request, params)
+        if version is None:
+            return Response(
+                {"detail": "Send the version you read as If-Match or `version`."},
+                status=status.HTTP_428_PRECONDITION_REQUIRED
+            )
+        changes = {field: value for field, value in params.validated_data.items() if field != 'version'}
+        try:
+            slot = update_slot(kwargs['pk'], version, changes, request.user.pk)
+        except SlotUpdateFailed as e:
+            if e.reason == 'invalid':
+                raise serializers.ValidationError(str(e))
+            return Response({"detail": str(e)}, status=self.failure_statuses[e.reason])
+        return self.tagged(slot)
+
+class AdminSlotHistoryView(generics.GenericAPIView):
+    """
+    Admin reads a slot's change history, oldest first: who booked,
+    cancelled or deleted it and when, with its status and therapist before
+    and after each change. Works for archived and deleted slots too.
+    Supports ?month=YYYY-MM to read one month of it.
+    """
+    serializer_class = SlotEventSerializer
+    permission_classes = [IsAdminOrSuperUser]
+    query_budget = 2 # The events, then the actors' usernames
+
+    def get(self, request, *args, **kwargs):
+        params = SlotHistoryParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        events = list(slot_history(kwargs['pk'], params.validated_data.get('month')))
+        actor_ids = {event.actor_id for event in events if event.actor_id}
+        actor_names = dict(User.objects.filter(pk__in=actor_ids).values_list('pk', 'username')) if actor_ids else {}
+        context = {**self.get_serializer_context(), 'actor_names': actor_names}
+        return Response(self.get_serializer(events, many=True, context=context).data)
+
 
 # Therapist Views
 
-class TherapistAvailableSlotsListView(generics.ListAPIView):
+class TherapistAvailableSlotsListView(FanOutListMixin, SparseFieldsMixin, DeltaSyncMixin, generics.ListAPIView):
     """
     Therapists list available slots.
-    Supports filtering by cabin_id, start_date, and end_date.
+    Supports filtering by cabin_id, start_date, and end_date, ?since=<cursor> delta sync and ?fields= sparse fieldsets.
     """
     serializer_class = BookingSerializer 
     permission_classes = [IsTherapistUser]
+    query_budget = 3
 
     def get_queryset(self):
-        queryset = Booking.objects.filter(status='available', therapist__isnull=True)
+        # Slots held by other therapists are hidden; expired holds count as free.
+        queryset = Booking.objects.filter(status='available', therapist__isnull=True).visible().unheld(self.request.user).select_related('therapist')
         
         cabin_id = self.request.query_params.get('cabin_id')
         if cabin_id:
@@ -294,14 +442,160 @@ class TherapistAvailableSlotsListView(generics.ListAPIView):
                 
         return queryset.order_by('start_time')
 
-class TherapistBookSlotView(generics.UpdateAPIView):
+class TherapistSlotSearchView(FanOutListMixin, generics.GenericAPIView):
+    """
+    Therapists search for the first N available slots matching a minimum
+    duration, time-of-day window, weekdays, cabins and maximum price.
+    All filters are pushed into one query ordered by start_time with a LIMIT,
+    so the database walks booking_status_start_idx and stops at the Nth match
+    instead of fetching every slot. Across locations every shard runs that
+    query and the first N of the merged results are returned.
+    """
+    serializer_class = BookingSerializer
+    permission_classes = [IsTherapistUser]
+    query_budget = 3
+
+    def get(self, request, *args, **kwargs):
+        params = SlotSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        criteria = params.validated_data
+
+        queryset = Booking.objects.filter(
+            status='available', therapist__isnull=True, start_time__gte=criteria.get('start') or timezone.now()
+        ).visible().unheld(request.user)
+        if 'end' in criteria:
+            queryset = queryset.filter(start_time__lt=criteria['end'])
+        if criteria.get('cabin_ids'):
+            queryset = queryset.filter(cabin_id__in=criteria['cabin_ids'])
+        if 'max_price' in criteria:
+            queryset = queryset.filter(price__lte=criteria['max_price'])
+        if 'min_duration' in criteria:
+            queryset = queryset.alias(duration=F('end_time') - F('start_time')).filter(
+                duration__gte=timezone.timedelta(minutes=criteria['min_duration'])
+            )
+        if criteria.get('weekdays'):
+            queryset = queryset.filter(start_time__iso_week_day__in=[day + 1 for day in criteria['weekdays']])
+        if 'time_from' in criteria:
+            queryset = queryset.filter(start_time__time__gte=criteria['time_from'])
+        if 'time_to' in criteria:
+            # The slot must also end on the day it starts for the window to be meaningful.
+            queryset = queryset.filter(end_time__time__lte=criteria['time_to'], end_time__date=F('start_time__date'))
+
+        queryset = queryset.select_related('therapist').order_by('start_time', 'id')[:criteria['limit']]
+        slots = self.across_shards(queryset.all)[:criteria['limit']]
+        return Response(self.get_serializer(slots, many=True).data)
+
+class CabinAvailabilityView(generics.GenericAPIView):
+    """
+    A cabin's free and booked time per day, answered from the in-process
+    availability index. With time_from/time_to each day also says whether
+    that whole window is free.
+    """
+    permission_classes = [IsTherapistUser | IsAdminOrSuperUser]
+    query_budget = 4 # cabin, index version check, changed events and a first build of the cabin
+
+    def get(self, request, pk, *args, **kwargs):
+        params = CabinAvailabilitySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        criteria = params.validated_data
+        if not Cabin.objects.filter(pk=pk, hidden_at__isnull=True).exists():
+            raise NotFound("Cabin not found.")
+
+        start_date = criteria.get('start_date') or timezone.localdate()
+        days = availability_index.calendar(pk, start_date, criteria['days'])
+        if 'time_from' in criteria:
+            window_free = availability_index.free_on(pk, start_date, criteria['days'], criteria['time_from'], criteria['time_to'])
+            for day, free in zip(days, window_free):
+                day['window_free'] = free
+        return Response({
+            'cabin': pk,
+            'granularity_minutes': availability_index.granularity,
+            'days': days,
+        })
+
+def send_booking_confirmation_emails(booking, therapist_user):
+    """Booking confirmation to the therapist and an alert to the admins."""
+    cabin = booking.cabin
+    
+    try:
+        # To Therapist
+        subject_therapist = f"Your Booking Confirmation - {cabin.name} on {booking.start_time.strftime('%Y-%m-%d')}"
+        message_therapist = (
+            f"Hi {therapist_user.first_name or therapist_user.username},\n\n"
+            f"Your booking for {cabin.name} has been confirmed.\n"
+            f"Details:\n"
+            f"  Cabin: {cabin.name}\n"
+            f"  Start Time: {booking.start_time.strftime('%Y-%m-%d %H:%M')}\n"
+            f"  End Time: {booking.end_time.strftime('%Y-%m-%d %H:%M')}\n"
+            f"  Price: ${booking.price}\n\n"
+            f"Thank you,\nThe Therapy Booking Team"
+        )
+        send_app_email(subject_therapist, message_therapist, [therapist_user.email], fail_silently=True)
+
+        # To Admin(s)
+        subject_admin = f"New Booking Alert: {cabin.name} by {therapist_user.username}"
+        message_admin = (
+            f"A new booking has been made:\n\n"
+            f"  Therapist: {therapist_user.username} (ID: {therapist_user.id})\n"
+            f"  Cabin: {cabin.name} (ID: {cabin.id})\n"
+            f"  Start Time: {booking.start_time.strftime('%Y-%m-%d %H:%M')}\n"
+            f"  End Time: {booking.end_time.strftime('%Y-%m-%d %H:%M')}\n"
+            f"  Price: ${booking.price}\n"
+            f"  Booking ID: {booking.id}\n"
+        )
+        admin_emails = getattr(settings, 'ADMIN_EMAIL_LIST', [])
+        if admin_emails:
+            send_app_email(subject_admin, message_admin, admin_emails, fail_silently=True)
+    except Exception as e:
+        print(f"Error sending booking confirmation emails for booking {booking.id}: {e}")
+
+
+def send_reschedule_emails(old_booking, new_booking, therapist_user):
+    """One notice of a moved booking to the therapist, and one to the admins."""
+    def describe(booking):
+        return (
+            f"{booking.cabin.name}, {booking.start_time.strftime('%Y-%m-%d %H:%M')} to "
+            f"{booking.end_time.strftime('%Y-%m-%d %H:%M')} (Booking ID: {booking.id})"
+        )
+
+    try:
+        # To Therapist
+        subject_therapist = f"Your Booking Has Been Moved - {new_booking.cabin.name} on {new_booking.start_time.strftime('%Y-%m-%d')}"
+        message_therapist = (
+            f"Hi {therapist_user.first_name or therapist_user.username},\n\n"
+            f"Your booking has been moved.\n"
+            f"  From: {describe(old_booking)}\n"
+            f"  To: {describe(new_booking)}\n"
+            f"  Price: ${new_booking.price}\n\n"
+            f"Thank you,\nThe Therapy Booking Team"
+        )
+        send_app_email(subject_therapist, message_therapist, [therapist_user.email], fail_silently=True)
+
+        # To Admin(s)
+        subject_admin = f"Booking Moved: {new_booking.cabin.name} by {therapist_user.username}"
+        message_admin = (
+            f"A booking has been moved by the therapist:\n\n"
+            f"  Therapist: {therapist_user.username} (ID: {therapist_user.id})\n"
+            f"  From: {describe(old_booking)}\n"
+            f"  To: {describe(new_booking)}\n"
+        )
+        admin_emails = getattr(settings, 'ADMIN_EMAIL_LIST', [])
+        if admin_emails:
+            send_app_email(subject_admin, message_admin, admin_emails, fail_silently=True)
+    except Exception as e:
+        print(f"Error sending reschedule emails for booking {old_booking.id}: {e}")
+
+
+class TherapistBookSlotView(IdempotentMixin, generics.UpdateAPIView):
     """
     Therapist books an available slot.
-    Updates therapist to self and status to 'booked'.
+    Updates therapist to self and status to 'booked', or on a multi-seat slot
+    reserves one seat (see api/seats.py).
     """
     queryset = Booking.objects.all() # Will filter in get_object
-    serializer_class = BookingSerializer
+    serializer_class = TherapistBookingSerializer
     permission_classes = [IsTherapistUser]
+    throttle_classes = [BookingThrottle]
 
     def get_object(self):
         booking = super().get_object()
@@ -310,51 +604,33 @@ class TherapistBookSlotView(generics.UpdateAPIView):
         return booking
 
     def perform_update(self, serializer):
-        # Check again before saving, in case of race conditions (though less likely with DB transactions)
         instance = serializer.instance
-        if instance.status != 'available' or instance.therapist is not None:
-             # Raising validation error to give a 400 response
-            raise serializers.ValidationError("Slot is no longer available.", code="conflict")
+        if instance.seats_total > 1:
+            return self.take_seat(instance)
+        with transaction.atomic(using=current_db()):
+            # One guarded UPDATE: fails if the slot was booked, or held by
+            # another therapist, since get_object() read it.
+            if not claim_slot(instance.pk, self.request.user):
+                # Raising validation error to give a 409 response (see update())
+                raise serializers.ValidationError("Slot is no longer available.", code="conflict")
+            instance.refresh_from_db()
+            record_booking_transition(instance, 'available', None)
+            record_slot_change(instance, 'booked', self.request.user.pk, previous=('available', None))
 
-        serializer.save(therapist=self.request.user, status='booked')
-        
-        # Send confirmation emails
-        booking = serializer.instance # The updated booking instance
-        therapist_user = self.request.user
-        cabin = booking.cabin
-        
-        try:
-            # To Therapist
-            subject_therapist = f"Your Booking Confirmation - {cabin.name} on {booking.start_time.strftime('%Y-%m-%d')}"
-            message_therapist = (
-                f"Hi {therapist_user.first_name or therapist_user.username},\n\n"
-                f"Your booking for {cabin.name} has been confirmed.\n"
-                f"Details:\n"
-                f"  Cabin: {cabin.name}\n"
-                f"  Start Time: {booking.start_time.strftime('%Y-%m-%d %H:%M')}\n"
-                f"  End Time: {booking.end_time.strftime('%Y-%m-%d %H:%M')}\n"
-                f"  Price: ${booking.price}\n\n"
-                f"Thank you,\nThe Therapy Booking Team"
-            )
-            send_app_email(subject_therapist, message_therapist, [therapist_user.email], fail_silently=True)
+        send_booking_confirmation_emails(instance, self.request.user)
 
-            # To Admin(s)
-            subject_admin = f"New Booking Alert: {cabin.name} by {therapist_user.username}"
-            message_admin = (
-                f"A new booking has been made:\n\n"
-                f"  Therapist: {therapist_user.username} (ID: {therapist_user.id})\n"
-                f"  Cabin: {cabin.name} (ID: {cabin.id})\n"
-                f"  Start Time: {booking.start_time.strftime('%Y-%m-%d %H:%M')}\n"
-                f"  End Time: {booking.end_time.strftime('%Y-%m-%d %H:%M')}\n"
-                f"  Price: ${booking.price}\n"
-                f"  Booking ID: {booking.id}\n"
-            )
-            admin_emails = getattr(settings, 'ADMIN_EMAIL_LIST', [])
-            if admin_emails:
-                send_app_email(subject_admin, message_admin, admin_emails, fail_silently=True)
-        except Exception as e:
-            print(f"Error sending booking confirmation emails for booking {booking.id}: {e}")
+    def take_seat(self, instance):
+        with transaction.atomic(using=current_db()):
+            try:
+                reservation = take_seat(instance, self.request.user)
+            except SeatUnavailable as e:
+                raise serializers.ValidationError(str(e), code="conflict")
+            instance.refresh_from_db()
+            record_reservation_transition(reservation, None)
+            record_slot_change(instance, 'seat_taken', self.request.user.pk, previous=('available', None))
+        instance.booking_status = reservation.status
 
+        send_booking_confirmation_emails(instance, self.request.user)
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', True) # Allow partial update-like behavior for just changing therapist and status
@@ -371,27 +647,86 @@ class TherapistBookSlotView(generics.UpdateAPIView):
             self.perform_update(serializer)
         except serializers.ValidationError as e:
              # Catch validation error from perform_update (e.g. slot no longer available)
-            if e.code == "conflict":
+            if "conflict" in e.get_codes():
                 return Response({"detail": str(e.detail[0])}, status=status.HTTP_409_CONFLICT)
             raise e # Re-raise other validation errors
             
         return Response(serializer.data)
 
 
-class TherapistMyBookingsListView(generics.ListAPIView):
+class TherapistSlotHoldView(IdempotentMixin, generics.GenericAPIView):
+    """
+    Therapist holds (POST) or releases (DELETE) an available slot for a few
+    minutes while deciding. Held slots are hidden from other therapists until
+    the hold is confirmed, released or expires.
     """
-    Therapist lists their own bookings.
-    Supports filtering by status and period (upcoming/past).
+    permission_classes = [IsTherapistUser]
+    throttle_classes = [BookingThrottle]
+    query_budget = 2
+
+    def post(self, request, *args, **kwargs):
+        held_until = place_hold(kwargs['pk'], request.user)
+        if held_until is None:
+            if not Booking.objects.filter(pk=kwargs['pk']).exists():
+                raise NotFound("Slot not found.")
+            return Response({"detail": "This slot is not available for holding."}, status=status.HTTP_409_CONFLICT)
+        return Response({"slot": kwargs['pk'], "held_until": held_until})
+
+    def delete(self, request, *args, **kwargs):
+        release_hold(kwargs['pk'], request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class TherapistConfirmHoldView(IdempotentMixin, generics.GenericAPIView):
+    """
+    Therapist turns their live hold on a slot into a booking.
     """
     serializer_class = BookingSerializer
     permission_classes = [IsTherapistUser]
+    throttle_classes = [BookingThrottle]
+
+    def post(self, request, *args, **kwargs):
+        with transaction.atomic(using=current_db()):
+            if not claim_slot(kwargs['pk'], request.user, require_hold=True):
+                return Response(
+                    {"detail": "You do not hold this slot, or your hold has expired."},
+                    status=status.HTTP_409_CONFLICT
+                )
+            booking = Booking.objects.select_related('therapist', 'cabin').get(pk=kwargs['pk'])
+            record_booking_transition(booking, 'available', None)
+            record_slot_change(booking, 'booked', request.user.pk, previous=('available', None))
+
+        send_booking_confirmation_emails(booking, request.user)
+        return Response(self.get_serializer(booking).data)
+
+
+class TherapistMyBookingsListView(FanOutListMixin, SparseFieldsMixin, DeltaSyncMixin, generics.ListAPIView):
+    """
+    Therapist lists their own bookings, including seats on multi-seat slots.
+    Supports filtering by status and period (upcoming/past), ?since=<cursor> delta sync and ?fields= sparse fieldsets.
+    """
+    serializer_class = TherapistBookingSerializer
+    permission_classes = [IsTherapistUser]
+    query_budget = 3
+
+    def get_sync_scope(self):
+        return Q(therapist_id=self.request.user.pk)
+
+    def get_sync_queryset(self):
+        return self.my_bookings()
+
+    def my_bookings(self):
+        # booking_status is the therapist's own reservation status on multi-seat slots
+        reservations = Reservation.objects.filter(slot=OuterRef('pk'), therapist=self.request.user).order_by('-pk')
+        return Booking.objects.filter(Q(therapist=self.request.user) | Q(Exists(reservations))).annotate(
+            booking_status=Coalesce(Subquery(reservations.values('status')[:1]), 'status')
+        )
 
     def get_queryset(self):
-        queryset = Booking.objects.filter(therapist=self.request.user)
+        queryset = self.my_bookings().select_related('therapist')
         
         status_filter = self.request.query_params.get('status')
         if status_filter:
-            queryset = queryset.filter(status=status_filter)
+            queryset = queryset.filter(booking_status=status_filter)
             
         period_filter = self.request.query_params.get('period')
         if period_filter == 'upcoming':
@@ -401,17 +736,31 @@ class TherapistMyBookingsListView(generics.ListAPIView):
             
         return queryset.order_by('start_time')
 
-class TherapistCancelBookingView(generics.UpdateAPIView):
+class TherapistStatsView(generics.GenericAPIView):
     """
-    Therapist cancels their own booking.
-    Sets status to 'cancelled'.
+    Therapist dashboard totals (upcoming bookings, hours this month, spend,
+    cancellations), read from the incrementally maintained stats table.
+    """
+    permission_classes = [IsTherapistUser]
+    query_budget = 4
+
+    def get(self, request, *args, **kwargs):
+        return Response(therapist_dashboard_stats(request.user))
+
+class OwnBookingMixin:
+    """
+    get_object() for a therapist acting on their own live booking: a slot
+    they booked, or a multi-seat slot they have a seat on (the seat is set
+    as booking.reservation).
     """
-    queryset = Booking.objects.all()
-    serializer_class = BookingSerializer
-    permission_classes = [IsTherapistUser, IsOwnerOrAdmin] # IsOwnerOrAdmin checks obj.therapist
 
     def get_object(self):
         booking = super().get_object()
+        if booking.seats_total > 1:
+            booking.reservation = live_reservation(booking, self.request.user)
+            if booking.reservation is None:
+                raise PermissionDenied("You do not own this booking.")
+            return booking
         if booking.therapist != self.request.user: # Double check ownership
              raise PermissionDenied("You do not own this booking.")
         if booking.status != 'booked':
@@ -422,17 +771,50 @@ class TherapistCancelBookingView(generics.UpdateAPIView):
         #     raise PermissionDenied("Cannot cancel booking within 24 hours of start time.")
         return booking
 
+class TherapistCancelBookingView(OwnBookingMixin, IdempotentMixin, generics.UpdateAPIView):
+    """
+    Therapist cancels their own booking.
+    Sets status to 'cancelled', or on a multi-seat slot cancels their
+    reservation and frees the seat.
+    """
+    queryset = Booking.objects.all()
+    serializer_class = TherapistBookingSerializer
+    permission_classes = [IsTherapistUser, IsOwnerOrAdmin] # IsOwnerOrAdmin checks obj.therapist
+    throttle_classes = [BookingThrottle]
+
     def perform_update(self, serializer):
         # Check again before saving
         instance = serializer.instance
+        if instance.seats_total > 1:
+            return self.give_back_seat(instance)
         if instance.status != 'booked':
              raise serializers.ValidationError("Booking is no longer in a cancellable state.", code="conflict")
-        serializer.save(status='cancelled')
+        previous_status, previous_therapist_id = instance.status, instance.therapist_id
+        with transaction.atomic(using=current_db()):
+            instance.status = 'cancelled'
+            instance.save(update_fields=['status', 'updated_at']) # Nothing else in the request body applies
+            record_booking_transition(serializer.instance, previous_status, previous_therapist_id)
+            record_slot_change(
+                serializer.instance, 'cancelled', self.request.user.pk, previous=(previous_status, previous_therapist_id)
+            )
         # Optionally, could re-open the slot:
         # serializer.save(status='available', therapist=None)
         
-        # Send cancellation emails
-        booking = serializer.instance
+        self.send_cancellation_emails(serializer.instance)
+
+    def give_back_seat(self, instance):
+        reservation = instance.reservation
+        previous = (instance.status, instance.therapist_id)
+        with transaction.atomic(using=current_db()):
+            if not give_back_seat(reservation):
+                raise serializers.ValidationError("Booking is no longer in a cancellable state.", code="conflict")
+            instance.refresh_from_db()
+            record_reservation_transition(reservation, 'booked')
+            record_slot_change(instance, 'seat_released', self.request.user.pk, previous=previous)
+        instance.booking_status = reservation.status
+        self.send_cancellation_emails(instance)
+
+    def send_cancellation_emails(self, booking):
         therapist_user = self.request.user # This is the therapist who initiated cancellation
         cabin = booking.cabin
 
@@ -472,25 +854,56 @@ class TherapistCancelBookingView(generics.UpdateAPIView):
         try:
             self.perform_update(serializer)
         except serializers.ValidationError as e:
-            if e.code == "conflict":
+            if "conflict" in e.get_codes():
                 return Response({"detail": str(e.detail[0])}, status=status.HTTP_409_CONFLICT)
             raise e
         return Response(serializer.data)
 
+class TherapistRescheduleBookingView(OwnBookingMixin, IdempotentMixin, generics.GenericAPIView):
+    """
+    Therapist moves their own booking to another slot: the new slot is
+    booked and the old booking cancelled together, or neither is (see
+    api/reschedule.py). One email covers the move.
+    """
+    queryset = Booking.objects.select_related('cabin')
+    serializer_class = TherapistBookingSerializer
+    permission_classes = [IsTherapistUser, IsOwnerOrAdmin]
+    throttle_classes = [BookingThrottle]
+
+    def post(self, request, *args, **kwargs):
+        params = RescheduleSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        booking = self.get_object()
+        if params.validated_data['slot'] == booking.pk:
+            return Response({"slot": ["This is the slot already booked."]}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            new_booking = reschedule(booking, params.validated_data['slot'], request.user)
+        except RescheduleFailed as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+        if new_booking.reservation is not None:
+            new_booking.booking_status = new_booking.reservation.status
+
+        send_reschedule_emails(booking, new_booking, request.user)
+        return Response(self.get_serializer(new_booking).data)
+
 
 # Admin Booking Management Views
 
-class AdminListAllBookingsView(generics.ListAPIView):
+class AdminListAllBookingsView(FanOutListMixin, SparseFieldsMixin, DeltaSyncMixin, generics.ListAPIView):
     """
     Admin lists all bookings.
-    Supports filtering by cabin_id, therapist_id, date, and status.
+    Supports filtering by cabin_id, therapist_id, date, and status, ?since=<cursor> delta sync and ?fields= sparse fieldsets.
+    With include_archived=true, archived bookings are merged in (see api/archive.py).
     """
     serializer_class = BookingSerializer
     permission_classes = [IsAdminOrSuperUser]
+    query_budget = 3
 
     def get_queryset(self):
-        queryset = Booking.objects.all()
-        
+        return self.filter_bookings(Booking.objects.select_related('therapist')).order_by('start_time')
+
+    def filter_bookings(self, queryset):
+        # Works on Booking and BookingArchive querysets alike (same column names).
         cabin_id = self.request.query_params.get('cabin_id')
         if cabin_id:
             queryset = queryset.filter(cabin_id=cabin_id)
@@ -509,9 +922,17 @@ class AdminListAllBookingsView(generics.ListAPIView):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
             
-        return queryset.order_by('start_time')
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('include_archived', '').lower() not in ('1', 'true') or 'since' in request.query_params:
+            return super().list(request, *args, **kwargs)
+        rows = self.across_shards(lambda: booking_history(
+            self.filter_bookings(Booking.objects.all()), self.filter_bookings(BookingArchive.objects.all())
+        ))
+        return Response(self.trim_fields(BookingHistorySerializer(rows, many=True)).data)
 
-class AdminCancelBookingView(generics.UpdateAPIView):
+class AdminCancelBookingView(IdempotentMixin, generics.UpdateAPIView):
     """
     Admin cancels any booking.
     Sets status to 'cancelled'.
@@ -530,21 +951,37 @@ class AdminCancelBookingView(generics.UpdateAPIView):
         # Admin can decide to make it available again or just cancel
         # For now, just cancelling.
         original_therapist = serializer.instance.therapist # Get therapist before update
-        serializer.save(status='cancelled')
-        
-        # Send notification to therapist if a therapist was assigned
-        if original_therapist:
+        previous_status = serializer.instance.status
+        with transaction.atomic(using=current_db()):
+            serializer.instance.status = 'cancelled'
+            serializer.instance.save(update_fields=['status', 'updated_at']) # Nothing else in the request body applies
+            record_booking_transition(serializer.instance, previous_status, serializer.instance.therapist_id)
+            # Multi-seat slot: every seat holder loses their seat too
+            reservations = cancel_all_seats(serializer.instance)
+            for reservation in reservations:
+                record_reservation_transition(reservation, 'booked')
+            record_slot_change(
+                serializer.instance, 'cancelled', self.request.user.pk,
+                previous=(previous_status, serializer.instance.therapist_id),
+            )
+        if reservations:
+            serializer.instance.refresh_from_db()
+
+        # Send notification to every therapist who had the slot or a seat on it
+        therapists = [original_therapist] if original_therapist else []
+        therapists += [reservation.therapist for reservation in reservations]
+        for therapist in therapists:
             booking = serializer.instance
             cabin = booking.cabin
             try:
                 subject_therapist = f"Booking Update: Your booking for {cabin.name} has been cancelled"
                 message_therapist = (
-                    f"Hi {original_therapist.first_name or original_therapist.username},\n\n"
+                    f"Hi {therapist.first_name or therapist.username},\n\n"
                     f"Please be advised that your booking for {cabin.name} from {booking.start_time.strftime('%Y-%m-%d %H:%M')} to {booking.end_time.strftime('%Y-%m-%d %H:%M')} has been cancelled by an administrator.\n\n"
                     f"If you have any questions, please contact administration.\n\n"
                     f"Regards,\nThe Therapy Booking Team"
                 )
-                send_app_email(subject_therapist, message_therapist, [original_therapist.email], fail_silently=True)
+                send_app_email(subject_therapist, message_therapist, [therapist.email], fail_silently=True)
             except Exception as e:
                  print(f"Error sending admin cancellation email to therapist for booking {booking.id}: {e}")
         # Optionally notify other admins
@@ -557,3 +994,228 @@ class AdminCancelBookingView(generics.UpdateAPIView):
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
         return Response(serializer.data)
+
+
+class AdminBookingAnalyticsView(generics.GenericAPIView):
+    """
+    Admin analytics over bookings starting between start_date and end_date
+    (inclusive, default: the last 30 days): utilization and revenue by cabin,
+    therapist, weekday and hour, plus an hour-of-week heatmap of booked hours.
+    Covers every location, or only the one given as `location`.
+    """
+    permission_classes = [IsAdminOrSuperUser]
+    query_budget = 5
+
+    def get(self, request, *args, **kwargs):
+        # Imported here: it pulls in NumPy, which no other path needs (api/startup.py preloads it).
+        from .analytics import AnalyticsUnavailable, booking_analytics, day_range
+
+        today = timezone.localdate()
+        start_date = parse_date(request.query_params.get('start_date') or '') or today - timezone.timedelta(days=30)
+        end_date = parse_date(request.query_params.get('end_date') or '') or today
+        if start_date > end_date:
+            return Response({"error": "start_date must not be after end_date."}, status=status.HTTP_400_BAD_REQUEST)
+
+        start, end = day_range(start_date, end_date)
+        try:
+            data = booking_analytics(start, end, using=shard_aliases() if spans_shards() else current_db())
+        except AnalyticsUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        for alias in {cabin_catalog.shard_of(row['cabin_id']) for row in data['by_cabin']}:
+            cabin_catalog.refresh(alias)
+        for row in data['by_cabin']:
+            entry = cabin_catalog.get(row['cabin_id'])
+            row['cabin_name'] = entry.name if entry else None
+        usernames = dict(User.objects.filter(id__in=[row['therapist_id'] for row in data['by_therapist']]).values_list('id', 'username'))
+        for row in data['by_therapist']:
+            row['therapist_username'] = usernames.get(row['therapist_id'])
+        return Response(data)
+
+
+# Live Updates
+
+def _authenticate_stream_request(request):
+    """
+    Resolve the user from a JWT access token in the Authorization header or,
+    for EventSource clients that cannot set headers, a stream ticket in the
+    `ticket` query param (see SlotEventTicketView).
+    """
+    ticket = request.GET.get('ticket')
+    if ticket is not None:
+        user_id = redeem_stream_ticket(ticket) if len(ticket) <= 64 else None
+        return User.objects.filter(pk=user_id, is_active=True).first() if user_id is not None else None
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+class SlotEventTicketView(generics.GenericAPIView):
+    """
+    Therapist or admin gets a single-use ticket for opening the slot event
+    stream with ?ticket=, for EventSource clients that cannot send the
+    Authorization header. The ticket expires after a few seconds.
+    """
+    permission_classes = [IsTherapistUser | IsAdminOrSuperUser]
+    query_budget = 1 # The token's user
+
+    def post(self, request, *args, **kwargs):
+        return Response(
+            {"ticket": issue_stream_ticket(request.user), "expires_in": get_slot_events_config()['TICKET_SECONDS']},
+            status=status.HTTP_201_CREATED
+        )
+
+class SlotEventStreamView(View):
+    """
+    Server-Sent Events stream of slot changes (created, booked, cancelled,
+    deleted) for therapists and admins. Must be served under ASGI.
+    Supports filtering by cabin_ids (comma-separated) and resuming with the
+    Last-Event-ID header (or last_event_id query param).
+    """
+
+    async def get(self, request, *args, **kwargs):
+        user = await sync_to_async(_authenticate_stream_request)(request)
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided or are invalid."}, status=401)
+        if not (user.is_therapist or user.is_admin or user.is_superuser):
+            return JsonResponse({"detail": "You do not have permission to perform this action."}, status=403)
+
+        try:
+            cabin_ids = [int(value) for value in request.GET.get('cabin_ids', '').split(',') if value.strip()]
+            last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            return JsonResponse({"error": "cabin_ids and Last-Event-ID must be integers."}, status=400)
+
+        response = StreamingHttpResponse(
+            stream_slot_changes(cabin_ids, last_event_id), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no' # Disable proxy buffering (nginx)
+        return response
+
+
+# Admin Deletions
+
+class AdminUserDeleteView(generics.DestroyAPIView):
+    """
+    Admin deletes a user. The user is deactivated at once and answered with
+    a 202 and the deletion job; their bookings are reopened or archived in
+    the background (see api/deletion.py).
+    """
+    queryset = User.objects.filter(is_active=True)
+    permission_classes = [IsAdminOrSuperUser]
+    query_budget = 3 # lookup, deactivation and queueing the job
+
+    def destroy(self, request, *args, **kwargs):
+        user = self.get_object()
+        if user == request.user:
+            return Response({"error": "You cannot delete your own account."}, status=status.HTTP_400_BAD_REQUEST)
+        job = queue_user_deletion(user, requested_by=request.user)
+        return Response(DeletionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+class AdminDeletionJobListView(generics.ListAPIView):
+    """
+    Admin lists cabin and user deletion jobs with their progress, newest
+    first. Supports filtering by status.
+    """
+    serializer_class = DeletionJobSerializer
+    permission_classes = [IsAdminOrSuperUser]
+    query_budget = 1
+
+    def get_queryset(self):
+        queryset = DeletionJob.objects.order_by('-pk')
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        return queryset
+
+class AdminDeletionJobDetailView(generics.RetrieveAPIView):
+    """
+    Admin polls one deletion job's progress.
+    """
+    queryset = DeletionJob.objects.all()
+    serializer_class = DeletionJobSerializer
+    permission_classes = [IsAdminOrSuperUser]
+    query_budget = 1
+
+
+# Admin Search
+
+class AdminTherapistSearchView(generics.GenericAPIView):
+    """
+    Admin looks up therapists by partial name, username, email or phone.
+    Ranked full-text search with a fixed result limit (see api/search.py).
+    """
+    serializer_class = UserDetailSerializer
+    permission_classes = [IsAdminOrSuperUser]
+    query_budget = 2 # Ranked ids, then the rows
+
+    def get(self, request, *args, **kwargs):
+        params = AdminSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        therapists = search_therapists(params.validated_data['q'], params.validated_data.get('limit'))
+        return Response(self.get_serializer(therapists, many=True).data)
+
+class AdminCabinSearchView(generics.GenericAPIView):
+    """
+    Admin looks up cabins by partial name or description.
+    Ranked full-text search with a fixed result limit (see api/search.py).
+    """
+    serializer_class = CabinSerializer
+    permission_classes = [IsAdminOrSuperUser]
+    query_budget = 2
+
+    def get(self, request, *args, **kwargs):
+        params = AdminSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        cabins = search_cabins(params.validated_data['q'], params.validated_data.get('limit'))
+        return Response(self.get_serializer(cabins, many=True).data)
+
+
+# Admin Diagnostics
+
+class AdminQueryStatsView(generics.GenericAPIView):
+    """
+    Admin dumps (GET) or resets (DELETE) the in-memory table of normalized
+    queries by total time. Populated only when SLOW_QUERY_LOG is enabled;
+    the table is per process.
+    """
+    permission_classes = [IsAdminOrSuperUser]
+
+    def get(self, request, *args, **kwargs):
+        config = get_query_log_config()
+        limit = request.query_params.get('limit')
+        limit = int(limit) if limit and limit.isdigit() else config['TOP_N']
+        return Response({
+            'enabled': config['ENABLED'],
+            'threshold_ms': config['THRESHOLD_MS'],
+            'queries': query_stats.top(limit),
+        })
+
+    def delete(self, request, *args, **kwargs):
+        query_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# Batching
+
+class BatchView(generics.GenericAPIView):
+    """
+    Runs several GET requests in one round trip, under this request's
+    authentication (see api/batch.py). Dashboards load profile, bookings,
+    slots and cabins with a single call.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    batchable = False # No nested batches
+
+    def post(self, request, *args, **kwargs):
+        params = BatchSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        responses = run_batch(request, params.validated_data['requests'], params.validated_data['parallel'])
+        return Response({'responses': responses})
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'therapy_booking.settings')
 
 application = get_asgi_application()
+
+# Warm caches and freeze the heap before a pre-forking server forks (see api/startup.py).
+from api.startup import prepare_worker  # noqa: E402
+
+prepare_worker()
@@ -50,6 +50,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.QueryInstrumentationMiddleware', # No-op unless SLOW_QUERY_LOG['ENABLED']
+    'api.middleware.QueryBudgetMiddleware', # See QUERY_BUDGET_MODE
+    'api.middleware.ShardMiddleware', # No-op unless SHARDING lists several shards
 ]
 
 ROOT_URLCONF = 'therapy_booking.urls'
@@ -79,7 +82,36 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Location shards (api/sharding.py). Unused until listed in SHARDING['SHARDS'];
+    # run `migrate --database <alias>` for each one before listing it.
+    'clinic_a': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'shard_clinic_a.sqlite3',
+    },
+    'clinic_b': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'shard_clinic_b.sqlite3',
+    },
+}
+
+DATABASE_ROUTERS = ['api.sharding.ShardRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Seen by every worker process: rate-limit counters and idempotency keys.
+    # Its table is created by `migrate` (api migration 0020).
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'api_shared_cache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
 }
 
 
@@ -127,6 +159,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'api.User'
 
 REST_FRAMEWORK = {
+    'NUM_PROXIES': 0, # Not behind a proxy: client IPs come from REMOTE_ADDR, never X-Forwarded-For
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     )
@@ -136,3 +169,26 @@ REST_FRAMEWORK = {
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@therapybooking.example.com'
 ADMIN_EMAIL_LIST = ['admin@example.com'] # Example admin email for notifications
+
+# Feature settings of the api app (api/conf.py). Each is an optional dict whose
+# keys override that feature's defaults, kept in DEFAULT_CONFIG of its
+# module, e.g. BATCH = {'MAX_PARALLEL': 8}.
+#   SLOW_QUERY_LOG     slow query log, opt-in (api/query_log.py)
+#   SLOT_EVENTS        slot event feed and stream tickets (api/events.py)
+#   DELTA_SYNC         delta sync of booking lists (api/sync.py)
+#   SLOT_HOLDS         slot holds (api/holds.py)
+#   BOOKING_ARCHIVE    booking archival (api/archive.py)
+#   AVAILABILITY_INDEX availability bitmaps (api/availability.py)
+#   IDEMPOTENCY        Idempotency-Key replay (api/idempotency.py)
+#   RATE_LIMITS        rate limits per scope (api/throttling.py)
+#   STARTUP            worker warm-up and gc.freeze() (api/startup.py)
+#   SHARDING           location shards (api/sharding.py)
+#   ADMIN_SEARCH       admin therapist/cabin search (api/search.py)
+#   BATCH              POST /api/batch/ (api/batch.py)
+#   DELETION_JOBS      background deletion of cabins and users (api/deletion.py)
+#   SCHEDULER          maintenance scheduler and its jobs (api/scheduler.py)
+
+# Per-view query budgets (views declare `query_budget`). 'log' reports an
+# overrun through the api.query_budget logger, 'raise' fails the request
+# (useful in development), 'off' removes the middleware.
+QUERY_BUDGET_MODE = 'log'
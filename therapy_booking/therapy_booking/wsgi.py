@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'therapy_booking.settings')
 
 application = get_wsgi_application()
+
+# Warm caches and freeze the heap before a pre-forking server forks (see api/startup.py).
+from api.startup import prepare_worker  # noqa: E402
+
+prepare_worker()